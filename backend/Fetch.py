@@ -1,10 +1,16 @@
-import requests
 import json
 import base64
 from dotenv import load_dotenv
 import os
+import asyncio
 import time
 import logging
+from fnmatch import fnmatch
+import httpx
+from cache import DiskCache
+from github_scheduler import get_scheduler
+import metrics
+from singleflight import SingleFlight
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -12,10 +18,184 @@ logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
-github_token = os.getenv("GITHUB_TOKEN")
 ENABLE_LOCAL_TESTING = os.getenv("ENABLE_LOCAL_TESTING", "false").lower() == "true"
 
-def fetch_repo_info(owner, repo):
+# Shared HTTP client settings
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+GITHUB_HTTP2 = os.getenv("GITHUB_HTTP2", "true").lower() == "true"
+GITHUB_MAX_CONNECTIONS = int(os.getenv("GITHUB_MAX_CONNECTIONS", "20"))
+GITHUB_TIMEOUT = float(os.getenv("GITHUB_TIMEOUT", "30"))
+
+# File listing settings
+GITHUB_WALK_CONCURRENCY = int(os.getenv("GITHUB_WALK_CONCURRENCY", "8"))
+GITHUB_FILES_MAX_DEPTH = int(os.getenv("GITHUB_FILES_MAX_DEPTH")) if os.getenv("GITHUB_FILES_MAX_DEPTH") else None
+GITHUB_FILES_MAX = int(os.getenv("GITHUB_FILES_MAX")) if os.getenv("GITHUB_FILES_MAX") else None
+# Vendored and generated directories that are never listed or walked
+DEFAULT_FILE_EXCLUDES = (
+    "node_modules/*", "*/node_modules/*",
+    "vendor/*", "*/vendor/*",
+    ".git/*", "*/.git/*",
+)
+
+# Response cache settings
+GITHUB_CACHE_ENABLED = os.getenv("GITHUB_CACHE_ENABLED", "true").lower() == "true"
+GITHUB_CACHE_PATH = os.getenv("GITHUB_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "github.sqlite"))
+GITHUB_CACHE_MAX_BYTES = int(os.getenv("GITHUB_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Seconds a cached response is served without asking GitHub; afterwards it is revalidated with its ETag
+GITHUB_CACHE_TTLS = {
+    "info": int(os.getenv("GITHUB_CACHE_TTL_INFO", "600")),
+    "languages": int(os.getenv("GITHUB_CACHE_TTL_LANGUAGES", "3600")),
+    "readme": int(os.getenv("GITHUB_CACHE_TTL_README", "3600")),
+    "tree": int(os.getenv("GITHUB_CACHE_TTL_TREE", "900")),
+    "contents": int(os.getenv("GITHUB_CACHE_TTL_CONTENTS", "900")),
+    "commits": int(os.getenv("GITHUB_CACHE_TTL_COMMITS", "300")),
+}
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 support in httpx)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_async_client = None
+_async_client_loop = None
+_response_cache = None
+# Why the last attempt to open the response cache failed, for /ready
+_response_cache_error = None
+# Concurrent identical GitHub requests (e.g. many users opening the same shared repo) share one call
+github_flight = SingleFlight("github")
+
+def get_async_client():
+    """
+    Return the shared pooled GitHub client for the running event loop.
+    The client is created on first use and recreated if the loop changes (e.g. between asyncio.run calls).
+    """
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client.is_closed or _async_client_loop is not loop:
+        _async_client = httpx.AsyncClient(
+            base_url=GITHUB_API_URL,
+            headers={"Accept": "application/vnd.github+json"},
+            http2=GITHUB_HTTP2 and HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=GITHUB_MAX_CONNECTIONS,
+                max_keepalive_connections=GITHUB_MAX_CONNECTIONS,
+            ),
+            timeout=GITHUB_TIMEOUT,
+        )
+        _async_client_loop = loop
+    return _async_client
+
+async def close_async_client():
+    """Close the shared GitHub client (called on application shutdown)."""
+    global _async_client, _async_client_loop
+    if _async_client is not None and not _async_client.is_closed:
+        await _async_client.aclose()
+    _async_client = None
+    _async_client_loop = None
+
+def get_response_cache():
+    """Return the on-disk GitHub response cache, or None when caching is disabled."""
+    global _response_cache, _response_cache_error
+    if GITHUB_CACHE_ENABLED and _response_cache is None:
+        try:
+            _response_cache = DiskCache(GITHUB_CACHE_PATH, max_bytes=GITHUB_CACHE_MAX_BYTES, table="github_responses")
+        except Exception as e:
+            _response_cache_error = str(e)
+            raise
+        _response_cache_error = None
+    return _response_cache
+
+def opened_response_cache():
+    """Return the response cache if something has opened it already, without opening it."""
+    return _response_cache
+
+def _endpoint_name(path):
+    """Map an API path to the endpoint name used for TTLs."""
+    if "/git/trees/" in path:
+        return "tree"
+    if path.endswith("/languages"):
+        return "languages"
+    if path.endswith("/commits"):
+        return "commits"
+    if path.endswith("/contents/README.md"):
+        return "readme"
+    if "/contents" in path:
+        return "contents"
+    return "info"
+
+def _cache_key(path, params):
+    query = "&".join(f"{key}={value}" for key, value in sorted((params or {}).items()))
+    return f"{GITHUB_API_URL}{path}?{query}"
+
+def _cached_response(entry, url):
+    headers = {"Content-Type": "application/json", **entry.headers}
+    return httpx.Response(200, content=entry.value, headers=headers, request=httpx.Request("GET", url))
+
+def _flight_key(path, params):
+    """Request identity for coalescing; owner and repository names are case-insensitive on GitHub."""
+    parts = path.split("/")
+    if len(parts) > 3 and parts[1] == "repos":
+        parts[2], parts[3] = parts[2].lower(), parts[3].lower()
+    return "/".join(parts), tuple(sorted((params or {}).items()))
+
+async def _github_get(path, params=None):
+    """
+    Issue a GET against the GitHub API through the shared client and the rate-limit-aware scheduler,
+    which picks the token and retries throttled or failed requests.
+    Successful responses are cached on disk: fresh entries are served without a request and
+    expired entries are revalidated with If-None-Match, so an unchanged resource costs a 304.
+    Identical requests that are already in flight are joined instead of sent again.
+    """
+    return await github_flight.do(_flight_key(path, params), lambda: _timed_github_get(path, params))
+
+async def _timed_github_get(path, params):
+    started = time.perf_counter()
+    result = "error"
+    try:
+        response, result = await _cached_github_get(path, params)
+        return response
+    finally:
+        metrics.github_request_seconds.observe(
+            time.perf_counter() - started, endpoint=_endpoint_name(path), result=result
+        )
+
+async def _cached_github_get(path, params):
+    """_github_get without the instrumentation; returns (response, result label)."""
+    client = get_async_client()
+    scheduler = get_scheduler()
+    cache = get_response_cache()
+    if cache is None:
+        response = await scheduler.request(client, "GET", path, params=params)
+        return response, str(response.status_code)
+
+    key = _cache_key(path, params)
+    ttl = GITHUB_CACHE_TTLS[_endpoint_name(path)]
+    entry = await asyncio.to_thread(cache.get, key)
+    if entry is not None and entry.expires_at > time.time():
+        return _cached_response(entry, key), "cache_hit"
+
+    headers = {"If-None-Match": entry.etag} if entry is not None and entry.etag else None
+    response = await scheduler.request(client, "GET", path, params=params, headers=headers)
+    if response.status_code == 304 and entry is not None:
+        cache.record("revalidated")
+        await asyncio.to_thread(cache.touch, key, ttl)
+        return _cached_response(entry, key), "not_modified"
+    if response.status_code == 200:
+        etag = response.headers.get("ETag")
+        await asyncio.to_thread(cache.set, key, response.content, ttl, etag, {"ETag": etag} if etag else None)
+    return response, str(response.status_code)
+
+def _run_sync(coro):
+    """Run an async fetch from synchronous code (scripts, fine-tuning tools)."""
+    async def runner():
+        try:
+            return await coro
+        finally:
+            await close_async_client()
+    return asyncio.run(runner())
+
+async def fetch_repo_info_async(owner, repo):
     if ENABLE_LOCAL_TESTING:
         logger.info(f"Using sample response for {owner}/{repo} (ENABLE_LOCAL_TESTING=true)")
         return {
@@ -25,10 +205,8 @@ def fetch_repo_info(owner, repo):
             "created_at": "2023-01-01T00:00:00Z",
             "pushed_at": "2023-12-31T23:59:59Z",
         }
-    
-    url = f"https://api.github.com/repos/{owner}/{repo}"
-    headers = {"Authorization": f"token {github_token}"} if github_token else {}
-    response = requests.get(url, headers=headers)
+
+    response = await _github_get(f"/repos/{owner}/{repo}")
     if response.status_code == 200:
         data = response.json()
         return {
@@ -41,85 +219,268 @@ def fetch_repo_info(owner, repo):
     logger.error(f"Error fetching repo info for {owner}/{repo}: {response.status_code}")
     return None
 
-def fetch_repo_files(owner, repo, path=""):
+def _matches_any(path, patterns):
+    return any(fnmatch(path, pattern) for pattern in patterns)
+
+def _relative_depth(path, root):
+    relative = path[len(root):].lstrip("/") if root else path
+    return relative.count("/")
+
+def _keep_file(path, root, max_depth, include, exclude):
+    if exclude and _matches_any(path, exclude):
+        return False
+    if include and not _matches_any(path, include):
+        return False
+    return max_depth is None or _relative_depth(path, root) <= max_depth
+
+async def _fetch_tree_listing(owner, repo, ref):
+    """
+    List every path in the repository with a single recursive git-trees call.
+    :return: Tuple of (file paths, truncated flag), or None if the tree could not be fetched.
+    """
+    response = await _github_get(f"/repos/{owner}/{repo}/git/trees/{ref}", params={"recursive": "1"})
+    if response.status_code != 200:
+        logger.error(f"Error fetching tree for {owner}/{repo}@{ref}: {response.status_code}")
+        return None
+    data = response.json()
+    paths = [item["path"] for item in data.get("tree", []) if item.get("type") == "blob"]
+    return paths, bool(data.get("truncated"))
+
+async def _walk_repo_contents(owner, repo, path, ref, max_depth, max_files, include, exclude):
+    """
+    Breadth-first walk of the contents API with at most GITHUB_WALK_CONCURRENCY directory requests in flight.
+    Excluded directories are pruned before they are requested.
+    """
+    semaphore = asyncio.Semaphore(GITHUB_WALK_CONCURRENCY)
+    params = {"ref": ref} if ref != "HEAD" else None
+
+    async def list_directory(dir_path):
+        async with semaphore:
+            response = await _github_get(f"/repos/{owner}/{repo}/contents/{dir_path}", params=params)
+        if response.status_code != 200:
+            logger.error(f"Error fetching files for {owner}/{repo} at path '{dir_path}': {response.status_code}")
+            return []
+        return response.json()
+
+    file_list = []
+    level = [path]
+    while level and (max_files is None or len(file_list) < max_files):
+        next_level = []
+        for items in await asyncio.gather(*(list_directory(dir_path) for dir_path in level)):
+            for item in items:
+                if item["type"] == "file":
+                    if _keep_file(item["path"], path, max_depth, include, exclude):
+                        file_list.append(item["path"])
+                elif item["type"] == "dir":
+                    if exclude and _matches_any(item["path"] + "/", exclude):
+                        continue
+                    if max_depth is not None and _relative_depth(item["path"], path) + 1 > max_depth:
+                        continue
+                    next_level.append(item["path"])
+        level = next_level
+    return file_list if max_files is None else file_list[:max_files]
+
+async def fetch_repo_files_async(owner, repo, path="", ref="HEAD", max_depth=GITHUB_FILES_MAX_DEPTH,
+                                 max_files=GITHUB_FILES_MAX, include=None, exclude=DEFAULT_FILE_EXCLUDES):
+    """
+    List the files in a repository.
+    Uses one recursive git-trees request and only falls back to a bounded-concurrency directory walk
+    when GitHub reports the tree as truncated.
+    :param path: Only list files under this directory ("" for the whole repository).
+    :param ref: Branch, tag or commit SHA to list.
+    :param max_depth: Maximum directory depth below `path` to include (None for unlimited).
+    :param max_files: Maximum number of files to return (None for unlimited).
+    :param include: Glob patterns a file path must match to be listed.
+    :param exclude: Glob patterns for files and directories that are never listed or walked.
+    :return: A list of file paths.
+    """
     if ENABLE_LOCAL_TESTING:
         logger.info(f"Using sample response for {owner}/{repo} files (ENABLE_LOCAL_TESTING=true)")
         return ["main.py", "README.md", "requirements.txt", "utils.py"]
-    
-    url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path}"
-    headers = {"Authorization": f"token {github_token}"} if github_token else {}
-    response = requests.get(url, headers=headers)
-    if response.status_code == 200:
-        items = response.json()
-        file_list = []
-        for item in items:
-            if item["type"] == "file":
-                file_list.append(item["path"])
-            elif item["type"] == "dir":
-                time.sleep(0.1)  # Avoid rate limits
-                file_list.extend(fetch_repo_files(owner, repo, item["path"]))
-        return file_list
-    logger.error(f"Error fetching files for {owner}/{repo} at path '{path}': {response.status_code}")
-    return []
 
-def fetch_repo_languages(owner, repo):
+    path = path.strip("/")
+    listing = await _fetch_tree_listing(owner, repo, ref)
+    if listing is not None:
+        paths, truncated = listing
+        if not truncated:
+            prefix = f"{path}/" if path else ""
+            file_list = [
+                file_path for file_path in paths
+                if file_path.startswith(prefix) and _keep_file(file_path, path, max_depth, include, exclude)
+            ]
+            return file_list if max_files is None else file_list[:max_files]
+        logger.info(f"Tree for {owner}/{repo} is truncated, walking directories instead")
+
+    return await _walk_repo_contents(owner, repo, path, ref, max_depth, max_files, include, exclude)
+
+async def fetch_repo_languages_async(owner, repo):
     if ENABLE_LOCAL_TESTING:
         logger.info(f"Using sample response for {owner}/{repo} languages (ENABLE_LOCAL_TESTING=true)")
         return {"Python": 80.0, "JavaScript": 20.0}
-    
-    url = f"https://api.github.com/repos/{owner}/{repo}/languages"
-    headers = {"Authorization": f"token {github_token}"} if github_token else {}
-    response = requests.get(url, headers=headers)
+
+    response = await _github_get(f"/repos/{owner}/{repo}/languages")
     if response.status_code == 200:
         data = response.json()
         total_bytes = sum(data.values())
+        if not total_bytes:
+            return {}
         return {lang: round((bytes / total_bytes) * 100, 2) for lang, bytes in data.items()}
     logger.error(f"Error fetching languages for {owner}/{repo}: {response.status_code}")
     return {}
 
-def fetch_readme(owner, repo):
+async def fetch_readme_async(owner, repo):
     if ENABLE_LOCAL_TESTING:
         logger.info(f"Using sample response for {owner}/{repo} README (ENABLE_LOCAL_TESTING=true)")
         return "This is a sample README for the TruHacks project."
-    
-    url = f"https://api.github.com/repos/{owner}/{repo}/contents/README.md"
-    headers = {"Authorization": f"token {github_token}"} if github_token else {}
-    response = requests.get(url, headers=headers)
+
+    response = await _github_get(f"/repos/{owner}/{repo}/contents/README.md")
     if response.status_code == 200:
         readme_data = response.json()
         return base64.b64decode(readme_data["content"]).decode("utf-8")
     logger.info(f"README not found for {owner}/{repo}: {response.status_code}")
     return "No README available."
 
-def fetch_commit_messages(owner, repo, limit=100):
+async def fetch_commit_messages_async(owner, repo, limit=100):
     if ENABLE_LOCAL_TESTING:
         logger.info(f"Using sample response for {owner}/{repo} commits (ENABLE_LOCAL_TESTING=true)")
         return ["Initial commit", "Added FastAPI backend", "Integrated GitHub API", "Updated README"]
-    
-    url = f"https://api.github.com/repos/{owner}/{repo}/commits"
-    headers = {"Authorization": f"token {github_token}"} if github_token else {}
-    messages = []
-    page = 1
+
     per_page = min(100, limit)
-    
-    while len(messages) < limit and page <= (limit // per_page) + 1:
+    pages = -(-limit // per_page)  # ceil division
+
+    async def fetch_page(page):
         params = {"per_page": per_page, "page": page}
-        response = requests.get(url, headers=headers, params=params)
+        response = await _github_get(f"/repos/{owner}/{repo}/commits", params=params)
         if response.status_code != 200:
             logger.error(f"Error fetching commits for {owner}/{repo}: {response.status_code}")
-            break
-        commits = response.json()
-        if not commits:
-            break
-        messages.extend(commit["commit"]["message"] for commit in commits)
-        page += 1
-    
+            return None
+        return response.json()
+
+    # Page 1 comes first: most repositories fit on it, and a short page means there is nothing more.
+    # Only when it is full are the remaining pages needed to reach the limit requested at once.
+    first = await fetch_page(1)
+    if not first:
+        return []
+    messages = [commit["commit"]["message"] for commit in first]
+    if len(first) == per_page and pages > 1:
+        for commits in await asyncio.gather(*(fetch_page(page) for page in range(2, pages + 1))):
+            if not commits:
+                break
+            messages.extend(commit["commit"]["message"] for commit in commits)
+
     return messages[:limit]
 
-def aggregate_repo_data(owner, repo, commit_limit=100):
+# Fields that can be requested from aggregate_repo_data and the keys each one fills in
+REPO_FIELDS = {
+    "info": ("Repository Name", "Description", "Topics", "Start Date", "Last Updated"),
+    "languages": ("Languages",),
+    "readme": ("README",),
+    "files": ("Files",),
+    "commits": ("Recent Commit Messages",),
+}
+KEY_FIELDS = {key: field for field, keys in REPO_FIELDS.items() for key in keys}
+
+async def _fetch_field(repo_data, field):
+    with metrics.track(metrics.repo_field_seconds, field=field):
+        return await _fetch_field_values(repo_data, field)
+
+async def _fetch_field_values(repo_data, field):
+    owner, repo = repo_data.owner, repo_data.repo
+    if field == "info":
+        repo_info = await fetch_repo_info_async(owner, repo)
+        if not repo_info:
+            raise ValueError(f"Failed to fetch repo info for {owner}/{repo}")
+        return {
+            "Repository Name": repo_info.get("name", "Unknown Repository"),
+            "Description": repo_info.get("description", "No description available."),
+            "Topics": repo_info.get("topics", []),
+            "Start Date": repo_info.get("created_at", "Unknown Start Date"),
+            "Last Updated": repo_info.get("pushed_at", "Unknown Last Updated"),
+        }
+    if field == "languages":
+        return {"Languages": await fetch_repo_languages_async(owner, repo) or {}}
+    if field == "readme":
+        return {"README": await fetch_readme_async(owner, repo) or "No README available."}
+    if field == "files":
+        return {"Files": await fetch_repo_files_async(owner, repo) or []}
+    return {"Recent Commit Messages": await fetch_commit_messages_async(owner, repo, limit=repo_data.commit_limit) or []}
+
+class RepoData(dict):
+    """
+    Aggregated repository details that only fetch what is used.
+    Requested fields are fetched up front; any other field is fetched on first access from
+    synchronous code, or with `await repo_data.ensure(...)` from async code. Inside a running event loop,
+    reading a field that has not been fetched (with `[]` or `get`) raises KeyError instead of blocking the
+    loop or quietly returning a default.
+    """
+
+    def __init__(self, owner, repo, commit_limit=100, values=None):
+        super().__init__(values or {})
+        self.owner = owner
+        self.repo = repo
+        self.commit_limit = commit_limit
+        self.loaded = {field for field, keys in REPO_FIELDS.items() if all(key in self for key in keys)}
+
+    async def ensure(self, *fields):
+        """Fetch the given fields (concurrently) unless they are already loaded."""
+        unknown = set(fields) - set(REPO_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown repository fields: {', '.join(sorted(unknown))}")
+        missing = [field for field in dict.fromkeys(fields) if field not in self.loaded]
+        results = await asyncio.gather(*(_fetch_field(self, field) for field in missing))
+        for field, values in zip(missing, results):
+            self.update(values)
+            self.loaded.add(field)
+        return self
+
+    def _resolve(self, key):
+        field = KEY_FIELDS.get(key)
+        if field is None or field in self.loaded:
+            return False
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            _run_sync(self.ensure(field))
+            return True
+        return False
+
+    def __missing__(self, key):
+        if self._resolve(key):
+            return self[key]
+        field = KEY_FIELDS.get(key)
+        if field is not None:
+            raise KeyError(f"{key!r} has not been fetched; await repo_data.ensure({field!r}) first")
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key not in self and key in KEY_FIELDS:
+            # Unfetched field: fetched on demand from sync code, KeyError from async code
+            return self[key]
+        return super().get(key, default)
+
+def select_fields(repo_data, fields):
+    """
+    Plain dictionary with only the keys belonging to `fields`, leaving out ones that are not available.
+    """
+    selected = {}
+    for field in fields:
+        for key in REPO_FIELDS[field]:
+            value = repo_data.get(key)
+            if value is not None:
+                selected[key] = value
+    return selected
+
+async def aggregate_repo_data_async(owner, repo, commit_limit=100, fields=None):
+    """
+    Fetch repository details concurrently and combine them into a single dictionary.
+    The request time is bounded by the slowest individual GitHub call rather than their sum.
+    :param fields: Fields to fetch up front ("info", "languages", "readme", "files", "commits");
+                   defaults to all of them. "info" is always fetched. Other fields are fetched lazily.
+    :return: A RepoData dictionary.
+    """
     if ENABLE_LOCAL_TESTING:
         logger.info(f"Using sample response for {owner}/{repo} (ENABLE_LOCAL_TESTING=true)")
-        return {
+        return RepoData(owner, repo, commit_limit, {
             "Repository Name": repo,
             "Description": "A hackathon project to automate resume creation from GitHub repositories.",
             "Topics": ["fastapi", "github-api", "resume-automation"],
@@ -129,28 +490,30 @@ def aggregate_repo_data(owner, repo, commit_limit=100):
             "Recent Commit Messages": ["Initial commit", "Added FastAPI backend", "Integrated GitHub API", "Updated README"],
             "Start Date": "2023-01-01T00:00:00Z",
             "Last Updated": "2023-12-31T23:59:59Z",
-        }
-    
-    repo_info = fetch_repo_info(owner, repo)
-    if not repo_info:
-        raise ValueError(f"Failed to fetch repo info for {owner}/{repo}")
-    
-    repo_languages = fetch_repo_languages(owner, repo) or {}
-    readme_content = fetch_readme(owner, repo) or "No README available."
-    all_files = fetch_repo_files(owner, repo) or []
-    recent_commit_messages = fetch_commit_messages(owner, repo, limit=commit_limit) or []
-
-    return {
-        "Repository Name": repo_info.get("name", "Unknown Repository"),
-        "Description": repo_info.get("description", "No description available."),
-        "Topics": repo_info.get("topics", []),
-        "Languages": repo_languages,
-        "Files": all_files,
-        "README": readme_content,
-        "Recent Commit Messages": recent_commit_messages,
-        "Start Date": repo_info.get("created_at", "Unknown Start Date"),
-        "Last Updated": repo_info.get("pushed_at", "Unknown Last Updated"),
-    }
+        })
+
+    repo_data = RepoData(owner, repo, commit_limit)
+    await repo_data.ensure("info", *(REPO_FIELDS if fields is None else fields))
+    return repo_data
+
+# Synchronous wrappers for scripts and tools that are not running an event loop
+def fetch_repo_info(owner, repo):
+    return _run_sync(fetch_repo_info_async(owner, repo))
+
+def fetch_repo_files(owner, repo, path="", **kwargs):
+    return _run_sync(fetch_repo_files_async(owner, repo, path, **kwargs))
+
+def fetch_repo_languages(owner, repo):
+    return _run_sync(fetch_repo_languages_async(owner, repo))
+
+def fetch_readme(owner, repo):
+    return _run_sync(fetch_readme_async(owner, repo))
+
+def fetch_commit_messages(owner, repo, limit=100):
+    return _run_sync(fetch_commit_messages_async(owner, repo, limit))
+
+def aggregate_repo_data(owner, repo, commit_limit=100, fields=None):
+    return _run_sync(aggregate_repo_data_async(owner, repo, commit_limit, fields))
 
 def save_to_file(data, filename="repo_data.json"):
     with open(filename, "w") as file:
@@ -164,4 +527,4 @@ if __name__ == "__main__":
         repo_data = aggregate_repo_data(owner, repo, commit_limit=100)
         save_to_file(repo_data)
     except Exception as e:
-        logger.error(f"Failed to aggregate data: {e}")
\ No newline at end of file
+        logger.error(f"Failed to aggregate data: {e}")
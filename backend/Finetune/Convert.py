@@ -1,18 +1,261 @@
+import os
+import bz2
+import glob
+import gzip
+import lzma
 import json
+import argparse
+from collections import deque
+from multiprocessing import Pool
 
-input_file = "finetuning_data.jsonl"  # Replace with your input file name
-output_file = "chat_formatted_data.jsonl"
-
-with open(input_file, "r", encoding="utf-8") as infile, open(output_file, "w", encoding="utf-8") as outfile:
-    for line in infile:
-        data = json.loads(line)
-        chat_data = {
-            "messages": [
-                {"role": "system", "content": "You are a professional resume builder."},
-                {"role": "user", "content": data["prompt"]},
-                {"role": "assistant", "content": data["completion"]}
-            ]
-        }
-        outfile.write(json.dumps(chat_data) + "\n")
-
-print(f"Chat-formatted data saved to {output_file}.")
+# Faster JSON parsing/serialization when orjson is installed
+try:
+    import orjson
+
+    def loads(text):
+        return orjson.loads(text)
+
+    def dumps(obj):
+        return orjson.dumps(obj).decode("utf-8")
+except ImportError:
+    loads = json.loads
+
+    def dumps(obj):
+        return json.dumps(obj, ensure_ascii=False)
+
+# Exact token counts when tiktoken is installed, otherwise about four characters per token
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+
+    def count_tokens(text):
+        return len(_encoding.encode(text))
+except ImportError:
+    def count_tokens(text):
+        return (len(text) + 3) // 4
+
+SYSTEM_PROMPT = "You are a professional resume builder."
+# Per-example limit of the fine-tuning API; longer examples are rejected at upload time
+MAX_EXAMPLE_TOKENS = int(os.getenv("CONVERT_MAX_TOKENS", "16385"))
+# Lines handed to a worker at a time
+CHUNK_LINES = int(os.getenv("CONVERT_CHUNK_LINES", "2000"))
+# Chunks read ahead per worker; bounds how much of the input is held in memory
+CHUNKS_PER_WORKER = int(os.getenv("CONVERT_CHUNKS_PER_WORKER", "2"))
+# Tokens the chat format adds per message and per example
+MESSAGE_OVERHEAD_TOKENS = 4
+EXAMPLE_OVERHEAD_TOKENS = 3
+
+_OPENERS = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+
+def open_text(path, mode="r", errors="strict"):
+    """Open a (possibly gzip/bz2/xz compressed, by extension) text file as UTF-8."""
+    opener = _OPENERS.get(os.path.splitext(path)[1].lower())
+    if opener is not None:
+        return opener(path, mode + "t", encoding="utf-8", errors=errors)
+    return open(path, mode, encoding="utf-8", errors=errors)
+
+def convert_record(data, system_prompt=SYSTEM_PROMPT, max_tokens=MAX_EXAMPLE_TOKENS):
+    """
+    Convert a {"prompt", "completion"} record into the chat fine-tuning format.
+    :return: (chat_data, token_count)
+    :raises ValueError: If the record is incomplete or longer than `max_tokens`.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("record is not a JSON object")
+    prompt, completion = data.get("prompt"), data.get("completion")
+    if not isinstance(prompt, str) or not prompt.strip():
+        raise ValueError("missing or empty prompt")
+    if not isinstance(completion, str) or not completion.strip():
+        raise ValueError("missing or empty completion")
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt},
+        {"role": "assistant", "content": completion}
+    ]
+    tokens = EXAMPLE_OVERHEAD_TOKENS + sum(
+        MESSAGE_OVERHEAD_TOKENS + count_tokens(message["content"]) for message in messages
+    )
+    if tokens > max_tokens:
+        raise ValueError(f"example has {tokens} tokens, limit is {max_tokens}")
+    return {"messages": messages}, tokens
+
+def convert_lines(task):
+    """
+    Convert a chunk of input lines (runs in worker processes).
+    :param task: (first_line_number, lines, system_prompt, max_tokens)
+    :return: A list of (line_number, output_line, tokens, error) for the non-blank lines.
+    """
+    first_line, lines, system_prompt, max_tokens = task
+    results = []
+    for line_number, line in enumerate(lines, start=first_line):
+        if not line.strip():
+            continue
+        try:
+            line.encode("utf-8")
+        except UnicodeEncodeError:
+            # Undecodable bytes were read as surrogates; keep the rest of the line readable in the rejects
+            results.append((line_number, line.encode("utf-8", "surrogateescape").decode("utf-8", "replace").rstrip("\n"),
+                            0, "line is not valid UTF-8"))
+            continue
+        try:
+            chat_data, tokens = convert_record(loads(line), system_prompt, max_tokens)
+            results.append((line_number, dumps(chat_data), tokens, None))
+        except ValueError as e:  # also covers JSON decode errors from both backends
+            results.append((line_number, line.rstrip("\n"), 0, str(e)))
+    return results
+
+def read_chunks(path, chunk_lines, system_prompt, max_tokens):
+    """
+    Stream the input file as conversion tasks of `chunk_lines` lines.
+    Bytes that are not valid UTF-8 are passed on as surrogates so convert_lines can reject their line.
+    """
+    with open_text(path, errors="surrogateescape") as infile:
+        chunk, first_line = [], 1
+        for line_number, line in enumerate(infile, start=1):
+            chunk.append(line)
+            if len(chunk) >= chunk_lines:
+                yield first_line, chunk, system_prompt, max_tokens
+                chunk, first_line = [], line_number + 1
+        if chunk:
+            yield first_line, chunk, system_prompt, max_tokens
+
+def ordered_results(pool, tasks, window):
+    """
+    Convert `tasks` on `pool`, yielding results in input order.
+    At most `window` chunks are queued or being converted at once, so the input is only read as fast as it is written.
+    """
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.apply_async(convert_lines, (task,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+class ShardWriter:
+    """
+    Writes lines to `path`, or to numbered shards (name-00000.jsonl...) of at most `shard_bytes`
+    uncompressed bytes each when a shard size is given.
+    The first file is created right away, so a run that converts nothing still replaces earlier output,
+    and shards left by an earlier run are removed so none of them outlive it.
+    """
+
+    def __init__(self, path, shard_bytes=None):
+        self.path = path
+        self.shard_bytes = shard_bytes
+        self.paths = []
+        self._file = None
+        self._written = 0
+        if shard_bytes:
+            for stale in glob.glob(self._shard_path(None)):
+                os.remove(stale)
+        self._next_shard()
+
+    def _next_shard(self):
+        self.close()
+        path = self._shard_path(len(self.paths))
+        self._file = open_text(path, "w")
+        self.paths.append(path)
+        self._written = 0
+
+    def _shard_path(self, index):
+        """Path of shard `index`, or a glob pattern matching every shard when `index` is None."""
+        if not self.shard_bytes:
+            return self.path
+        base, ext = os.path.splitext(self.path)
+        compression = ""
+        if ext.lower() in _OPENERS:
+            compression = ext
+            base, ext = os.path.splitext(base)
+        if index is None:
+            return f"{glob.escape(base)}-{'[0-9]' * 5}{glob.escape(ext + compression)}"
+        return f"{base}-{index:05d}{ext}{compression}"
+
+    def write(self, line):
+        data = line + "\n"
+        size = len(data.encode("utf-8"))
+        if self.shard_bytes and self._written and self._written + size > self.shard_bytes:
+            self._next_shard()
+        self._file.write(data)
+        self._written += size
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+def convert_file(input_file, output_file, system_prompt=SYSTEM_PROMPT, max_tokens=MAX_EXAMPLE_TOKENS,
+                 shard_bytes=None, workers=1, chunk_lines=CHUNK_LINES, rejects_file=None):
+    """
+    Stream a prompt/completion JSONL file into chat-formatted fine-tuning data.
+    Malformed, incomplete and oversized records are written to `rejects_file` with their line number
+    and reason instead of stopping the run.
+
+    :param input_file: Input JSONL (.gz, .bz2 and .xz are decompressed on the fly).
+    :param output_file: Output JSONL (compressed by extension); numbered shards when `shard_bytes` is set.
+    :param shard_bytes: Maximum uncompressed size of each output shard.
+    :param workers: Processes used to parse and convert chunks (1 converts in-process).
+    :param rejects_file: Side file for bad records (defaults to <output>.rejects.jsonl).
+    :return: A dictionary of counts, token totals and the written shard paths.
+    """
+    rejects_file = rejects_file or f"{output_file}.rejects.jsonl"
+    stats = {"converted": 0, "rejected": 0, "tokens": 0, "max_tokens": 0}
+    tasks = read_chunks(input_file, chunk_lines, system_prompt, max_tokens)
+    # Rejects from an earlier run would otherwise be mistaken for this run's
+    if os.path.exists(rejects_file):
+        os.remove(rejects_file)
+    writer = ShardWriter(output_file, shard_bytes)
+    rejects = None
+    pool = Pool(workers) if workers > 1 else None
+    try:
+        # Results come back in chunk order, so the output follows the input order
+        results = ordered_results(pool, tasks, workers * CHUNKS_PER_WORKER) if pool else map(convert_lines, tasks)
+        for chunk in results:
+            for line_number, line, tokens, error in chunk:
+                if error is None:
+                    writer.write(line)
+                    stats["converted"] += 1
+                    stats["tokens"] += tokens
+                    stats["max_tokens"] = max(stats["max_tokens"], tokens)
+                    continue
+                if rejects is None:
+                    rejects = open_text(rejects_file, "w")
+                rejects.write(dumps({"line": line_number, "error": error, "record": line}) + "\n")
+                stats["rejected"] += 1
+    finally:
+        writer.close()
+        if rejects is not None:
+            rejects.close()
+        if pool is not None:
+            pool.close()
+            pool.join()
+    stats["outputs"] = writer.paths
+    stats["rejects_file"] = rejects_file if stats["rejected"] else None
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert prompt/completion JSONL into chat fine-tuning data.")
+    parser.add_argument("input", nargs="?", default="finetuning_data.jsonl", help="Input JSONL (optionally .gz/.bz2/.xz).")
+    parser.add_argument("output", nargs="?", default="chat_formatted_data.jsonl", help="Output JSONL (optionally compressed).")
+    parser.add_argument("--system-prompt", default=SYSTEM_PROMPT)
+    parser.add_argument("--max-tokens", type=int, default=MAX_EXAMPLE_TOKENS, help="Reject examples longer than this.")
+    parser.add_argument("--shard-mb", type=float, help="Split the output into shards of about this many MB.")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for large files.")
+    parser.add_argument("--chunk-lines", type=int, default=CHUNK_LINES)
+    parser.add_argument("--rejects", help="Side file for bad records (default: <output>.rejects.jsonl).")
+    args = parser.parse_args()
+
+    result = convert_file(
+        args.input,
+        args.output,
+        system_prompt=args.system_prompt,
+        max_tokens=args.max_tokens,
+        shard_bytes=int(args.shard_mb * 1024 * 1024) if args.shard_mb else None,
+        workers=args.workers,
+        chunk_lines=args.chunk_lines,
+        rejects_file=args.rejects,
+    )
+    print(f"Converted {result['converted']} examples ({result['tokens']} tokens, longest {result['max_tokens']}) "
+          f"into {', '.join(result['outputs']) or 'no output'}.")
+    if result["rejected"]:
+        print(f"Rejected {result['rejected']} records; see {result['rejects_file']}.")
@@ -1,8 +1,11 @@
 import os
 import json
+import time
+import asyncio
+import argparse
 from dotenv import load_dotenv
-from Fetch import aggregate_repo_data
-from model import generate_star_resume_section
+from Fetch import aggregate_repo_data_async, close_async_client
+from model import STAR_PROMPT_FIELDS, generate_star_resume_section_async
 
 # Load environment variables
 load_dotenv()
@@ -10,6 +13,12 @@ load_dotenv()
 # GitHub and OpenAI tokens
 github_token = os.getenv("GITHUB_TOKEN")
 
+# Per-stage concurrency: GitHub fetches and STAR generations are limited separately
+DATASET_FETCH_CONCURRENCY = int(os.getenv("DATASET_FETCH_CONCURRENCY", "8"))
+DATASET_GENERATE_CONCURRENCY = int(os.getenv("DATASET_GENERATE_CONCURRENCY", "4"))
+# Seconds between progress lines
+DATASET_PROGRESS_INTERVAL = float(os.getenv("DATASET_PROGRESS_INTERVAL", "10"))
+
 # Example repositories for fine-tuning data
 REPOSITORIES = [
     {"owner": "PhongCT1105", "repo": "SyntheSearch"},
@@ -18,34 +27,44 @@ REPOSITORIES = [
     {"owner": "PhongCT1105", "repo": "S-P_500_Stock_Prediction"}
 ]
 
-def create_finetuning_data(repos, output_file="finetuning_data.jsonl"):
+def load_repositories(path):
     """
-    Create fine-tuning dataset by fetching repository details and generating STAR-based resume sections.
-    
-    :param repos: List of repositories with 'owner' and 'repo' keys.
-    :param output_file: File to save the fine-tuning dataset in JSONL format.
+    Read a repository list: one "owner/repo" (or a JSON object with owner and repo) per line.
+    Blank lines and lines starting with # are ignored.
     """
-    fine_tuning_data = []
-
-    for repo in repos:
-        owner = repo["owner"]
-        repo_name = repo["repo"]
-        print(f"Processing repository: {owner}/{repo_name}...")
-        
-        # Fetch repository data
-        repo_data = aggregate_repo_data(owner, repo_name)
-        if not repo_data:
-            print(f"Failed to fetch data for {owner}/{repo_name}. Skipping.")
-            continue
-        
-        # Generate STAR-based resume section
-        star_section = generate_star_resume_section(repo_data)
-        if not star_section:
-            print(f"Failed to generate STAR section for {owner}/{repo_name}. Skipping.")
-            continue
-        
-        # Format data for fine-tuning
-        prompt = f"""
+    repos = []
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                entry = json.loads(line)
+                repos.append({"owner": entry["owner"], "repo": entry["repo"]})
+            else:
+                owner, _, repo = line.partition("/")
+                repos.append({"owner": owner.strip(), "repo": repo.strip()})
+    return repos
+
+def completed_repositories(output_file):
+    """Repositories that already have a record in `output_file` (as "owner/repo")."""
+    done = set()
+    if os.path.exists(output_file):
+        with open(output_file, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    done.add(json.loads(line)["repo"])
+                except (json.JSONDecodeError, KeyError):
+                    continue
+    return done
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token) for throughput reporting."""
+    return len(text) // 4
+
+def build_record(owner, repo_name, repo_data, star_section):
+    """Format one fine-tuning example."""
+    prompt = f"""
         Create a project section for a resume using the STAR (Situation, Task, Action, Result) method.
         Repository Details:
         Repository Name: {repo_data['Repository Name']}
@@ -54,21 +73,145 @@ def create_finetuning_data(repos, output_file="finetuning_data.jsonl"):
         Languages: {json.dumps(repo_data['Languages'], indent=2)}
         Recent Commit Messages: {', '.join(repo_data['Recent Commit Messages'][:5])}
         """
-        completion = "\n".join([
-            f"- {desc}" for desc in star_section["Descriptions"]
-        ])
-        
-        fine_tuning_data.append({
-            "prompt": prompt.strip(),
-            "completion": completion.strip()
-        })
-    
-    # Save the dataset to a JSONL file
-    with open(output_file, "w") as file:
-        for entry in fine_tuning_data:
-            file.write(json.dumps(entry) + "\n")
-    
+    completion = "\n".join([
+        f"- {desc}" for desc in star_section["Descriptions"]
+    ])
+    return {
+        "repo": f"{owner}/{repo_name}",
+        "prompt": prompt.strip(),
+        "completion": completion.strip()
+    }
+
+class Progress:
+    """Counts finished repositories and (estimated) tokens and prints throughput."""
+
+    def __init__(self, total):
+        self.total = total
+        self.written = 0
+        self.failed = 0
+        self.tokens = 0
+        self.started = time.monotonic()
+
+    def line(self):
+        minutes = max(time.monotonic() - self.started, 1e-9) / 60
+        return (f"{self.written + self.failed}/{self.total} repos ({self.written} written, {self.failed} failed) | "
+                f"{self.written / minutes:.1f} repos/min | ~{self.tokens / minutes:.0f} tokens/min (estimated from characters)")
+
+async def create_finetuning_data_async(repos, output_file="finetuning_data.jsonl",
+                                       fetch_concurrency=DATASET_FETCH_CONCURRENCY,
+                                       generate_concurrency=DATASET_GENERATE_CONCURRENCY):
+    """
+    Build the fine-tuning dataset as a two-stage pipeline: fetch workers aggregate repository data
+    and hand it to generation workers through a bounded queue, so fetching runs ahead of generation
+    without piling up. Each record is appended to `output_file` as soon as it is finished, and
+    repositories already in the file are skipped, so an interrupted run picks up where it stopped.
+
+    :param repos: List of repositories with 'owner' and 'repo' keys.
+    :param output_file: File to append the fine-tuning dataset to in JSONL format.
+    :param fetch_concurrency: Repositories fetched from GitHub at once.
+    :param generate_concurrency: STAR sections generated at once.
+    :return: The number of records written in this run.
+    """
+    done = completed_repositories(output_file)
+    pending = [repo for repo in repos if f"{repo['owner']}/{repo['repo']}" not in done]
+    if len(pending) < len(repos):
+        print(f"Skipping {len(repos) - len(pending)} repositories already in {output_file}.")
+
+    progress = Progress(len(pending))
+    repo_queue = asyncio.Queue()
+    for repo in pending:
+        repo_queue.put_nowait(repo)
+    # Bounded so fetched data waiting for generation stays small
+    data_queue = asyncio.Queue(maxsize=generate_concurrency * 2)
+
+    async def fetch_worker():
+        while True:
+            try:
+                repo = repo_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            owner, repo_name = repo["owner"], repo["repo"]
+            print(f"Processing repository: {owner}/{repo_name}...")
+            try:
+                # Fetch repository data
+                repo_data = await aggregate_repo_data_async(owner, repo_name, fields=STAR_PROMPT_FIELDS)
+            except Exception as e:
+                print(f"Failed to fetch data for {owner}/{repo_name}: {e}. Skipping.")
+                progress.failed += 1
+                continue
+            await data_queue.put((owner, repo_name, repo_data))
+
+    async def generate_worker(output):
+        while True:
+            item = await data_queue.get()
+            if item is None:
+                return
+            owner, repo_name, repo_data = item
+            # Generate STAR-based resume section
+            star_section = await generate_star_resume_section_async(repo_data)
+            try:
+                record = build_record(owner, repo_name, repo_data, star_section) if star_section else None
+            except (KeyError, TypeError) as e:
+                print(f"Malformed data for {owner}/{repo_name}: {e}")
+                record = None
+            if record is None:
+                print(f"Failed to generate STAR section for {owner}/{repo_name}. Skipping.")
+                progress.failed += 1
+                continue
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+            progress.written += 1
+            progress.tokens += estimate_tokens(record["prompt"]) + estimate_tokens(record["completion"])
+
+    async def report():
+        while True:
+            await asyncio.sleep(DATASET_PROGRESS_INTERVAL)
+            print(progress.line())
+
+    async def fetch_stage():
+        await asyncio.gather(*(fetch_worker() for _ in range(fetch_concurrency)))
+        for _ in range(generate_concurrency):
+            await data_queue.put(None)
+
+    with open(output_file, "a", encoding="utf-8") as output:
+        reporter = asyncio.create_task(report())
+        stages = [asyncio.create_task(fetch_stage())]
+        stages += [asyncio.create_task(generate_worker(output)) for _ in range(generate_concurrency)]
+        try:
+            # Supervise both stages together: a failure in one cancels the other instead of leaving
+            # fetch workers blocked on the full queue or generate workers waiting for sentinels
+            done, _ = await asyncio.wait(stages, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            reporter.cancel()
+            for task in stages:
+                task.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+            await close_async_client()
+
+    print(progress.line())
     print(f"Fine-tuning dataset saved to {output_file}.")
+    return progress.written
+
+def create_finetuning_data(repos, output_file="finetuning_data.jsonl", **kwargs):
+    """
+    Create fine-tuning dataset by fetching repository details and generating STAR-based resume sections
+    (see create_finetuning_data_async).
+
+    :param repos: List of repositories with 'owner' and 'repo' keys.
+    :param output_file: File to save the fine-tuning dataset in JSONL format.
+    """
+    return asyncio.run(create_finetuning_data_async(repos, output_file, **kwargs))
 
 if __name__ == "__main__":
-    create_finetuning_data(REPOSITORIES)
+    parser = argparse.ArgumentParser(description="Build a STAR fine-tuning dataset from GitHub repositories.")
+    parser.add_argument("--repos", help="File with one owner/repo per line (defaults to the built-in examples).")
+    parser.add_argument("--output", default="finetuning_data.jsonl")
+    parser.add_argument("--fetch-concurrency", type=int, default=DATASET_FETCH_CONCURRENCY)
+    parser.add_argument("--generate-concurrency", type=int, default=DATASET_GENERATE_CONCURRENCY)
+    args = parser.parse_args()
+
+    repositories = load_repositories(args.repos) if args.repos else REPOSITORIES
+    create_finetuning_data(repositories, args.output, fetch_concurrency=args.fetch_concurrency,
+                           generate_concurrency=args.generate_concurrency)
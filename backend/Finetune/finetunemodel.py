@@ -1,18 +1,20 @@
-import os
-import google.generativeai as genai
-from dotenv import load_dotenv
 import json
+from dotenv import load_dotenv
+from llm import InvalidOutputError, get_gateway
+from model import STAR_LABELS, STAR_MODEL_NAME, star_components, validate_star_response
 
 # Load environment variables
 load_dotenv()
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-genai.configure(api_key=GOOGLE_API_KEY)
 
 def generate_star_resume_section(repo_data):
     """
     Generate a professional and concise STAR-based project description for a resume using Gemini API.
+    Output without all four STAR components is retried (up to LLM_MAX_ATTEMPTS calls) instead of
+    being dropped. The call is blocking and goes straight to the model, without the gateway's output
+    cache, deadline or concurrency slots.
     :param repo_data: Dictionary containing GitHub repository details.
     :return: A dictionary with Name, Date, Languages, and Descriptions.
+    :raises ValueError: If no well-formed answer arrives or repo_data is incomplete.
     """
     try:
         # Prepare the prompt with STAR structure
@@ -36,25 +38,12 @@ def generate_star_resume_section(repo_data):
         Ensure the output is concise, professional, and directly applicable to a resume.
         """
 
-        # Call Gemini API
-        model = genai.GenerativeModel("gemini-pro")
-        response = model.generate_content(prompt)
-        result_text = response.text.strip()
+        # Call Gemini API through the gateway, which retries output failing STAR validation
+        result_text = get_gateway().generate_blocking(STAR_MODEL_NAME, prompt, validate=validate_star_response)
 
         # Parse STAR components
-        descriptions = []
-        for line in result_text.split("\n"):
-            if ": " in line:
-                try:
-                    component = line.split(": ", 1)[1].strip()
-                    descriptions.append(component)
-                except IndexError:
-                    continue
-
-        # Validate 4 STAR components
-        if len(descriptions) != 4:
-            print(f"Warning: Expected 4 STAR components, got {len(descriptions)}. Response: {result_text}")
-            return None
+        components = star_components(result_text)
+        descriptions = [components[label] for label in STAR_LABELS]
 
         # Return structured data
         return {
@@ -64,9 +53,9 @@ def generate_star_resume_section(repo_data):
             "Descriptions": descriptions  # List for FastAPI compatibility
         }
 
-    except genai.GenerationError as e:
+    except InvalidOutputError as e:
         print(f"Gemini API error: {e}")
-        raise ValueError("Failed to generate content from Gemini API")
+        raise ValueError("Gemini API did not return the four STAR components")
     except KeyError as e:
         print(f"Missing key in repo_data: {e}")
         raise ValueError(f"Invalid repository data: missing {e}")
@@ -0,0 +1,209 @@
+import json
+import time
+import random
+import base64
+import hashlib
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Commit subjects cycled through by the fake repositories (a mix of informative ones and noise)
+COMMIT_MESSAGES = [
+    "Add async GitHub client with connection pooling",
+    "fix typo",
+    "Implement STAR prompt builder",
+    "Merge pull request #{n} from dev/feature",
+    "Optimize vector search with IVF index",
+    "Update README.md",
+    "Refactor cache layer into DiskCache",
+    "feat(api): add batch endpoint for repositories",
+    "Bump httpx from 0.27.0 to 0.28.1",
+    "Integrate Gemini model for cover letters",
+]
+
+README_SECTION = """## Features
+- Fetches repository data from the GitHub API and summarizes it.
+- Generates resume sections with a language model.
+- Searches job postings with vector and keyword search.
+
+## Installation
+Run `pip install -r requirements.txt` and start the server with uvicorn.
+
+"""
+
+class FakeRepository:
+    """Deterministic repository content of a configurable size."""
+
+    def __init__(self, owner, repo, files, commits, readme_bytes):
+        self.owner = owner
+        self.repo = repo
+        self.files = [
+            f"src/package_{index // 25}/module_{index}.{('py', 'ts', 'md', 'json')[index % 4]}"
+            for index in range(max(0, files - 3))
+        ] + ["README.md", "requirements.txt", "Dockerfile"][:files]
+        self.commits = [
+            COMMIT_MESSAGES[index % len(COMMIT_MESSAGES)].format(n=index) + ("" if index < len(COMMIT_MESSAGES) else f" ({index})")
+            for index in range(commits)
+        ]
+        intro = f"# {repo}\n\n{repo} is a benchmark repository owned by {owner}.\n\n"
+        self.readme = (intro + README_SECTION * max(1, readme_bytes // len(README_SECTION)))[:max(readme_bytes, len(intro))]
+
+    def info(self):
+        return {
+            "name": self.repo,
+            "full_name": f"{self.owner}/{self.repo}",
+            "description": f"Benchmark repository {self.owner}/{self.repo}",
+            "topics": ["benchmark", "fastapi", "github-api"],
+            "created_at": "2023-01-15T10:00:00Z",
+            "pushed_at": "2024-06-01T12:00:00Z",
+            "default_branch": "main",
+        }
+
+    def languages(self):
+        return {"Python": 120000, "TypeScript": 45000, "Dockerfile": 800}
+
+    def tree(self):
+        directories = sorted({path.rsplit("/", 1)[0] for path in self.files if "/" in path})
+        return [{"path": path, "type": "tree"} for path in directories] + [{"path": path, "type": "blob"} for path in self.files]
+
+    def contents(self, path):
+        """Directory listing in the contents API format."""
+        prefix = f"{path}/" if path else ""
+        entries = {}
+        for file_path in self.files:
+            if not file_path.startswith(prefix):
+                continue
+            name = file_path[len(prefix):].split("/", 1)[0]
+            kind = "dir" if "/" in file_path[len(prefix):] else "file"
+            entries[name] = {"name": name, "path": prefix + name, "type": kind}
+        return list(entries.values())
+
+class RateLimiter:
+    """GitHub-style primary rate limit: `limit` requests per token per `window` seconds."""
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def take(self, token):
+        """Count a request; returns (allowed, remaining, reset_epoch)."""
+        now = time.time()
+        with self._lock:
+            reset_at, used = self._windows.get(token, (now + self.window, 0))
+            if reset_at <= now:
+                reset_at, used = now + self.window, 0
+            allowed = used < self.limit
+            if allowed:
+                used += 1
+            self._windows[token] = (reset_at, used)
+        return allowed, self.limit - used, int(reset_at)
+
+def make_handler(files=200, commits=300, readme_bytes=4096, latency=0.05, jitter=0.02,
+                 rate_limit=5000, rate_window=3600, truncate_tree=False):
+    """
+    Build a request handler serving the GitHub REST endpoints used by Fetch.py.
+    :param files: Files per repository.
+    :param commits: Commits per repository.
+    :param readme_bytes: README size.
+    :param latency: Seconds added to every response (plus up to `jitter` seconds).
+    :param rate_limit: Requests per token per `rate_window` seconds before 403s.
+    :param truncate_tree: Report the recursive tree as truncated so clients walk the contents API.
+    """
+    limiter = RateLimiter(rate_limit, rate_window)
+    repositories = {}
+    lock = threading.Lock()
+
+    def repository(owner, repo):
+        with lock:
+            if (owner, repo) not in repositories:
+                repositories[(owner, repo)] = FakeRepository(owner, repo, files, commits, readme_bytes)
+            return repositories[(owner, repo)]
+
+    class FakeGitHubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are separate writes; without this Nagle's algorithm adds ~40ms per response
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, headers=None):
+            data = json.dumps(body).encode("utf-8")
+            etag = '"' + hashlib.md5(data).hexdigest() + '"'
+            if status == 200 and self.headers.get("If-None-Match") == etag:
+                status, data = 304, b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            if status in (200, 304):
+                self.send_header("ETag", etag)
+            for name, value in (headers or {}).items():
+                self.send_header(name, str(value))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            time.sleep(latency + random.uniform(0, jitter))
+            token = self.headers.get("Authorization", "anonymous")
+            allowed, remaining, reset_at = limiter.take(token)
+            rate_headers = {"X-RateLimit-Limit": rate_limit, "X-RateLimit-Remaining": remaining, "X-RateLimit-Reset": reset_at}
+            if not allowed:
+                return self._send(403, {"message": "API rate limit exceeded"}, rate_headers)
+
+            url = urlsplit(self.path)
+            query = parse_qs(url.query)
+            parts = url.path.strip("/").split("/")
+            if len(parts) < 3 or parts[0] != "repos":
+                return self._send(404, {"message": "Not Found"}, rate_headers)
+            data = repository(parts[1], parts[2])
+            rest = parts[3:]
+            if not rest:
+                body = data.info()
+            elif rest == ["languages"]:
+                body = data.languages()
+            elif rest == ["contents", "README.md"]:
+                body = {"name": "README.md", "encoding": "base64", "content": base64.b64encode(data.readme.encode("utf-8")).decode("ascii")}
+            elif rest[0] == "contents":
+                body = data.contents("/".join(rest[1:]))
+            elif rest[:2] == ["git", "trees"]:
+                body = {"tree": [] if truncate_tree else data.tree(), "truncated": truncate_tree}
+            elif rest == ["commits"]:
+                per_page = int(query.get("per_page", ["30"])[0])
+                page = int(query.get("page", ["1"])[0])
+                messages = data.commits[(page - 1) * per_page:page * per_page]
+                body = [{"sha": f"{index:040x}", "commit": {"message": message}} for index, message in enumerate(messages)]
+            else:
+                return self._send(404, {"message": "Not Found"}, rate_headers)
+            self._send(200, body, rate_headers)
+
+    return FakeGitHubHandler
+
+def serve(port=0, ready=None, **options):
+    """
+    Run the fake GitHub API until the process is stopped.
+    :param ready: Optional multiprocessing queue that receives the bound port once listening.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(**options))
+    server.daemon_threads = True
+    if ready is not None:
+        ready.put(server.server_address[1])
+    server.serve_forever()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fake GitHub REST API for benchmarks.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--commits", type=int, default=300)
+    parser.add_argument("--readme-bytes", type=int, default=4096)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every response.")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--rate-limit", type=int, default=5000, help="Requests per token per window.")
+    parser.add_argument("--rate-window", type=float, default=3600)
+    parser.add_argument("--truncate-tree", action="store_true")
+    args = parser.parse_args()
+    print(f"Fake GitHub API on http://127.0.0.1:{args.port}")
+    serve(args.port, files=args.files, commits=args.commits, readme_bytes=args.readme_bytes, latency=args.latency,
+          jitter=args.jitter, rate_limit=args.rate_limit, rate_window=args.rate_window, truncate_tree=args.truncate_tree)
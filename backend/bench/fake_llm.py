@@ -0,0 +1,91 @@
+import time
+import random
+import asyncio
+
+STAR_RESPONSE = (
+    "- Situation: The team had no quick way to turn its GitHub projects into resume material.\n"
+    "- Task: Build a service that summarizes a repository and writes a resume section from it.\n"
+    "- Action: Implemented an async FastAPI backend that aggregates the GitHub API and prompts a language model.\n"
+    "- Result: Resume sections are generated in seconds and reused across applications."
+)
+COVER_LETTER_PARAGRAPH = (
+    "I am excited to apply for this position. My experience building backend services, data pipelines "
+    "and machine learning features matches the role, and I would welcome the chance to contribute. "
+)
+
+class UsageMetadata:
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+
+class FakeResponse:
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+class FakeGenerativeModel:
+    """
+    Stand-in for genai.GenerativeModel that answers after a first-token latency and then produces
+    text at a fixed token rate (tokens are counted as four characters).
+    STAR prompts get a four-line STAR answer; other prompts get a cover letter of about `response_tokens`.
+    A `slow_rate` share of calls takes `slow_factor` times longer and an `invalid_rate` share returns
+    malformed output, to exercise the gateway's hedging and validation retries.
+    """
+
+    def __init__(self, model_name, tokens_per_second=80.0, first_token_latency=0.3, response_tokens=250, chunk_tokens=16,
+                 slow_rate=0.0, slow_factor=10.0, invalid_rate=0.0):
+        self.model_name = model_name
+        self.tokens_per_second = tokens_per_second
+        self.first_token_latency = first_token_latency
+        self.response_tokens = response_tokens
+        self.chunk_tokens = chunk_tokens
+        self.slow_rate = slow_rate
+        self.slow_factor = slow_factor
+        self.invalid_rate = invalid_rate
+
+    def _text(self, prompt):
+        if random.random() < self.invalid_rate:
+            return "I am sorry, I cannot help with that."
+        if "STAR" in prompt:
+            return STAR_RESPONSE
+        paragraphs = max(3, self.response_tokens * 4 // len(COVER_LETTER_PARAGRAPH))
+        return "Dear Hiring Manager,\n\n" + "\n\n".join([COVER_LETTER_PARAGRAPH.strip()] * paragraphs) + "\n\nSincerely,\nApplicant"
+
+    def _usage(self, prompt, text):
+        return UsageMetadata((len(prompt) + 3) // 4, (len(text) + 3) // 4)
+
+    def _duration(self, text):
+        duration = self.first_token_latency + (len(text) / 4) / self.tokens_per_second
+        return duration * self.slow_factor if random.random() < self.slow_rate else duration
+
+    def generate_content(self, prompt, **kwargs):
+        text = self._text(prompt)
+        time.sleep(self._duration(text))
+        return FakeResponse(text, self._usage(prompt, text))
+
+    async def generate_content_async(self, prompt, stream=False, **kwargs):
+        text = self._text(prompt)
+        if stream:
+            return FakeStream(self, prompt, text)
+        await asyncio.sleep(self._duration(text))
+        return FakeResponse(text, self._usage(prompt, text))
+
+class FakeStream:
+    """Async iterator of FakeResponse chunks, paced like the model."""
+
+    def __init__(self, model, prompt, text):
+        self.model = model
+        self.text = text
+        self.usage_metadata = model._usage(prompt, text)
+
+    async def __aiter__(self):
+        await asyncio.sleep(self.model.first_token_latency)
+        size = self.model.chunk_tokens * 4
+        for start in range(0, len(self.text), size):
+            chunk = self.text[start:start + size]
+            await asyncio.sleep((len(chunk) / 4) / self.model.tokens_per_second)
+            yield FakeResponse(chunk)
+
+def fake_model_factory(**options):
+    """Model factory for LLMGateway.model_factory that builds FakeGenerativeModel instances."""
+    return lambda model_name: FakeGenerativeModel(model_name, **options)
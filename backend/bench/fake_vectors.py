@@ -0,0 +1,74 @@
+import re
+import time
+import random
+import hashlib
+import numpy as np
+
+TITLES = ["Python Backend Engineer", "Machine Learning Engineer", "Data Scientist", "Frontend Developer",
+          "DevOps Engineer", "Full Stack Developer", "Data Engineer", "Product Manager", "Mobile Developer",
+          "Site Reliability Engineer"]
+SKILLS = ["Python", "FastAPI", "React", "TypeScript", "Kubernetes", "AWS", "PyTorch", "SQL", "Spark", "Go",
+          "Docker", "Terraform", "NLP", "LLMs", "Airflow", "Kotlin"]
+COMPANIES = ["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark Industries", "Wayne Enterprises", "Vandelay"]
+COUNTRIES = ["GB", "US", "DE", "FR", "NL", "CA"]
+
+class HashingEncoder:
+    """
+    Stand-in for the SentenceTransformers model: bag-of-words feature hashing into unit vectors.
+    Fast and deterministic, so vector search can be benchmarked without downloading a model;
+    `seconds_per_text` adds simulated model cost.
+    """
+
+    def __init__(self, dimension=384, seconds_per_text=0.0):
+        self.dimension = dimension
+        self.seconds_per_text = seconds_per_text
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def encode(self, texts, batch_size=64, normalize_embeddings=True, convert_to_numpy=True, **kwargs):
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                bucket = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+                vectors[row, bucket % self.dimension] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        if self.seconds_per_text:
+            time.sleep(self.seconds_per_text * len(texts))
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+def synthetic_jobs(count, seed=0):
+    """Job records ({"id", "metadata"}) shaped like the ones fetch_jobs.py writes."""
+    rng = random.Random(seed)
+    jobs = []
+    for index in range(count):
+        title = rng.choice(TITLES)
+        skills = rng.sample(SKILLS, 4)
+        salary_min = rng.randrange(30000, 120000, 5000)
+        salary_max = salary_min + rng.randrange(0, 40000, 5000)
+        jobs.append({
+            "id": str(index),
+            "metadata": {
+                "job_title": f"{title} at {rng.choice(COMPANIES)}",
+                "company_name": rng.choice(COMPANIES),
+                "country_code": rng.choice(COUNTRIES),
+                "salary_min": salary_min,
+                "salary_max": salary_max,
+                "base_salary": f"{salary_min:,.0f} - {salary_max:,.0f}",
+                "job_summary": f"We are hiring a {title} experienced with {', '.join(skills)}. "
+                               f"You will design, build and operate services used by millions of people.",
+            },
+        })
+    return jobs
+
+def build_local_index(store, encoder, count, namespace="ns1", batch_size=1000, seed=0):
+    """Fill a LocalVectorStore namespace with `count` synthetic jobs embedded by `encoder`."""
+    jobs = synthetic_jobs(count, seed)
+    for start in range(0, len(jobs), batch_size):
+        batch = jobs[start:start + batch_size]
+        vectors = encoder.encode([job["metadata"]["job_summary"] for job in batch])
+        store.upsert(
+            [{"id": job["id"], "values": vector, "metadata": job["metadata"]} for job, vector in zip(batch, vectors)],
+            namespace,
+        )
+    return len(jobs)
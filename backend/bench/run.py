@@ -0,0 +1,352 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+import multiprocessing
+import numpy as np
+
+try:
+    import resource  # peak RSS on Unix
+except ImportError:
+    resource = None
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from bench.fake_github import serve  # noqa: E402
+
+# Load profiles: scenario name -> (concurrency, requests)
+PROFILES = {
+    "smoke": {
+        "github-project": (4, 16),
+        "cover-letter": (4, 16),
+        "cover-letter-stream": (4, 16),
+        "search": (8, 200),
+        "search-hybrid": (8, 200),
+        "match-resume": (4, 40),
+    },
+    "load": {
+        "github-project": (32, 200),
+        "cover-letter": (32, 200),
+        "cover-letter-stream": (32, 200),
+        "search": (64, 2000),
+        "search-hybrid": (64, 2000),
+        "match-resume": (16, 400),
+    },
+    # Many concurrent requests for the same few repositories and queries
+    "spike": {
+        "github-project": (100, 200),
+        "search": (200, 2000),
+    },
+}
+
+QUERIES = [
+    "Python backend engineer", "machine learning engineer PyTorch", "data engineer Spark Airflow",
+    "frontend developer React TypeScript", "DevOps Kubernetes Terraform AWS", "site reliability engineer Go",
+    "full stack developer FastAPI React", "NLP engineer LLMs", "mobile developer Kotlin", "product manager",
+]
+RESUME = """Jane Doe - Software Engineer
+
+Experience
+Built FastAPI services in Python serving millions of requests, deployed with Docker and Kubernetes on AWS.
+Trained and deployed PyTorch models for NLP and search ranking; maintained Airflow and Spark pipelines.
+
+Projects
+Repo2Resume: turns GitHub repositories into resume sections with LLMs and vector search.
+
+Skills
+Python, FastAPI, SQL, PyTorch, React, TypeScript, Terraform, Go
+"""
+
+def scenario_request(name, index, repos):
+    """(path, JSON body) of request number `index` of a scenario."""
+    if name == "github-project":
+        return "/api/github-project", {"owner": "bench", "repo": f"repo-{index % repos}"}
+    if name in ("cover-letter", "cover-letter-stream"):
+        path = "/api/generate-cover-letter" + ("/stream" if name == "cover-letter-stream" else "")
+        return path, {
+            "fullName": "Jane Doe",
+            "jobTitle": QUERIES[index % len(QUERIES)],
+            "companyName": f"Company {index % repos}",
+            "jobDescription": "Build and operate backend services and data pipelines.",
+            "skills": ["Python", "FastAPI", "AWS"],
+        }
+    if name in ("search", "search-hybrid"):
+        return "/api/search", {
+            "query": QUERIES[index % len(QUERIES)],
+            "mode": "hybrid" if name == "search-hybrid" else "vector",
+            "pageSize": 10,
+        }
+    if name == "match-resume":
+        return "/api/match-resume", {"resume": RESUME + f"\nReference {index % repos}", "topK": 10}
+    raise ValueError(f"Unknown scenario: {name}")
+
+def rss_mb():
+    """Current resident set size in MB (Linux), falling back to the peak where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_mb()
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+def stage_snapshot():
+    """Observation counts and total seconds per instrumented stage (see metrics.py)."""
+    import metrics
+    stages = {
+        "github": (metrics.github_request_seconds, "endpoint"),
+        "repo_field": (metrics.repo_field_seconds, "field"),
+        "llm": (metrics.llm_request_seconds, "call"),
+        "llm_queue_wait": (metrics.llm_queue_wait_seconds, None),
+        "embedding": (metrics.embedding_seconds, None),
+        "vector_query": (metrics.vector_query_seconds, "operation"),
+    }
+    snapshot = {}
+    for stage, (histogram, label) in stages.items():
+        position = histogram.labelnames.index(label) if label else None
+        for key, (count, total) in histogram.totals().items():
+            name = stage if position is None else f"{stage}.{key[position]}"
+            previous = snapshot.get(name, (0, 0.0))
+            snapshot[name] = (previous[0] + count, previous[1] + total)
+    return snapshot
+
+def stage_delta(before, after):
+    delta = {}
+    for name, (count, total) in after.items():
+        count -= before.get(name, (0, 0.0))[0]
+        total -= before.get(name, (0, 0.0))[1]
+        if count:
+            delta[name] = {"count": count, "mean_ms": round(total / count * 1000, 2)}
+    return delta
+
+def summarize(latencies, errors, wall, concurrency):
+    latencies_ms = np.asarray(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "latency_ms": {
+            "mean": round(float(latencies_ms.mean()), 2),
+            "p50": round(float(np.percentile(latencies_ms, 50)), 2),
+            "p95": round(float(np.percentile(latencies_ms, 95)), 2),
+            "p99": round(float(np.percentile(latencies_ms, 99)), 2),
+            "max": round(float(latencies_ms.max()), 2),
+        },
+    }
+
+async def run_scenario(client, name, concurrency, total, repos):
+    """Send `total` requests of a scenario with `concurrency` in flight and summarize them."""
+    latencies, errors = [], 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for index in counter:
+            path, body = scenario_request(name, index, repos)
+            started = time.perf_counter()
+            try:
+                response = await client.post(path, json=body)
+                failed = response.status_code >= 400 or b"event: error" in response.content
+            except Exception:
+                failed = True
+            latencies.append(time.perf_counter() - started)
+            errors += failed
+
+    rss_before = rss_mb()
+    stages_before = stage_snapshot()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    result = summarize(latencies, errors, wall, concurrency)
+    rss_after = rss_mb()
+    result["memory_mb"] = {
+        "rss_after": round(rss_after, 1),
+        "rss_delta": round(rss_after - rss_before, 1),
+        "peak_rss": round(peak_rss_mb(), 1) if resource is not None else None,
+    }
+    result["stages"] = stage_delta(stages_before, stage_snapshot())
+    return result
+
+def configure_environment(args, github_url, work_dir):
+    """Point the service at the stand-ins; must run before the backend modules are imported."""
+    caches = "true" if args.caches else "false"
+    os.environ.update({
+        "GITHUB_API_URL": github_url,
+        "GITHUB_TOKENS": ",".join(f"bench-token-{index}" for index in range(args.github_tokens)),
+        "GITHUB_CACHE_ENABLED": caches,
+        "GITHUB_CACHE_PATH": os.path.join(work_dir, "github.sqlite"),
+        "LLM_CACHE_ENABLED": caches,
+        "LLM_CACHE_PATH": os.path.join(work_dir, "llm.sqlite"),
+        "GOOGLE_API_KEY": "bench",
+        "VECTOR_BACKEND": "local",
+        "LOCAL_INDEX_DIR": os.path.join(work_dir, "index"),
+        "ENABLE_LOCAL_TESTING": "false",
+        "STARTUP_WARMUP": "none",
+    })
+    if not args.caches:
+        os.environ.update({"QUERY_CACHE_SIZE": "0", "RESUME_CACHE_SIZE": "0"})
+
+async def run_benchmark(args, github_url, work_dir):
+    configure_environment(args, github_url, work_dir)
+    import httpx
+    import embeddings
+    import vectorstore
+    from llm import get_gateway
+    from bench.fake_llm import fake_model_factory
+    from bench.fake_vectors import HashingEncoder, build_local_index
+
+    if not args.real_embeddings:
+        embeddings.set_model(HashingEncoder(seconds_per_text=args.embedding_latency))
+    store = vectorstore.get_vector_store("local")
+    jobs = build_local_index(store, embeddings, args.jobs)
+    get_gateway().model_factory = fake_model_factory(
+        tokens_per_second=args.llm_tokens_per_second, first_token_latency=args.llm_first_token_latency,
+        slow_rate=args.llm_slow_rate, invalid_rate=args.llm_invalid_rate,
+    )
+    # The app's cold-start clock starts when main is imported, so the index build above must not count towards it
+    import main
+
+    results = {}
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            # Like a load balancer's health check, a trivial request comes first, so the cold start measures
+            # startup rather than the latency of whichever scenario happens to run first
+            await client.get("/")
+            for name, (concurrency, total) in PROFILES[args.profile].items():
+                if args.scenarios and name not in args.scenarios:
+                    continue
+                print(f"Running {name}: {total} requests, concurrency {concurrency}...")
+                results[name] = await run_scenario(client, name, concurrency, total, args.repos)
+                print(format_result(name, results[name]))
+    cold_start = main.cold_start.report()
+    print(f"  cold start: {cold_start['firstRequestSeconds']} s to the first request "
+          f"({cold_start['importSeconds']} s importing, target {cold_start['targetSeconds']} s)")
+    return results, jobs, cold_start
+
+def format_result(name, result):
+    latency = result["latency_ms"]
+    return (f"  {name:<20} {result['throughput_rps']:>8.1f} req/s  p50 {latency['p50']:>8.1f} ms  "
+            f"p95 {latency['p95']:>8.1f} ms  p99 {latency['p99']:>8.1f} ms  errors {result['errors']}  "
+            f"rss +{result['memory_mb']['rss_delta']} MB")
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline, tolerance):
+    """
+    Compare scenario results with a baseline report.
+    :param tolerance: Allowed relative slowdown (0.2 = 20%) in p50/p95/p99 latency and throughput.
+    :return: A list of regression messages.
+    """
+    regressions = []
+    for name, result in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        for percentile in ("p50", "p95", "p99"):
+            old, new = previous["latency_ms"][percentile], result["latency_ms"][percentile]
+            if old and new > old * (1 + tolerance):
+                regressions.append(f"{name}: {percentile} latency {old} ms -> {new} ms (+{(new / old - 1) * 100:.0f}%)")
+        old, new = previous["throughput_rps"], result["throughput_rps"]
+        if old and new < old * (1 - tolerance):
+            regressions.append(f"{name}: throughput {old} -> {new} req/s ({(new / old - 1) * 100:.0f}%)")
+        if result["errors"] > previous["errors"]:
+            regressions.append(f"{name}: errors {previous['errors']} -> {result['errors']}")
+    return regressions
+
+def main_cli():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the API against local stand-ins for GitHub, Gemini and the vector store.",
+        epilog="Example (from backend/): python -m bench.run --profile smoke --output bench/results/main.json, "
+               "then after a change: python -m bench.run --profile smoke --baseline bench/results/main.json "
+               "(exits with status 1 on a regression).",
+    )
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="smoke")
+    parser.add_argument("--scenarios", nargs="*", help="Only run these scenarios of the profile.")
+    parser.add_argument("--output", help="Write the JSON report here.")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression (default 20%%).")
+    parser.add_argument("--caches", action="store_true", help="Keep the GitHub, LLM and search caches on (warm runs).")
+    # Fake GitHub
+    parser.add_argument("--repos", type=int, default=4, help="Distinct repositories (and companies) requested.")
+    parser.add_argument("--repo-files", type=int, default=200)
+    parser.add_argument("--repo-commits", type=int, default=300)
+    parser.add_argument("--readme-bytes", type=int, default=4096)
+    parser.add_argument("--github-latency", type=float, default=0.05, help="Seconds per GitHub response.")
+    parser.add_argument("--github-jitter", type=float, default=0.02)
+    parser.add_argument("--github-rate-limit", type=int, default=5000, help="Requests per token per window.")
+    parser.add_argument("--github-rate-window", type=float, default=3600)
+    parser.add_argument("--github-tokens", type=int, default=1)
+    parser.add_argument("--truncate-tree", action="store_true", help="Force the contents-API directory walk.")
+    # Fake LLM and vector store
+    parser.add_argument("--llm-tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--llm-first-token-latency", type=float, default=0.3)
+    parser.add_argument("--llm-slow-rate", type=float, default=0.0, help="Share of generations that are 10x slower.")
+    parser.add_argument("--llm-invalid-rate", type=float, default=0.0, help="Share of generations with malformed output.")
+    parser.add_argument("--jobs", type=int, default=20000, help="Synthetic jobs in the local vector index.")
+    parser.add_argument("--embedding-latency", type=float, default=0.0, help="Simulated seconds per embedded text.")
+    parser.add_argument("--real-embeddings", action="store_true", help="Use EMBEDDING_MODEL instead of feature hashing.")
+    args = parser.parse_args()
+
+    ready = multiprocessing.Queue()
+    github = multiprocessing.Process(target=serve, kwargs={
+        "ready": ready, "files": args.repo_files, "commits": args.repo_commits, "readme_bytes": args.readme_bytes,
+        "latency": args.github_latency, "jitter": args.github_jitter, "rate_limit": args.github_rate_limit,
+        "rate_window": args.github_rate_window, "truncate_tree": args.truncate_tree,
+    }, daemon=True)
+    github.start()
+    try:
+        github_url = f"http://127.0.0.1:{ready.get(timeout=10)}"
+        with tempfile.TemporaryDirectory(prefix="bench-") as work_dir:
+            scenarios, jobs, cold_start = asyncio.run(run_benchmark(args, github_url, work_dir))
+    finally:
+        github.terminate()
+        github.join()
+
+    report = {
+        "version": 1,
+        "profile": args.profile,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")} | {"jobs": jobs},
+        "scenarios": scenarios,
+        "cold_start": cold_start,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+        print(f"Report saved to {args.output}.")
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        if baseline.get("profile") != args.profile:
+            print(f"Warning: baseline profile {baseline.get('profile')} differs from {args.profile}.")
+        regressions = compare(report, baseline, args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%}).")
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,193 @@
+import os
+import json
+import sqlite3
+import threading
+import time
+import logging
+from collections import OrderedDict, namedtuple
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CacheEntry = namedtuple("CacheEntry", ["value", "etag", "headers", "stored_at", "expires_at"])
+
+class DiskCache:
+    """
+    Persistent key/value cache backed by a local SQLite file.
+    Entries carry a TTL and an optional ETag for revalidation; once the stored size exceeds
+    `max_bytes` the least recently used entries are evicted.
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, table="entries"):
+        """
+        :param path: SQLite file to store entries in (its directory is created if needed).
+        :param max_bytes: Upper bound on the total size of stored values.
+        :param table: Table name, so several caches can share one file.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"""CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                etag TEXT,
+                headers TEXT,
+                stored_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL
+            )"""
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)")
+        self.counters = {"hits": 0, "stale": 0, "misses": 0, "evictions": 0}
+
+    def record(self, name, amount=1):
+        """Increment a named counter (callers add their own, e.g. "revalidated")."""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def get(self, key):
+        """
+        Look up an entry and mark it as recently used.
+        Expired entries are still returned so callers can revalidate them; check `expires_at`.
+        :return: A CacheEntry, or None if the key is not cached.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, etag, headers, stored_at, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.record("misses")
+                return None
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+        value, etag, headers, stored_at, expires_at = row
+        self.record("hits" if expires_at > now else "stale")
+        return CacheEntry(value, etag, json.loads(headers) if headers else {}, stored_at, expires_at)
+
+    def set(self, key, value, ttl, etag=None, headers=None):
+        """Store `value` (bytes or str) for `ttl` seconds, evicting old entries if over budget."""
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"""INSERT OR REPLACE INTO {self.table}
+                    (key, value, etag, headers, stored_at, expires_at, accessed_at, size)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (key, value, etag, json.dumps(headers or {}), now, now + ttl, now, len(value)),
+            )
+            self._evict()
+
+    def touch(self, key, ttl):
+        """Extend the lifetime of an entry that was revalidated upstream."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE {self.table} SET expires_at = ?, accessed_at = ? WHERE key = ?", (now + ttl, now, key)
+            )
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def _evict(self):
+        total = self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        rows = self._conn.execute(f"SELECT key, size FROM {self.table} ORDER BY accessed_at ASC").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        self.record("evictions", evicted)
+        logger.info(f"Evicted {evicted} entries from {self.path}:{self.table}")
+
+    def stats(self):
+        """Return hit/miss counters together with the current entry count and stored size."""
+        with self._lock:
+            entries, size = self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}"
+            ).fetchone()
+        lookups = self.counters["hits"] + self.counters["stale"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "hit_ratio": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
+
+class TTLCache:
+    """
+    Bounded in-memory cache for values that are cheap to keep but expensive to recompute
+    (embeddings, ranked result lists). Entries expire after `ttl` seconds and the least
+    recently used entry is evicted once `max_entries` is reached.
+    """
+
+    def __init__(self, max_entries=1024, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+    def get(self, key):
+        """Return the cached value and mark it as recently used, or None if absent or expired."""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.counters["misses"] += 1
+                return None
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.counters["expired"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + (ttl or self.ttl))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Return hit/miss counters together with the current entry count."""
+        lookups = self.counters["hits"] + self.counters["misses"] + self.counters["expired"]
+        return {
+            **self.counters,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hit_ratio": round(self.counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
@@ -1,36 +1,21 @@
 # cvmodel.py
-import os
-import google.generativeai as genai
+import re
+import asyncio
 from dotenv import load_dotenv
+from llm import get_gateway
 
 # Load environment variables
 load_dotenv()
 
-# Load Gemini API key from environment variable
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+# Gemini model used for cover letters (created and configured on first use by the LLM gateway)
+COVER_LETTER_MODEL_NAME = "gemini-1.5-flash"
 
-if not GOOGLE_API_KEY:
-    raise ValueError("Google API key not set in .env file.")
-
-# Configure Gemini API
-genai.configure(api_key=GOOGLE_API_KEY)
-
-# Initialize the Gemini model
-model = genai.GenerativeModel("gemini-1.5-flash")
-
-def generate_cover_letter(name, job_title, company_name, job_description, skills):
+def build_cover_letter_prompt(name, job_title, company_name, job_description, skills):
     """
-    Generate a personalized cover letter content using the Gemini API.
-    :param name: Applicant's name.
-    :param job_title: Job title for the application.
-    :param company_name: Name of the company.
-    :param job_description: String containing the job description.
-    :param skills: List of skills relevant to the job.
-    :return: A string containing the generated cover letter.
+    Build the cover letter prompt from the applicant and job details.
+    :return: The prompt text.
     """
-    try:
-        # Prepare the prompt with the details
-        prompt = f"""
+    return f"""
         Generate a personalized and professional cover letter for a job application.
         Use the following details:
 
@@ -68,16 +53,69 @@ def generate_cover_letter(name, job_title, company_name, job_description, skills
         Ensure the cover letter is concise, professional, and tailored to the job description.
         """
 
-        # Call Gemini API to generate content
-        response = model.generate_content(prompt)
+def validate_cover_letter(text):
+    """
+    True when the output looks like a finished letter: a salutation, at least three paragraphs and
+    no template placeholders such as "[Opening Paragraph]" left in it.
+    """
+    paragraphs = [paragraph for paragraph in re.split(r"\n\s*\n", text.strip()) if paragraph.strip()]
+    return (
+        len(paragraphs) >= 3
+        and "dear" in text[:200].lower()
+        and not re.search(r"\[(opening|body|closing|your|company|job)[^\]]*\]", text, re.IGNORECASE)
+    )
 
-        # Parse and return the generated cover letter
-        return response.text.strip()
+def generate_cover_letter(name, job_title, company_name, job_description, skills):
+    """
+    Generate a personalized cover letter content using the Gemini API.
+    :param name: Applicant's name.
+    :param job_title: Job title for the application.
+    :param company_name: Name of the company.
+    :param job_description: String containing the job description.
+    :param skills: List of skills relevant to the job.
+    :return: A string containing the generated cover letter.
+    """
+    try:
+        # Prepare the prompt with the details
+        prompt = build_cover_letter_prompt(name, job_title, company_name, job_description, skills)
+
+        # Call Gemini API to generate content; letters failing validate_cover_letter are retried
+        return get_gateway().generate_blocking(COVER_LETTER_MODEL_NAME, prompt, validate=validate_cover_letter)
+
+    except Exception as e:
+        print(f"Error generating cover letter: {e}")
+        return None
+
+async def generate_cover_letter_async(name, job_title, company_name, job_description, skills, regenerate=False):
+    """
+    Async variant of generate_cover_letter that goes through the LLM gateway, bounded by its deadline;
+    slow attempts are hedged and letters failing validate_cover_letter are retried.
+    :param regenerate: Ignore any cached output for the same prompt.
+    :return: A string containing the generated cover letter, or None on failure.
+    """
+    try:
+        prompt = build_cover_letter_prompt(name, job_title, company_name, job_description, skills)
+        return await get_gateway().generate(
+            COVER_LETTER_MODEL_NAME, prompt, regenerate=regenerate, validate=validate_cover_letter
+        )
 
+    except asyncio.TimeoutError:
+        print("Error generating cover letter: generation timed out")
+        return None
     except Exception as e:
         print(f"Error generating cover letter: {e}")
         return None
 
+async def stream_cover_letter(name, job_title, company_name, job_description, skills, regenerate=False):
+    """
+    Stream the cover letter text chunk by chunk as Gemini generates it.
+    :param regenerate: Ignore any cached output for the same prompt.
+    :return: An async iterator of text chunks.
+    """
+    prompt = build_cover_letter_prompt(name, job_title, company_name, job_description, skills)
+    async for chunk in get_gateway().stream(COVER_LETTER_MODEL_NAME, prompt, regenerate=regenerate):
+        yield chunk
+
 if __name__ == "__main__":
     # Input details
     name = "John Doe"
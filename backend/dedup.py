@@ -0,0 +1,99 @@
+import os
+import logging
+import numpy as np
+from dotenv import load_dotenv
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("dedup")
+
+# Load environment variables
+load_dotenv()
+# Cosine similarity above which two job embeddings count as the same listing
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.95"))
+# Random-hyperplane LSH: each table hashes a vector to DEDUP_LSH_BITS sign bits; only vectors that
+# share a bucket in at least one table are compared
+DEDUP_LSH_TABLES = int(os.getenv("DEDUP_LSH_TABLES", "8"))
+DEDUP_LSH_BITS = int(os.getenv("DEDUP_LSH_BITS", "8"))
+DEDUP_BLOCK_SIZE = int(os.getenv("DEDUP_BLOCK_SIZE", "1024"))
+
+def _similar_pairs(vectors, members, threshold, block_size):
+    """Pairs (i < j) among `members` whose cosine similarity is at least `threshold`, computed block by block."""
+    found = []
+    candidates = vectors[members]
+    for start in range(0, len(members), block_size):
+        similarities = candidates[start:start + block_size] @ candidates.T
+        rows, cols = np.nonzero(similarities >= threshold)
+        rows += start
+        keep = rows < cols
+        found.append(np.stack([members[rows[keep]], members[cols[keep]]], axis=1))
+    return found
+
+def _connected_components(n, pairs):
+    """Label every index with the smallest index of its connected component."""
+    labels = np.arange(n)
+    if not len(pairs):
+        return labels
+    left, right = pairs[:, 0], pairs[:, 1]
+    while True:
+        lowest = np.minimum(labels[left], labels[right])
+        updated = labels.copy()
+        np.minimum.at(updated, left, lowest)
+        np.minimum.at(updated, right, lowest)
+        # Pointer jumping: follow labels to their own labels until they stop changing
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+def find_near_duplicates(vectors, threshold=DEDUP_THRESHOLD, tables=DEDUP_LSH_TABLES, bits=DEDUP_LSH_BITS,
+                         block_size=DEDUP_BLOCK_SIZE, seed=0):
+    """
+    Cluster near-duplicate embeddings.
+    Candidate pairs come from random-hyperplane LSH buckets, so the similarity matrix is only computed
+    within buckets (in blocks); pairs at or above `threshold` are merged into clusters.
+    :param vectors: Unit-normalized embeddings, one row per job.
+    :return: An array mapping every row to its cluster's canonical row (the first row of the cluster).
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    n = len(vectors)
+    if n < 2:
+        return np.arange(n)
+    rng = np.random.default_rng(seed)
+    weights = 1 << np.arange(bits)
+    pairs = []
+    for _ in range(tables):
+        planes = rng.standard_normal((vectors.shape[1], bits)).astype(np.float32)
+        codes = ((vectors @ planes) > 0).astype(np.int64) @ weights
+        order = np.argsort(codes, kind="stable")
+        boundaries = np.flatnonzero(np.diff(codes[order])) + 1
+        for members in np.split(order, boundaries):
+            if len(members) > 1:
+                pairs.extend(_similar_pairs(vectors, np.sort(members), threshold, block_size))
+    pairs = np.unique(np.concatenate(pairs), axis=0) if pairs else np.empty((0, 2), dtype=np.int64)
+    canonical = _connected_components(n, pairs)
+    logger.info(f"Collapsed {n} jobs into {len(np.unique(canonical))} clusters ({len(pairs)} near-duplicate pairs)")
+    return canonical
+
+def collapse_duplicates(entries, vectors, threshold=DEDUP_THRESHOLD):
+    """
+    Keep one job per near-duplicate cluster.
+    The first job of each cluster keeps its vector and gains a "duplicate_ids" metadata list with
+    the ids of the copies it stands for.
+    :param entries: Job records ({"id", "metadata"}), in feed order.
+    :param vectors: Their unit-normalized embeddings.
+    :return: (canonical_entries, canonical_vectors)
+    """
+    canonical = find_near_duplicates(vectors, threshold)
+    duplicates = {}
+    for row, root in enumerate(canonical):
+        if row != root:
+            duplicates.setdefault(int(root), []).append(entries[row]["id"])
+    keep = np.flatnonzero(canonical == np.arange(len(canonical)))
+    collapsed = []
+    for row in keep:
+        entry = entries[row]
+        if int(row) in duplicates:
+            entry = {**entry, "metadata": {**entry["metadata"], "duplicate_ids": duplicates[int(row)]}}
+        collapsed.append(entry)
+    return collapsed, np.asarray(vectors)[keep]
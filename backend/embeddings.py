@@ -0,0 +1,148 @@
+import os
+import asyncio
+import threading
+import logging
+import weakref
+import numpy as np
+from dotenv import load_dotenv
+import metrics
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("embeddings")
+
+# Load environment variables
+load_dotenv()
+# Indexing and querying must use the same model so vectors share one space
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+# "torch", "onnx" or "onnx-quantized" (int8 ONNX weights, fastest on CPU)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+EMBEDDING_ONNX_QUANTIZED_FILE = os.getenv("EMBEDDING_ONNX_QUANTIZED_FILE", "onnx/model_qint8_avx512_vnni.onnx")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+# Concurrent query embeddings arriving within this window are encoded together
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"))
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", "32"))
+
+_model = None
+# Why the last attempt to load the model failed, for /ready
+_model_error = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """
+    Load the SentenceTransformers model once per process and return it.
+    """
+    global _model, _model_error
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                    logger.info(f"Loading embedding model {EMBEDDING_MODEL} ({EMBEDDING_BACKEND})")
+                    if EMBEDDING_BACKEND == "onnx":
+                        _model = SentenceTransformer(EMBEDDING_MODEL, backend="onnx")
+                    elif EMBEDDING_BACKEND == "onnx-quantized":
+                        _model = SentenceTransformer(
+                            EMBEDDING_MODEL, backend="onnx", model_kwargs={"file_name": EMBEDDING_ONNX_QUANTIZED_FILE}
+                        )
+                    else:
+                        _model = SentenceTransformer(EMBEDDING_MODEL)
+                except Exception as e:
+                    _model_error = str(e)
+                    raise
+                _model_error = None
+    return _model
+
+def set_model(model):
+    """
+    Use `model` (anything with SentenceTransformer's encode and get_sentence_embedding_dimension)
+    instead of loading EMBEDDING_MODEL, e.g. a stand-in for benchmarks.
+    """
+    global _model
+    with _model_lock:
+        _model = model
+
+def embedding_dimension():
+    """Dimension of the vectors produced by the embedding model."""
+    return get_model().get_sentence_embedding_dimension()
+
+def encode(texts, batch_size=EMBEDDING_BATCH_SIZE):
+    """
+    Embed a list of texts in batches.
+    :return: A float32 matrix of unit-normalized embeddings, one row per text.
+    """
+    if not texts:
+        return np.empty((0, embedding_dimension()), dtype=np.float32)
+    model = get_model()
+    metrics.embedding_batch_size.observe(len(texts))
+    with metrics.track(metrics.embedding_seconds, metrics.embeddings_in_flight):
+        vectors = model.encode(
+            list(texts), batch_size=batch_size, normalize_embeddings=True, convert_to_numpy=True
+        )
+    return vectors.astype(np.float32, copy=False)
+
+class MicroBatcher:
+    """
+    Collects concurrent single-text embedding requests and encodes them in one model call.
+    The first request in an empty batch waits up to `window` seconds for company; a full batch
+    is flushed immediately.
+    """
+
+    def __init__(self, window=EMBEDDING_BATCH_WINDOW_MS / 1000, max_batch=EMBEDDING_MAX_BATCH):
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []
+        self._timer = None
+        # The event loop only keeps weak references to tasks, so running batches are held here
+        self._tasks = set()
+        self.batches = 0
+        self.texts = 0
+
+    async def embed(self, text):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        texts = [text for text, _ in batch]
+        try:
+            vectors = await asyncio.to_thread(encode, texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches += 1
+        self.texts += len(texts)
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+# One batcher per event loop; entries go away with their loop
+_batchers = weakref.WeakKeyDictionary()
+
+async def embed_query(text):
+    """
+    Embed one query, sharing a model call with other queries that arrive at the same time.
+    :return: A unit-normalized float32 vector.
+    """
+    loop = asyncio.get_running_loop()
+    batcher = _batchers.get(loop)
+    if batcher is None:
+        batcher = _batchers[loop] = MicroBatcher()
+    return await batcher.embed(text)
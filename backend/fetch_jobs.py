@@ -3,54 +3,225 @@ import json
 from dotenv import load_dotenv
 import os
 import time
+import random
+import asyncio
+import argparse
+import httpx
 
-# Load environment variables (simulating API key usage)
+# Load environment variables
 load_dotenv()
 ADZUNA_APP_ID = os.getenv("ADZUNA_APP_ID")
 ADZUNA_APP_KEY = os.getenv("ADZUNA_APP_KEY")
+# Overridable so the ingester can run against a local stand-in server
+ADZUNA_API_URL = os.getenv("ADZUNA_API_URL", "https://api.adzuna.com/v1/api/jobs")
+# Request budget shared by all page fetches
+ADZUNA_REQUESTS_PER_SECOND = float(os.getenv("ADZUNA_REQUESTS_PER_SECOND", "5"))
+ADZUNA_CONCURRENCY = int(os.getenv("ADZUNA_CONCURRENCY", "5"))
+ADZUNA_MAX_RETRIES = int(os.getenv("ADZUNA_MAX_RETRIES", "3"))
+# Crawls go to their own file so the sample Job.json feed is never overwritten by accident
+ADZUNA_OUTPUT_FILE = os.getenv("ADZUNA_OUTPUT_FILE", "adzuna_jobs.json")
 
-# Simulate checking API credentials
-if not ADZUNA_APP_ID or not ADZUNA_APP_KEY:
-    raise ValueError("Adzuna API credentials not set in .env file.")
+class RateLimiter:
+    """
+    Token bucket that allows `rate` requests per second with bursts of up to `burst`.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
 
-# Simulate fetching job listings from Adzuna API
-def fetch_adzuna_jobs(query="software engineer", country="gb", results_per_page=50, max_pages=5):
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+def to_job_record(result, country):
     """
-    Simulate fetching job listings from Adzuna API.
-    In reality, just reads from the static Job.json file.
+    Convert one Adzuna search result into the Job.json record format used for indexing.
     """
+    title = result.get("title") or "Unknown role"
+    company = (result.get("company") or {}).get("display_name") or "Unknown company"
+    location = (result.get("location") or {}).get("display_name") or "Unknown location"
+    salary_min, salary_max = result.get("salary_min"), result.get("salary_max")
+    metadata = {
+        "job_title": title,
+        "company_name": company,
+        "country_code": country.upper(),
+        "job_summary": f"{title} at {company}, {location}. {result.get('description', '')}".strip(),
+        "redirect_url": result.get("redirect_url"),
+        "salary_min": salary_min,
+        "salary_max": salary_max,
+    }
+    if salary_min:
+        metadata["base_salary"] = f"{salary_min:,.0f}" + (f" - {salary_max:,.0f}" if salary_max and salary_max != salary_min else "")
+    # Vector stores reject null metadata values
+    return {"id": str(result["id"]), "metadata": {key: value for key, value in metadata.items() if value is not None}}
+
+def _load_checkpoint(checkpoint_file, query, country):
+    if not os.path.exists(checkpoint_file):
+        return None
+    with open(checkpoint_file, "r", encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("query") != query or checkpoint.get("country") != country:
+        return None
+    return checkpoint
+
+def _save_checkpoint(checkpoint_file, checkpoint):
+    tmp_file = checkpoint_file + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_file, checkpoint_file)
+
+def _existing_ids(output_file):
+    ids = set()
+    if os.path.exists(output_file):
+        with open(output_file, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    ids.add(json.loads(line)["id"])
+                except (json.JSONDecodeError, KeyError):
+                    continue
+    return ids
+
+async def fetch_adzuna_jobs_async(query="software engineer", country="gb", results_per_page=50, max_pages=5,
+                                  output_file=ADZUNA_OUTPUT_FILE, checkpoint_file=None,
+                                  requests_per_second=ADZUNA_REQUESTS_PER_SECOND, concurrency=ADZUNA_CONCURRENCY,
+                                  force=False):
+    """
+    Fetch job listings from the Adzuna search API and stream them to a JSON Lines file.
+    Pages are fetched concurrently within a shared request budget; postings are deduplicated by id
+    as they arrive, and completed pages are checkpointed so an interrupted crawl resumes where it stopped.
+    :param force: Let a fresh crawl replace an existing `output_file`.
+    :return: The number of new postings written.
+    :raises FileExistsError: If a fresh crawl would overwrite an existing file and `force` is not set.
+    """
+    if not ADZUNA_APP_ID or not ADZUNA_APP_KEY:
+        raise ValueError("Adzuna API credentials not set in .env file.")
+
+    checkpoint_file = checkpoint_file or f"{output_file}.checkpoint.json"
+    checkpoint = _load_checkpoint(checkpoint_file, query, country)
+    if checkpoint is not None:
+        completed = set(checkpoint["completed_pages"])
+        last_page = checkpoint.get("last_page")
+        seen_ids = _existing_ids(output_file)
+        mode = "a"
+        print(f"Resuming crawl: {len(completed)} pages already completed, {len(seen_ids)} postings on disk")
+    else:
+        if os.path.exists(output_file) and not force:
+            raise FileExistsError(f"{output_file} already exists; pass --force to replace it or choose another --output.")
+        completed, last_page, seen_ids, mode = set(), None, set(), "w"
+        checkpoint = {"query": query, "country": country, "completed_pages": [], "last_page": None}
+
     print(f"Fetching jobs with query: {query}, country: {country}")
-    all_jobs = []
-    
-    # Simulate API calls with delays to make it look realistic
-    for page in range(1, max_pages + 1):
-        print(f"Fetching page {page}...")
-        time.sleep(1)  # Simulate network delay
-        # Instead of making an API call, read from Job.json
-        try:
-            with open("Job.json", "r") as f:
-                jobs = [json.loads(line) for line in f]
-            # Simulate pagination by taking a subset (though we have only 10 jobs)
-            all_jobs.extend(jobs[:results_per_page])
-            print(f"Fetched {len(jobs[:results_per_page])} jobs from page {page}")
-        except FileNotFoundError:
-            print("Error: Job.json not found. Please create the fake job data file.")
-            return []
-    
-    return all_jobs
-
-# "Create" Job.json (just a placeholder, since it already exists)
-def create_job_json(jobs, output_file="Job.json"):
-    """
-    Simulate creating Job.json by printing a message.
-    In reality, Job.json is already created statically.
-    """
-    print(f"Saved {len(jobs)} job listings to {output_file}")
+    limiter = RateLimiter(requests_per_second, burst=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    written = 0
+
+    async def fetch_page(client, page):
+        params = {
+            "app_id": ADZUNA_APP_ID,
+            "app_key": ADZUNA_APP_KEY,
+            "results_per_page": results_per_page,
+            "what": query,
+            "content-type": "application/json",
+        }
+        last_error = None
+        for attempt in range(ADZUNA_MAX_RETRIES + 1):
+            if attempt:
+                await asyncio.sleep(random.uniform(0, 2 ** (attempt - 1)))
+            try:
+                async with semaphore:
+                    await limiter.acquire()
+                    response = await client.get(f"{ADZUNA_API_URL}/{country}/search/{page}", params=params)
+            except httpx.TransportError as e:
+                # Reset connections and timeouts are retried like throttling and server errors
+                last_error = e
+                continue
+            if response.is_success:
+                return page, response.json().get("results", [])
+            try:
+                response.raise_for_status()
+            except httpx.HTTPStatusError as e:
+                if response.status_code not in (429, 500, 502, 503, 504):
+                    raise
+                last_error = e
+        raise RuntimeError(f"Page {page} failed after {ADZUNA_MAX_RETRIES + 1} attempts: {last_error}") from last_error
+
+    pages = [page for page in range(1, max_pages + 1) if page not in completed and (last_page is None or page <= last_page)]
+    with open(output_file, mode, encoding="utf-8") as out:
+        async with httpx.AsyncClient(timeout=30) as client:
+            tasks = {asyncio.create_task(fetch_page(client, page)): page for page in pages}
+            pending = set(tasks)
+            try:
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in sorted(done, key=tasks.get):
+                        if task.cancelled():
+                            continue
+                        page, results = task.result()
+                        new_records = []
+                        for result in results:
+                            record = to_job_record(result, country)
+                            if record["id"] not in seen_ids:
+                                seen_ids.add(record["id"])
+                                new_records.append(record)
+                        out.writelines(json.dumps(record) + "\n" for record in new_records)
+                        out.flush()
+                        written += len(new_records)
+                        print(f"Fetched page {page}: {len(results)} postings, {len(new_records)} new")
+
+                        # Only checkpoint a page after its postings are safely on disk
+                        checkpoint["completed_pages"].append(page)
+                        if len(results) < results_per_page:
+                            # A short page is the end of the result set, so later pages are not needed
+                            end = page if checkpoint["last_page"] is None else min(checkpoint["last_page"], page)
+                            checkpoint["last_page"] = end
+                            for other in pending:
+                                if tasks[other] > end:
+                                    other.cancel()
+                        _save_checkpoint(checkpoint_file, checkpoint)
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    # The crawl finished, so the next run starts from page 1 again
+    os.remove(checkpoint_file)
+    print(f"Saved {written} new job listings to {output_file}")
+    return written
+
+def fetch_adzuna_jobs(query="software engineer", country="gb", results_per_page=50, max_pages=5,
+                      output_file=ADZUNA_OUTPUT_FILE, force=False):
+    """
+    Fetch job listings from the Adzuna API into `output_file` (see fetch_adzuna_jobs_async).
+    The postings are streamed to the file as they arrive rather than returned.
+    :return: The number of new postings written.
+    """
+    return asyncio.run(fetch_adzuna_jobs_async(query, country, results_per_page, max_pages, output_file, force=force))
 
 # Main execution
 if __name__ == "__main__":
-    jobs = fetch_adzuna_jobs(query="software engineer", country="gb", results_per_page=50, max_pages=5)
-    if jobs:
-        create_job_json(jobs, "Job.json")
-    else:
-        print("No job listings fetched.")
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Fetch job listings from Adzuna into a JSON Lines file.")
+    parser.add_argument("--query", default="software engineer")
+    parser.add_argument("--country", default="gb")
+    parser.add_argument("--results-per-page", type=int, default=50)
+    parser.add_argument("--max-pages", type=int, default=5)
+    parser.add_argument("--output", default=ADZUNA_OUTPUT_FILE,
+                        help="JSON Lines file to write (index it with: python vecdbcreation.py --jobs <file>).")
+    parser.add_argument("--force", action="store_true", help="Replace the output file if it already exists.")
+    args = parser.parse_args()
+
+    try:
+        count = fetch_adzuna_jobs(args.query, args.country, args.results_per_page, args.max_pages, args.output, args.force)
+    except FileExistsError as e:
+        parser.error(str(e))
+    if not count:
+        print("No job listings fetched.")
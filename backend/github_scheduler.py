@@ -0,0 +1,229 @@
+import os
+import time
+import random
+import asyncio
+import logging
+import httpx
+from email.utils import parsedate_to_datetime
+from dotenv import load_dotenv
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+# Comma-separated pool of tokens; falls back to the single GITHUB_TOKEN
+GITHUB_TOKENS = [token.strip() for token in os.getenv("GITHUB_TOKENS", os.getenv("GITHUB_TOKEN", "")).split(",") if token.strip()]
+GITHUB_MAX_CONCURRENCY = int(os.getenv("GITHUB_MAX_CONCURRENCY", "16"))
+GITHUB_MAX_RETRIES = int(os.getenv("GITHUB_MAX_RETRIES", "5"))
+GITHUB_BACKOFF_BASE = float(os.getenv("GITHUB_BACKOFF_BASE", "0.5"))
+GITHUB_BACKOFF_MAX = float(os.getenv("GITHUB_BACKOFF_MAX", "60"))
+# Once a token has fewer requests left than this, requests are spread evenly until its reset
+GITHUB_PACE_THRESHOLD = int(os.getenv("GITHUB_PACE_THRESHOLD", "50"))
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+class TokenState:
+    """Quota bookkeeping for one GitHub token (None means anonymous)."""
+
+    def __init__(self, token, label):
+        self.token = token
+        self.label = label
+        self.limit = None
+        self.remaining = None
+        self.reset_at = 0.0
+        self.blocked_until = 0.0
+        self.next_slot = 0.0
+        self.requests = 0
+
+    def available_at(self, now):
+        """Earliest time this token may be used again."""
+        if self.remaining == 0 and self.reset_at > now:
+            return max(self.reset_at, self.blocked_until)
+        return max(self.blocked_until, self.next_slot)
+
+    def update(self, headers, now):
+        if "X-RateLimit-Remaining" in headers:
+            self.remaining = int(headers["X-RateLimit-Remaining"])
+        if "X-RateLimit-Limit" in headers:
+            self.limit = int(headers["X-RateLimit-Limit"])
+        if "X-RateLimit-Reset" in headers:
+            self.reset_at = float(headers["X-RateLimit-Reset"])
+        # Pace the remaining quota across the rest of the window instead of burning it at once
+        if self.remaining is not None and 0 < self.remaining < GITHUB_PACE_THRESHOLD and self.reset_at > now:
+            self.next_slot = now + (self.reset_at - now) / self.remaining
+        else:
+            self.next_slot = 0.0
+
+    def snapshot(self, now):
+        return {
+            "token": self.label,
+            "limit": self.limit,
+            "remaining": self.remaining,
+            "reset_in": round(max(0.0, self.reset_at - now), 1) if self.reset_at else None,
+            "blocked_for": round(max(0.0, self.blocked_until - now), 1),
+            "requests": self.requests,
+        }
+
+class GitHubScheduler:
+    """
+    Central scheduler for GitHub API requests.
+    Round-robins across a pool of tokens, tracks each token's quota from the rate-limit headers,
+    queues requests while every token is exhausted, and retries 403/429/5xx responses with
+    jittered exponential backoff (honouring Retry-After when GitHub sends it).
+    """
+
+    def __init__(self, tokens=None, max_concurrency=GITHUB_MAX_CONCURRENCY, max_retries=GITHUB_MAX_RETRIES):
+        tokens = tokens if tokens is not None else GITHUB_TOKENS
+        self.tokens = [TokenState(token, f"token-{i + 1}") for i, token in enumerate(tokens)] or [TokenState(None, "anonymous")]
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self._cursor = 0
+        self._loop = None
+        self._semaphore = None
+        self.queued = 0
+        self.in_flight = 0
+        self.counters = {"requests": 0, "retries": 0, "throttled": 0, "failures": 0}
+
+    def _get_semaphore(self):
+        # asyncio primitives are bound to one event loop, so recreate them if the loop changes
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _acquire_token(self):
+        """Pick the next usable token round-robin, waiting if every token is exhausted or paced."""
+        while True:
+            now = time.time()
+            for offset in range(len(self.tokens)):
+                state = self.tokens[(self._cursor + offset) % len(self.tokens)]
+                if state.available_at(now) <= now:
+                    self._cursor = (self._cursor + offset + 1) % len(self.tokens)
+                    if state.next_slot:
+                        state.next_slot = now + (state.reset_at - now) / max(state.remaining or 1, 1)
+                    return state
+            wait = min(state.available_at(now) for state in self.tokens) - now
+            self.counters["throttled"] += 1
+            logger.info(f"All GitHub tokens exhausted or paced, waiting {wait:.1f}s")
+            await asyncio.sleep(min(max(wait, 0.05), GITHUB_BACKOFF_MAX))
+
+    def _backoff(self, attempt):
+        delay = min(GITHUB_BACKOFF_MAX, GITHUB_BACKOFF_BASE * (2 ** attempt))
+        return random.uniform(0, delay)  # full jitter
+
+    @staticmethod
+    def _retry_after(value, now):
+        """Seconds to wait from a Retry-After header, which is either a number of seconds or an HTTP-date."""
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - now)
+        except (TypeError, ValueError):
+            logger.warning(f"Ignoring unparseable Retry-After header: {value!r}")
+            return None
+
+    @staticmethod
+    def _is_rate_limited(response):
+        if response.status_code == 429:
+            return True
+        if response.status_code != 403:
+            return False
+        return (
+            response.headers.get("X-RateLimit-Remaining") == "0"
+            or "Retry-After" in response.headers
+            or "rate limit" in response.text.lower()
+        )
+
+    async def request(self, client, method, url, headers=None, **kwargs):
+        """
+        Send a request through the scheduler.
+        :param client: The httpx.AsyncClient to send with.
+        :return: The final httpx.Response (possibly a non-retryable error response).
+        """
+        return await self._send_with_retries(client, method, url, headers, **kwargs)
+
+    async def _send(self, client, method, url, headers, **kwargs):
+        """
+        One attempt in a concurrency slot. The slot is only held while the request is in flight,
+        so a request backing off before its retry does not block requests that could go out now.
+        """
+        semaphore = self._get_semaphore()
+        self.queued += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        try:
+            return await client.request(method, url, headers=headers, **kwargs)
+        finally:
+            self.in_flight -= 1
+            semaphore.release()
+
+    async def _send_with_retries(self, client, method, url, headers, **kwargs):
+        attempt = 0
+        while True:
+            state = await self._acquire_token()
+            request_headers = dict(headers or {})
+            if state.token:
+                request_headers["Authorization"] = f"token {state.token}"
+            state.requests += 1
+            self.counters["requests"] += 1
+            try:
+                response = await self._send(client, method, url, request_headers, **kwargs)
+            except httpx.TransportError as e:
+                if attempt >= self.max_retries:
+                    self.counters["failures"] += 1
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"GitHub request {url} failed ({e!r}), retrying in {delay:.1f}s")
+            else:
+                now = time.time()
+                state.update(response.headers, now)
+                rate_limited = self._is_rate_limited(response)
+                if not rate_limited and response.status_code not in RETRYABLE_STATUSES:
+                    return response
+                if attempt >= self.max_retries:
+                    self.counters["failures"] += 1
+                    logger.error(f"GitHub request {url} failed after {attempt + 1} attempts: {response.status_code}")
+                    return response
+                retry_after = response.headers.get("Retry-After")
+                retry_after = self._retry_after(retry_after, now) if retry_after is not None else None
+                if retry_after is not None:
+                    delay = retry_after
+                    state.blocked_until = now + delay
+                elif rate_limited and state.remaining == 0:
+                    # Primary quota exhausted: the token is parked until reset and another one can be used
+                    delay = 0.0 if len(self.tokens) > 1 else max(0.0, state.reset_at - now)
+                else:
+                    delay = self._backoff(attempt)
+                logger.warning(f"GitHub request {url} returned {response.status_code}, retrying in {delay:.1f}s")
+            self.counters["retries"] += 1
+            attempt += 1
+            if delay:
+                await asyncio.sleep(min(delay, GITHUB_BACKOFF_MAX))
+
+    def snapshot(self):
+        """Current quota and queue state for the introspection endpoint."""
+        now = time.time()
+        return {
+            "tokens": [state.snapshot(now) for state in self.tokens],
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            **self.counters,
+        }
+
+_scheduler = None
+
+def get_scheduler():
+    """Return the process-wide GitHub scheduler."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = GitHubScheduler()
+    return _scheduler
@@ -0,0 +1,153 @@
+import os
+import re
+import json
+import threading
+import logging
+import numpy as np
+from dotenv import load_dotenv
+from vectorstore import VECTOR_BACKEND, MetadataColumns, get_vector_store
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("lexical")
+
+# Load environment variables
+load_dotenv()
+# Job feed the keyword index is built from when the vectors live in Pinecone
+JOB_CATALOG_PATH = os.getenv("JOB_CATALOG_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "Job.json"))
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from in is it of on or our the to we with you your will this that".split()
+)
+
+def tokenize(text):
+    """Lower-cased word tokens; keeps terms like c++, c# and node.js intact."""
+    return [token for token in TOKEN_PATTERN.findall((text or "").lower()) if token not in STOPWORDS]
+
+def job_text(metadata):
+    """The searchable text of a job: its title (counted twice, as titles are short and precise) and summary."""
+    title = metadata.get("job_title", "")
+    return f"{title} {title} {metadata.get('job_summary', '')}"
+
+class BM25Index:
+    """
+    Okapi BM25 keyword index over job postings.
+    Postings are stored per term as contiguous NumPy arrays, so a query only touches the rows of its
+    own terms; metadata filters are evaluated as a mask before any row is scored.
+    """
+
+    def __init__(self, ids, metadata, k1=BM25_K1, b=BM25_B):
+        self.ids = list(ids)
+        self.metadata = list(metadata)
+        self.columns = MetadataColumns(self.metadata)
+        self.k1 = k1
+        self.b = b
+
+        postings = {}
+        lengths = np.zeros(len(self.ids), dtype=np.float32)
+        for row, meta in enumerate(self.metadata):
+            tokens = tokenize(job_text(meta))
+            lengths[row] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                postings.setdefault(token, ([], []))
+                postings[token][0].append(row)
+                postings[token][1].append(count)
+
+        self.lengths = lengths
+        self.avg_length = float(lengths.mean()) if len(lengths) else 0.0
+        self.postings = {
+            token: (np.array(rows, dtype=np.int64), np.array(counts, dtype=np.float32))
+            for token, (rows, counts) in postings.items()
+        }
+        n = len(self.ids)
+        self.idf = {
+            token: float(np.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5)))
+            for token, (rows, _) in self.postings.items()
+        }
+
+    @property
+    def size(self):
+        return len(self.ids)
+
+    def search(self, query, top_k=10, filter=None):
+        """
+        Rank jobs by BM25 score for `query`.
+        :param filter: Pinecone-style metadata filter; rows that fail it are never scored.
+        :return: A list of matches ({"id", "score", "metadata"}), best first.
+        """
+        if not self.size:
+            return []
+        mask = self.columns.mask(filter) if filter else None
+        scores = np.zeros(self.size, dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.lengths / (self.avg_length or 1.0))
+        for token in set(tokenize(query)):
+            if token not in self.postings:
+                continue
+            rows, tf = self.postings[token]
+            if mask is not None:
+                keep = mask[rows]
+                rows, tf = rows[keep], tf[keep]
+            scores[rows] += self.idf[token] * tf * (self.k1 + 1) / (tf + norm[rows])
+
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        top = min(top_k, len(matched))
+        best = matched[np.argpartition(-scores[matched], top - 1)[:top]]
+        best = best[np.argsort(-scores[best])]
+        return [
+            {"id": self.ids[row], "score": float(scores[row]), "metadata": self.metadata[row]}
+            for row in best
+        ]
+
+def _load_catalog(path):
+    ids, metadata = [], []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "id" in entry and entry.get("metadata"):
+                ids.append(str(entry["id"]))
+                metadata.append(entry["metadata"])
+    return ids, metadata
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_lexical_index(namespace="ns1"):
+    """
+    Return the BM25 index for `namespace`, (re)building it when the underlying jobs changed.
+    With the local backend it is built from the vector store's own metadata; with Pinecone it is
+    built from the JOB_CATALOG_PATH feed. Returns None when there is nothing to build from.
+    """
+    with _indexes_lock:
+        if VECTOR_BACKEND == "local":
+            source = get_vector_store().namespace(namespace)
+            # The namespace publishes a new snapshot on every write, so the snapshot identifies the version
+            version = source.state
+            cached = _indexes.get(namespace)
+            if cached is None or cached[0] is not version:
+                index = BM25Index(*version.live_records())
+                _indexes[namespace] = (version, index)
+                logger.info(f"Built BM25 index over {index.size} jobs in namespace {namespace}")
+            return _indexes[namespace][1]
+
+        if not os.path.exists(JOB_CATALOG_PATH):
+            return None
+        version = os.path.getmtime(JOB_CATALOG_PATH)
+        cached = _indexes.get(JOB_CATALOG_PATH)
+        if cached is None or cached[0] != version:
+            index = BM25Index(*_load_catalog(JOB_CATALOG_PATH))
+            _indexes[JOB_CATALOG_PATH] = (version, index)
+            logger.info(f"Built BM25 index over {index.size} jobs from {JOB_CATALOG_PATH}")
+        return _indexes[JOB_CATALOG_PATH][1]
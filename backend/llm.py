@@ -0,0 +1,450 @@
+import os
+import json
+import time
+import hashlib
+import asyncio
+import logging
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+from cache import DiskCache
+import metrics
+from singleflight import SingleFlight
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Load environment variables
+load_dotenv()
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+# Overall deadline of one generate() call, covering queueing, hedges and retries
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "45"))
+
+# Request policy: once an attempt has run longer than this percentile of recent latencies a second,
+# hedged attempt is sent and the first good answer wins; outputs failing validation are retried
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "true").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1"))
+# Latencies kept per model, and how many are needed before hedging starts
+LLM_HEDGE_WINDOW = int(os.getenv("LLM_HEDGE_WINDOW", "200"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# Cost caps: model calls per generate() (2 means hedging and retries never more than double the cost),
+# and extra calls (hedges and retries) allowed per request on average, with a small burst
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "2"))
+LLM_EXTRA_ATTEMPT_RATIO = float(os.getenv("LLM_EXTRA_ATTEMPT_RATIO", "0.2"))
+LLM_EXTRA_ATTEMPT_BURST = float(os.getenv("LLM_EXTRA_ATTEMPT_BURST", "10"))
+
+# Output cache settings
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "llm.sqlite"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+_genai = None
+# Why the last attempt to set up the SDK failed, for /ready
+_genai_error = None
+_genai_lock = threading.Lock()
+
+def get_genai():
+    """
+    Import and configure the Gemini SDK on first use.
+    The import is slow and needs a key, so it is kept out of module import; a missing key only
+    fails the calls that actually need Gemini.
+    :raises RuntimeError: If GOOGLE_API_KEY is not set.
+    """
+    global _genai, _genai_error
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                try:
+                    if not GOOGLE_API_KEY:
+                        raise RuntimeError("Google API key not set in .env file.")
+                    import google.generativeai as genai
+                    genai.configure(api_key=GOOGLE_API_KEY)
+                except Exception as e:
+                    _genai_error = str(e)
+                    raise
+                _genai, _genai_error = genai, None
+    return _genai
+
+def cache_key(model_name, prompt, params=None):
+    """
+    Content address for a generation: a hash of the model name, the whitespace-normalized prompt
+    and the generation parameters, so cosmetic prompt differences still hit the same entry.
+    """
+    normalized_prompt = "\n".join(" ".join(line.split()) for line in prompt.strip().splitlines())
+    payload = json.dumps(
+        {"model": model_name, "prompt": normalized_prompt, "params": params or {}},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def record_token_usage(model_name, prompt, text, response=None):
+    """
+    Record prompt and response token counts, as reported by the model when available
+    (usage_metadata), otherwise estimated at about four characters per token.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", None) or (len(prompt) + 3) // 4
+    response_tokens = getattr(usage, "candidates_token_count", None) or (len(text) + 3) // 4
+    metrics.llm_prompt_tokens.observe(prompt_tokens, model=model_name)
+    metrics.llm_response_tokens.observe(response_tokens, model=model_name)
+
+class LatencyWindow:
+    """Recent successful generation latencies of one model, for the hedging threshold."""
+
+    def __init__(self, size=LLM_HEDGE_WINDOW):
+        self.samples = deque(maxlen=size)
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def percentile(self, percentile):
+        """The `percentile`th latency, or None while there are fewer than LLM_HEDGE_MIN_SAMPLES samples."""
+        if len(self.samples) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+class InvalidOutputError(ValueError):
+    """The model answered, but the output failed the caller's validation."""
+
+def is_retryable(error):
+    """
+    Whether an attempt that failed with `error` may succeed when sent again: invalid output, timeouts,
+    dropped connections and throttling or server errors (HTTP 429/5xx codes on Google API errors).
+    Anything else, such as a missing key or a rejected request, would fail the same way again.
+    """
+    if isinstance(error, (InvalidOutputError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, "code", None)
+    return isinstance(code, int) and (code == 429 or code >= 500)
+
+class LLMGateway:
+    """
+    Async front door for Gemini calls.
+    Generations run on the async client API so they never block the event loop; a semaphore caps
+    how many run at once, the rest wait in a queue, and every call has a timeout.
+    Outputs are stored in a content-addressed cache so identical prompts are answered without the model.
+    """
+
+    def __init__(self, max_concurrency=LLM_MAX_CONCURRENCY, timeout=LLM_TIMEOUT, cache=None, model_factory=None):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.cache = cache
+        # Builds a model from its name; defaults to genai.GenerativeModel (stand-ins are used by the benchmark)
+        self.model_factory = model_factory
+        self._models = {}
+        self._loop = None
+        self._semaphore = None
+        self.queued = 0
+        self.in_flight = 0
+        self.counters = {"requests": 0, "completed": 0, "failed": 0, "timeouts": 0, "cancelled": 0}
+        self.policy_counters = {
+            "hedges": 0, "hedge_wins": 0, "retries": 0, "invalid": 0, "deadline_exceeded": 0, "extra_denied": 0,
+        }
+        self._latencies = {}
+        # Identical prompts generated at the same time share one generation
+        self._flight = SingleFlight("llm")
+        self._extra_tokens = LLM_EXTRA_ATTEMPT_BURST
+        self.started = 0
+        self.total_queue_wait = 0.0
+        self.max_queue_wait = 0.0
+
+    def _get_semaphore(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def get_model(self, model_name):
+        """Return a cached GenerativeModel for `model_name`."""
+        if model_name not in self._models:
+            factory = self.model_factory or get_genai().GenerativeModel
+            self._models[model_name] = factory(model_name)
+        return self._models[model_name]
+
+    @asynccontextmanager
+    async def _slot(self, timeout=None):
+        """Wait (at most `timeout` seconds) for a free generation slot, tracking queue and in-flight counts."""
+        self.counters["requests"] += 1
+        semaphore = self._get_semaphore()
+        enqueued_at = time.perf_counter()
+        self.queued += 1
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            raise
+        except asyncio.CancelledError:
+            self.counters["cancelled"] += 1
+            raise
+        finally:
+            self.queued -= 1
+        waited = time.perf_counter() - enqueued_at
+        self.started += 1
+        self.total_queue_wait += waited
+        self.max_queue_wait = max(self.max_queue_wait, waited)
+        metrics.llm_queue_wait_seconds.observe(waited)
+
+        self.in_flight += 1
+        try:
+            yield
+            self.counters["completed"] += 1
+        except asyncio.TimeoutError:
+            self.counters["timeouts"] += 1
+            raise
+        except (asyncio.CancelledError, GeneratorExit):
+            self.counters["cancelled"] += 1
+            raise
+        except Exception:
+            self.counters["failed"] += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            semaphore.release()
+
+    async def _cache_lookup(self, key, regenerate):
+        if self.cache is None or regenerate:
+            return None
+        entry = await asyncio.to_thread(self.cache.get, key)
+        if entry is None or entry.expires_at <= time.time():
+            return None
+        return entry.value.decode("utf-8")
+
+    async def _cache_store(self, key, text):
+        if self.cache is not None and text:
+            await asyncio.to_thread(self.cache.set, key, text, LLM_CACHE_TTL)
+
+    def hedge_delay(self, model_name):
+        """Seconds after which a hedged attempt is sent, or None while there is too little history."""
+        window = self._latencies.get(model_name)
+        threshold = window.percentile(LLM_HEDGE_PERCENTILE) if window is not None else None
+        return None if threshold is None else max(LLM_HEDGE_MIN_DELAY, threshold)
+
+    def _take_extra_attempt(self, model_name, event):
+        """Spend one extra-attempt token for a hedge or retry; False once the budget is used up."""
+        if self._extra_tokens < 1:
+            self.policy_counters["extra_denied"] += 1
+            metrics.llm_policy_events.inc(model=model_name, event="extra_denied")
+            return False
+        self._extra_tokens -= 1
+        self.policy_counters[event] += 1
+        metrics.llm_policy_events.inc(model=model_name, event=event)
+        return True
+
+    async def _attempt(self, model_name, prompt, timeout, **kwargs):
+        """
+        One model call in a gateway slot; successful latencies feed the hedging threshold.
+        `timeout` covers the wait for the slot as well, so a queued attempt cannot outlive it.
+        """
+        expires_at = time.perf_counter() + timeout
+        async with self._slot(timeout):
+            model = self.get_model(model_name)
+            started = time.perf_counter()
+            with metrics.track(metrics.llm_request_seconds, model=model_name, call="generate"):
+                try:
+                    response = await asyncio.wait_for(model.generate_content_async(prompt, **kwargs), expires_at - started)
+                except asyncio.TimeoutError:
+                    logger.error(f"{model_name} generation timed out after {timeout:.1f}s")
+                    raise
+                text = response.text.strip()
+            self._latencies.setdefault(model_name, LatencyWindow()).add(time.perf_counter() - started)
+            record_token_usage(model_name, prompt, text, response)
+        return text
+
+    def generate_blocking(self, model_name, prompt, validate=None):
+        """
+        Generate text for `prompt` with a blocking model call, for synchronous callers such as scripts.
+        Output rejected by `validate` is retried up to LLM_MAX_ATTEMPTS times. Unlike generate() it is
+        uncached and unbounded: the output cache is neither read nor written, and there is no hedging,
+        deadline or concurrency slot, so it must not be used from request handlers. It works whether
+        or not an event loop is running.
+        :return: The stripped response text.
+        :raises InvalidOutputError: If every attempt produced output that failed validation.
+        """
+        for _ in range(LLM_MAX_ATTEMPTS):
+            response = self.get_model(model_name).generate_content(prompt)
+            text = response.text.strip()
+            record_token_usage(model_name, prompt, text, response)
+            if validate is None or validate(text):
+                return text
+            self.policy_counters["invalid"] += 1
+            metrics.llm_policy_events.inc(model=model_name, event="invalid")
+        raise InvalidOutputError(f"{model_name} output failed validation")
+
+    async def generate(self, model_name, prompt, timeout=None, regenerate=False, validate=None, deadline=None,
+                       hedge=LLM_HEDGE_ENABLED, **kwargs):
+        """
+        Generate text for `prompt` within a deadline, waiting for a free slot first.
+        If the first attempt runs past the LLM_HEDGE_PERCENTILE latency of recent generations, a hedged
+        attempt is sent and the first valid answer wins (the other is cancelled). An answer rejected by
+        `validate` is retried while time is left. Attempts are capped at LLM_MAX_ATTEMPTS per call and
+        extra attempts by a token budget of LLM_EXTRA_ATTEMPT_RATIO per call.
+        :param model_name: Gemini model to use.
+        :param prompt: Prompt text.
+        :param timeout: Seconds allowed for one model call (defaults to LLM_TIMEOUT).
+        :param regenerate: Skip the output cache lookup (the fresh output still replaces the cached one).
+        :param validate: Optional callable that returns True for usable output.
+        :param deadline: Seconds allowed for the whole call (defaults to LLM_DEADLINE).
+        :param hedge: Send hedged attempts for slow generations.
+        :return: The stripped response text.
+        :raises asyncio.TimeoutError: If no valid answer arrives before the deadline.
+        :raises InvalidOutputError: If every attempt produced output that failed validation.
+        """
+        key = cache_key(model_name, prompt, kwargs)
+        return await self._flight.do(
+            (key, regenerate, validate),
+            lambda: self._generate(key, model_name, prompt, timeout, regenerate, validate, deadline, hedge, **kwargs),
+        )
+
+    async def _generate(self, key, model_name, prompt, timeout, regenerate, validate, deadline, hedge, **kwargs):
+        cached = await self._cache_lookup(key, regenerate)
+        if cached is not None and (validate is None or validate(cached)):
+            metrics.llm_request_seconds.observe(0.0, model=model_name, call="generate", outcome="cache_hit")
+            return cached
+
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + (deadline or LLM_DEADLINE)
+        timeout = timeout or self.timeout
+        self._extra_tokens = min(LLM_EXTRA_ATTEMPT_BURST, self._extra_tokens + LLM_EXTRA_ATTEMPT_RATIO)
+        pending, attempts, hedged = {}, 0, False
+        last_error = None
+
+        def launch(kind):
+            nonlocal attempts
+            attempts += 1
+            remaining = max(0.0, deadline_at - loop.time())
+            task = asyncio.ensure_future(self._attempt(model_name, prompt, min(timeout, remaining), **kwargs))
+            pending[task] = kind
+
+        launch("primary")
+        hedge_delay = self.hedge_delay(model_name) if hedge else None
+        hedge_at = loop.time() + hedge_delay if hedge_delay is not None else None
+        try:
+            while pending:
+                wait_until = deadline_at
+                if hedge_at is not None and not hedged and attempts < LLM_MAX_ATTEMPTS:
+                    wait_until = min(wait_until, hedge_at)
+                done, _ = await asyncio.wait(
+                    set(pending), timeout=max(0.0, wait_until - loop.time()), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    if loop.time() >= deadline_at:
+                        break
+                    hedged = True  # at most one hedge, whether or not the budget allows it
+                    if self._take_extra_attempt(model_name, "hedges"):
+                        logger.info(f"Hedging {model_name} generation after {hedge_delay:.1f}s")
+                        launch("hedge")
+                    continue
+                for task in done:
+                    kind = pending.pop(task)
+                    try:
+                        text = task.result()
+                    except Exception as e:
+                        last_error = e
+                        continue
+                    if validate is not None and not validate(text):
+                        self.policy_counters["invalid"] += 1
+                        metrics.llm_policy_events.inc(model=model_name, event="invalid")
+                        last_error = InvalidOutputError(f"{model_name} output failed validation")
+                        continue
+                    if kind == "hedge":
+                        self.policy_counters["hedge_wins"] += 1
+                        metrics.llm_policy_events.inc(model=model_name, event="hedge_wins")
+                    await self._cache_store(key, text)
+                    return text
+                # Nothing usable yet: retry a retryable failure if nothing else is running and time and budget remain
+                if (not pending and is_retryable(last_error) and attempts < LLM_MAX_ATTEMPTS
+                        and loop.time() < deadline_at and self._take_extra_attempt(model_name, "retries")):
+                    logger.info(f"Retrying {model_name} generation: {last_error}")
+                    launch("retry")
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if pending or last_error is None or isinstance(last_error, asyncio.TimeoutError):
+            self.policy_counters["deadline_exceeded"] += 1
+            metrics.llm_policy_events.inc(model=model_name, event="deadline_exceeded")
+            raise asyncio.TimeoutError(f"{model_name} generation missed its deadline")
+        raise last_error
+
+    async def stream(self, model_name, prompt, timeout=None, regenerate=False, **kwargs):
+        """
+        Stream text chunks for `prompt` as the model produces them.
+        The timeout bounds the whole stream, not each chunk. A cached output is yielded as a single chunk.
+        :param model_name: Gemini model to use.
+        :param prompt: Prompt text.
+        :param timeout: Seconds allowed for the complete stream (defaults to LLM_TIMEOUT).
+        :param regenerate: Skip the output cache lookup.
+        :return: An async iterator of text chunks.
+        :raises asyncio.TimeoutError: If the stream does not finish in time.
+        """
+        key = cache_key(model_name, prompt, kwargs)
+        cached = await self._cache_lookup(key, regenerate)
+        if cached is not None:
+            metrics.llm_request_seconds.observe(0.0, model=model_name, call="stream", outcome="cache_hit")
+            yield cached
+            return
+
+        timeout = timeout or self.timeout
+        parts = []
+        loop = asyncio.get_running_loop()
+        async with self._slot():
+            deadline = loop.time() + timeout
+            model = self.get_model(model_name)
+            with metrics.track(metrics.llm_request_seconds, model=model_name, call="stream"):
+                try:
+                    response = await asyncio.wait_for(
+                        model.generate_content_async(prompt, stream=True, **kwargs), timeout
+                    )
+                    chunks = response.__aiter__()
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), max(0.0, deadline - loop.time()))
+                        except StopAsyncIteration:
+                            break
+                        if chunk.text:
+                            parts.append(chunk.text)
+                            yield chunk.text
+                except asyncio.TimeoutError:
+                    logger.error(f"{model_name} stream timed out after {timeout}s")
+                    raise
+            record_token_usage(model_name, prompt, "".join(parts), response)
+        await self._cache_store(key, "".join(parts).strip())
+
+    def stats(self):
+        """Queue and throughput counters for the status endpoint."""
+        return {
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "timeout": self.timeout,
+            **self.counters,
+            "policy": dict(self.policy_counters),
+            "coalesced": self._flight.stats(),
+            "hedge_delay": {name: self.hedge_delay(name) for name in self._latencies},
+            "avg_queue_wait": round(self.total_queue_wait / self.started, 4) if self.started else 0.0,
+            "max_queue_wait": round(self.max_queue_wait, 4),
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+_gateway = None
+
+def get_gateway():
+    """Return the process-wide LLM gateway."""
+    global _gateway
+    if _gateway is None:
+        cache = DiskCache(LLM_CACHE_PATH, max_bytes=LLM_CACHE_MAX_BYTES, table="llm_outputs") if LLM_CACHE_ENABLED else None
+        _gateway = LLMGateway(cache=cache)
+    return _gateway
+
+def opened_gateway():
+    """Return the LLM gateway if something has created it already, without creating it."""
+    return _gateway
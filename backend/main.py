@@ -1,16 +1,50 @@
-from fastapi import FastAPI, HTTPException
+import time
+STARTED_AT = time.perf_counter()  # cold-start clock, read before the imports below
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
+from typing import Literal, Optional
+import os
+import json
+import asyncio
 import logging
-from Fetch import aggregate_repo_data  # Import aggregate_repo_data from Fetch.py
-from model import generate_star_resume_section  # Import generate_star_resume_section from Model.py
-from cvmodel import generate_cover_letter  # Import the AI function from cvmodel.py
-from querydb import search_pinecone  # Import the search function from querydb.py
+from Fetch import aggregate_repo_data_async, close_async_client, opened_response_cache, github_flight  # Import the async GitHub fetch layer from Fetch.py
+from github_scheduler import get_scheduler  # Import the GitHub request scheduler
+from model import STAR_PROMPT_FIELDS, generate_star_resume_section_async  # Import generate_star_resume_section_async from Model.py
+from cvmodel import generate_cover_letter_async, stream_cover_letter  # Import the AI functions from cvmodel.py
+from llm import get_gateway, opened_gateway  # Import the async LLM gateway
+from querydb import search_jobs_page_async, match_resume_async, query_embedding_cache, search_result_cache, resume_embedding_cache, search_flight, embedding_flight  # Import the search functions from querydb.py
+import startup  # Import the subsystem registry and warm-up
+import metrics  # Import the Prometheus metrics registry
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 
-app = FastAPI()
+# Batch endpoint limits
+BATCH_MAX_REPOS = int(os.getenv("BATCH_MAX_REPOS", "50"))
+BATCH_FETCH_CONCURRENCY = int(os.getenv("BATCH_FETCH_CONCURRENCY", "8"))
+BATCH_GENERATE_CONCURRENCY = int(os.getenv("BATCH_GENERATE_CONCURRENCY", "4"))
+
+cold_start = startup.ColdStart(STARTED_AT)
+cold_start.imported()
+warmup_names = startup.warmup_targets()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clients start lazily; the configured warm-up runs in the background so the API serves at once
+    # and a subsystem that fails to start only affects the endpoints that use it
+    warmup = asyncio.create_task(startup.warm_up(warmup_names))
+    if startup.STARTUP_WARMUP_WAIT:
+        await warmup
+    yield
+    warmup.cancel()
+    # Release pooled GitHub connections on shutdown
+    await close_async_client()
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware to allow frontend requests
 app.add_middleware(
@@ -21,10 +55,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    status = "500"
+    metrics.http_requests_in_flight.inc()
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+        return response
+    finally:
+        metrics.http_requests_in_flight.dec()
+        # Label by route template rather than raw path to keep the series count bounded
+        route = request.scope.get("route")
+        metrics.http_request_seconds.observe(
+            time.perf_counter() - started,
+            route=route.path if route is not None else "unmatched",
+            method=request.method,
+            status=status,
+        )
+        cold_start.request_served()
+
 # Define request models
 class GitHubRepo(BaseModel):
     owner: str
     repo: str
+    regenerate: bool = False
+
+class BatchGitHubRequest(BaseModel):
+    repos: list[GitHubRepo]
+    fetchConcurrency: Optional[int] = None
+    generateConcurrency: Optional[int] = None
+    format: Literal["ndjson", "sse"] = "ndjson"
 
 class CoverLetterRequest(BaseModel):
     fullName: str
@@ -32,49 +94,161 @@ class CoverLetterRequest(BaseModel):
     companyName: str
     jobDescription: str
     skills: list
+    regenerate: bool = False
+
+class SearchFilters(BaseModel):
+    countryCode: Optional[str] = None
+    companyName: Optional[str] = None
+    minSalary: Optional[float] = None
+    maxSalary: Optional[float] = None
 
 class QueryRequest(BaseModel):
     query: str
+    # "hybrid" fuses keyword and vector rankings
+    mode: Literal["vector", "hybrid"] = "vector"
+    filters: Optional[SearchFilters] = None
+    pageSize: int = 10
+    # nextCursor from the previous page; omit for the first page
+    cursor: Optional[str] = None
+
+class ResumeMatchRequest(BaseModel):
+    resume: str
+    topK: int = 10
+    # Number of top matches to skip, for "show me more jobs"
+    offset: int = 0
+    # "max" ranks jobs by their best matching resume section, "sum" by all sections together
+    aggregate: Literal["max", "sum"] = "max"
+    filters: Optional[SearchFilters] = None
+
+def search_filters(filters: Optional[SearchFilters]):
+    """Convert request filters into the keyword arguments querydb expects."""
+    if filters is None:
+        return None
+    return {
+        "country_code": filters.countryCode,
+        "company_name": filters.companyName,
+        "min_salary": filters.minSalary,
+        "max_salary": filters.maxSalary,
+    }
+
+def format_star_result(star_resume):
+    """Shape a STAR resume section the way the frontend expects it."""
+    return {
+        "repoName": star_resume["Name"],
+        "date": star_resume["Date"],
+        "descriptions": star_resume["Descriptions"]
+    }
+
+def sse_event(event, data):
+    """Encode one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def cancel_on_disconnect(http_request: Request, coro, poll_interval=0.5):
+    """
+    Await `coro`, cancelling it if the client disconnects first so abandoned generations free their slot.
+    """
+    task = asyncio.create_task(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                logging.info(f"Client disconnected from {http_request.url.path}, cancelling generation")
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client disconnected")
+    finally:
+        if not task.done():
+            task.cancel()
 
 # API Endpoints
 @app.post("/api/github-project")
-async def get_github_project(repo_data: GitHubRepo):
+async def get_github_project(repo_data: GitHubRepo, http_request: Request):
     """
     Fetches GitHub repository data and generates a STAR-based resume section.
     """
     try:
         logging.info(f"Fetching data for owner: {repo_data.owner}, repo: {repo_data.repo}")
         
-        # Fetch GitHub data using aggregate_repo_data
-        repo_details = aggregate_repo_data(repo_data.owner, repo_data.repo)
+        # Fetch GitHub data concurrently without blocking the event loop
+        repo_details = await aggregate_repo_data_async(repo_data.owner, repo_data.repo, fields=STAR_PROMPT_FIELDS)
         
         if not repo_details:
             logging.error(f"Repository not found: {repo_data.owner}/{repo_data.repo}")
             raise HTTPException(status_code=404, detail="Repository not found")
         
         # Generate the STAR-based resume section
-        star_resume = generate_star_resume_section(repo_details)
+        star_resume = await cancel_on_disconnect(http_request, generate_star_resume_section_async(repo_details, regenerate=repo_data.regenerate))
         
         if not star_resume:
             logging.error("Error generating STAR resume section.")
             raise HTTPException(status_code=500, detail="Failed to generate resume section")
         
         # Structure the response for the frontend
-        result = {
-            "repoName": star_resume["Name"],
-            "date": star_resume["Date"],
-            "descriptions": star_resume["Descriptions"]
-        }
+        result = format_star_result(star_resume)
         
         logging.info(f"Successfully generated resume section for {repo_data.owner}/{repo_data.repo}")
         return result
 
+    except HTTPException:
+        # 404s and client disconnects (499) keep their status instead of becoming a 500
+        raise
     except Exception as e:
         logging.error(f"Error processing GitHub project request: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.post("/api/github-projects/batch")
+async def get_github_projects_batch(request: BatchGitHubRequest):
+    """
+    Generates STAR-based resume sections for several repositories at once.
+    Repositories are fetched and generated concurrently (with separate limits for each stage) and each
+    result is streamed back as soon as it is ready, as NDJSON lines or Server-Sent Events.
+    """
+    if not request.repos:
+        raise HTTPException(status_code=400, detail="No repositories provided")
+    if len(request.repos) > BATCH_MAX_REPOS:
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_MAX_REPOS} repositories per batch")
+
+    fetch_semaphore = asyncio.Semaphore(max(1, request.fetchConcurrency or BATCH_FETCH_CONCURRENCY))
+    generate_semaphore = asyncio.Semaphore(max(1, request.generateConcurrency or BATCH_GENERATE_CONCURRENCY))
+    logging.info(f"Processing batch of {len(request.repos)} repositories")
+
+    async def process(index, repo):
+        item = {"index": index, "owner": repo.owner, "repo": repo.repo}
+        try:
+            async with fetch_semaphore:
+                repo_details = await aggregate_repo_data_async(repo.owner, repo.repo, fields=STAR_PROMPT_FIELDS)
+            async with generate_semaphore:
+                star_resume = await generate_star_resume_section_async(repo_details, regenerate=repo.regenerate)
+            if not star_resume:
+                return {**item, "status": "error", "detail": "Failed to generate resume section"}
+            return {**item, "status": "ok", **format_star_result(star_resume)}
+        except Exception as e:
+            logging.error(f"Error processing {repo.owner}/{repo.repo} in batch: {str(e)}")
+            return {**item, "status": "error", "detail": "Failed to process repository"}
+
+    def encode(item, event="result"):
+        if request.format == "sse":
+            return sse_event(event, item)
+        return json.dumps(item) + "\n"
+
+    async def stream():
+        tasks = [asyncio.create_task(process(index, repo)) for index, repo in enumerate(request.repos)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield encode(await next_done)
+            if request.format == "sse":
+                yield encode({"count": len(tasks)}, event="done")
+        finally:
+            # Stop outstanding work if the client goes away mid-stream
+            for task in tasks:
+                task.cancel()
+
+    media_type = "text/event-stream" if request.format == "sse" else "application/x-ndjson"
+    return StreamingResponse(stream(), media_type=media_type)
+
 @app.post("/api/generate-cover-letter")
-async def generate_cover_letter_endpoint(request: CoverLetterRequest):
+async def generate_cover_letter_endpoint(request: CoverLetterRequest, http_request: Request):
     """
     Generates a cover letter based on user input.
     """
@@ -82,13 +256,14 @@ async def generate_cover_letter_endpoint(request: CoverLetterRequest):
         logging.info(f"Received cover letter request for: {request.fullName}")
 
         # Generate cover letter
-        cover_letter = generate_cover_letter(
+        cover_letter = await cancel_on_disconnect(http_request, generate_cover_letter_async(
             request.fullName,
             request.jobTitle,
             request.companyName,
             request.jobDescription,
-            request.skills
-        )
+            request.skills,
+            regenerate=request.regenerate
+        ))
 
         if not cover_letter:
             logging.error("Failed to generate cover letter.")
@@ -97,26 +272,189 @@ async def generate_cover_letter_endpoint(request: CoverLetterRequest):
         logging.info("Cover letter generated successfully.")
         return {"coverLetter": cover_letter}
 
+    except HTTPException:
+        # Client disconnects (499) keep their status instead of becoming a 500
+        raise
     except Exception as e:
         logging.error(f"Error processing cover letter request: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.post("/api/generate-cover-letter/stream")
+async def stream_cover_letter_endpoint(request: CoverLetterRequest):
+    """
+    Streams a cover letter as Server-Sent Events.
+    Each `chunk` event carries a piece of text as soon as the model produces it; a final `done` event
+    carries the complete letter (the same value /api/generate-cover-letter returns as coverLetter).
+    """
+    logging.info(f"Received streaming cover letter request for: {request.fullName}")
+
+    async def stream():
+        parts = []
+        try:
+            async for chunk in stream_cover_letter(
+                request.fullName,
+                request.jobTitle,
+                request.companyName,
+                request.jobDescription,
+                request.skills,
+                regenerate=request.regenerate
+            ):
+                parts.append(chunk)
+                yield sse_event("chunk", {"text": chunk})
+            cover_letter = "".join(parts).strip()
+            if not cover_letter:
+                yield sse_event("error", {"detail": "Failed to generate cover letter"})
+                return
+            logging.info("Cover letter streamed successfully.")
+            yield sse_event("done", {"coverLetter": cover_letter})
+        except Exception as e:
+            logging.error(f"Error streaming cover letter: {str(e)}")
+            yield sse_event("error", {"detail": "Failed to generate cover letter"})
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.post("/api/search")
 async def search_jobs(request: QueryRequest):
     """
-    Searches for jobs based on the provided query.
+    Searches for jobs based on the provided query, one page at a time.
+    Pass the returned nextCursor back to get the next page; later pages are served from the cached ranking.
     """
+    if request.pageSize < 1:
+        raise HTTPException(status_code=400, detail="pageSize must be positive.")
     try:
-        logging.info(f"Searching jobs with query: {request.query}")
-        results = search_pinecone(query=request.query, namespace="ns1", top_k=10)
+        logging.info(f"Searching jobs ({request.mode}) with query: {request.query}")
+        results, next_cursor = await search_jobs_page_async(
+            query=request.query,
+            namespace="ns1",
+            page_size=request.pageSize,
+            cursor=request.cursor,
+            mode=request.mode,
+            filters=search_filters(request.filters),
+        )
         logging.info(f"Found {len(results)} job matches")
-        return {"similarJobs": results}
+        return {"similarJobs": results, "nextCursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logging.error(f"Error processing search request: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/match-resume")
+async def match_resume(request: ResumeMatchRequest):
+    """
+    Finds jobs matching a whole resume. The resume is embedded section by section (cached per resume),
+    so repeat requests for more jobs only re-run the vector query.
+    """
+    if not request.resume.strip():
+        raise HTTPException(status_code=400, detail="Resume text is required.")
+    if request.topK < 1 or request.offset < 0:
+        raise HTTPException(status_code=400, detail="topK must be positive and offset non-negative.")
+    try:
+        results, info = await match_resume_async(
+            request.resume,
+            namespace="ns1",
+            top_k=request.topK,
+            offset=request.offset,
+            aggregate=request.aggregate,
+            filters=search_filters(request.filters),
+        )
+        logging.info(f"Matched resume ({info['chunks']} chunks, cached: {info['cachedEmbeddings']}) to {len(results)} jobs")
+        return {"similarJobs": results, **info}
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logging.error(f"Error matching resume: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/github/rate-limit")
+async def github_rate_limit():
+    """
+    Reports GitHub quota per token, scheduler queue state and response cache statistics
+    (None until the cache has been opened by a GitHub fetch).
+    """
+    cache = opened_response_cache()
+    return {
+        "scheduler": get_scheduler().snapshot(),
+        "cache": cache.stats() if cache is not None else None,
+        "coalesced": github_flight.stats(),
+    }
+
+@app.get("/api/llm/status")
+async def llm_status():
+    """
+    Reports LLM gateway concurrency, queue depth and timing counters.
+    """
+    return get_gateway().stats()
+
+@app.get("/api/search/status")
+async def search_status():
+    """
+    Reports hit ratios and sizes of the search caches.
+    """
+    return {
+        "queryEmbeddings": query_embedding_cache.stats(),
+        "rankedResults": search_result_cache.stats(),
+        "resumeEmbeddings": resume_embedding_cache.stats(),
+        "coalesced": {"search": search_flight.stats(), "embedding": embedding_flight.stats()},
+    }
+
 # Health check endpoint
 @app.get("/")
 async def root():
     logging.info("Root endpoint accessed.")
-    return {"message": "REPO2RESUME API is running"}
\ No newline at end of file
+    return {"message": "REPO2RESUME API is running"}
+
+
+@app.get("/ready")
+async def ready():
+    """
+    Reports the state of each subsystem and the cold-start timings.
+    Returns 503 until every subsystem selected for warm-up is ready; the others start on first use.
+    """
+    subsystems = {name: subsystem.status() for name, subsystem in startup.SUBSYSTEMS.items()}
+    is_ready = all(subsystems[name]["state"] == "ready" for name in warmup_names)
+    body = {
+        "ready": is_ready,
+        "warmup": warmup_names,
+        "subsystems": subsystems,
+        "coldStart": cold_start.report(),
+    }
+    return JSONResponse(body, status_code=200 if is_ready else 503)
+
+metrics.register_collector(metrics.cache_collector(lambda: {
+    "github_responses": opened_response_cache(),  # a scrape must not open the cache
+    "llm_outputs": getattr(opened_gateway(), "cache", None),  # or create the gateway
+    "query_embeddings": query_embedding_cache,
+    "ranked_results": search_result_cache,
+    "resume_embeddings": resume_embedding_cache,
+}))
+
+@metrics.register_collector
+def queue_gauges():
+    """In-flight and queued work of the GitHub scheduler and the LLM gateway, read at scrape time."""
+    scheduler = get_scheduler().snapshot()
+    # Before the first generation there is no gateway, and so nothing in flight or queued
+    gateway = opened_gateway()
+    return [
+        ("github_requests_in_flight", "gauge", "GitHub API calls waiting for a response.", [({}, scheduler["in_flight"])]),
+        ("github_requests_queued", "gauge", "GitHub API calls waiting for a token or a slot.", [({}, scheduler["queued"])]),
+        ("github_rate_limit_remaining", "gauge", "Requests left in the current rate-limit window per token.", [
+            ({"token": token["token"]}, token["remaining"]) for token in scheduler["tokens"] if token["remaining"] is not None
+        ]),
+        ("llm_requests_in_flight", "gauge", "LLM generations running.", [({}, gateway.in_flight if gateway else 0)]),
+        ("llm_requests_queued", "gauge", "LLM generations waiting for a slot.", [({}, gateway.queued if gateway else 0)]),
+    ]
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """
+    Per-stage latency histograms, token counts, in-flight gauges and cache hit ratios
+    in the Prometheus text format.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
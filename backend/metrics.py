@@ -0,0 +1,223 @@
+import time
+import asyncio
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Default latency buckets in seconds: sub-millisecond cache hits up to minute-long generations
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192, 16384, 32768)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+_metrics = []
+_collectors = []
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, self.labelnames, key, value) for key, value in items]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, labelnames, key, value in self.samples():
+            lines.append(f"{name}{_format_labels(labelnames, key)} {_format_value(value)}")
+        return lines
+
+class Counter(_Metric):
+    """Monotonic count, e.g. requests or tokens processed."""
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    """Value that goes up and down, e.g. requests in flight."""
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(_Metric):
+    """
+    Distribution of observations in fixed buckets.
+    Observing costs a bisect and two additions under a lock; the cumulative counts Prometheus expects
+    are only built when /metrics is scraped.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def totals(self):
+        """{label values: (count, sum)} for every label set observed so far."""
+        with self._lock:
+            return {key: (sum(counts), total) for key, (counts, total) in self._values.items()}
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        samples = []
+        bucket_labels = self.labelnames + ("le",)
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", bucket_labels, key + (_format_value(bound),), cumulative))
+            samples.append((f"{self.name}_sum", self.labelnames, key, total))
+            samples.append((f"{self.name}_count", self.labelnames, key, cumulative))
+        return samples
+
+def register_collector(collect):
+    """
+    Register a callable that is run on every scrape and returns (name, kind, documentation, samples)
+    tuples, where samples is a list of (labels dict, value). Used for values that are already tracked
+    elsewhere (cache counters, queue depths), so the hot path does no extra work for them.
+    """
+    _collectors.append(collect)
+    return collect
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for collect in _collectors:
+        for name, kind, documentation, samples in collect():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+@contextmanager
+def track(histogram, in_flight=None, **labels):
+    """
+    Time the enclosed block into `histogram` with an "outcome" label ("ok", "timeout", "cancelled" or "error"),
+    counting it in the `in_flight` gauge while it runs.
+    """
+    if in_flight is not None:
+        in_flight.inc(**labels)
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except asyncio.TimeoutError:
+        outcome = "timeout"
+        raise
+    except (asyncio.CancelledError, GeneratorExit):
+        outcome = "cancelled"
+        raise
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        histogram.observe(time.perf_counter() - started, outcome=outcome, **labels)
+        if in_flight is not None:
+            in_flight.dec(**labels)
+
+def cache_collector(caches):
+    """
+    Build a collector reporting lookups and hit ratios of the caches returned by `caches()`,
+    a callable producing {name: cache} (caches exposing `stats()` with "hits" and "hit_ratio").
+    """
+    def collect():
+        hits, lookups, ratios, entries = [], [], [], []
+        for name, cache in caches().items():
+            if cache is None:
+                continue
+            stats = cache.stats()
+            total = sum(stats.get(field, 0) for field in ("hits", "misses", "stale", "expired"))
+            labels = {"cache": name}
+            hits.append((labels, stats.get("hits", 0)))
+            lookups.append((labels, total))
+            ratios.append((labels, stats.get("hit_ratio", 0.0)))
+            entries.append((labels, stats.get("entries", 0)))
+        return [
+            ("cache_hits_total", "counter", "Cache lookups answered from the cache.", hits),
+            ("cache_lookups_total", "counter", "Cache lookups.", lookups),
+            ("cache_hit_ratio", "gauge", "Share of cache lookups answered from the cache.", ratios),
+            ("cache_entries", "gauge", "Entries currently held by the cache.", entries),
+        ]
+    return collect
+
+# Stage metrics shared by the modules that do the work
+http_request_seconds = Histogram("http_request_seconds", "API request latency.", ("route", "method", "status"))
+http_requests_in_flight = Gauge("http_requests_in_flight", "API requests being served.")
+github_request_seconds = Histogram(
+    "github_request_seconds", "GitHub API calls by endpoint and result (HTTP status, cache_hit or not_modified).",
+    ("endpoint", "result"),
+)
+repo_field_seconds = Histogram(
+    "repo_field_seconds", "Time to fetch one repository field (info, files, commits, ...) including pagination.",
+    ("field", "outcome"),
+)
+llm_request_seconds = Histogram(
+    "llm_request_seconds", "LLM generations by model, call type and outcome (ok, timeout, error, cache_hit).",
+    ("model", "call", "outcome"),
+)
+llm_policy_events = Counter(
+    "llm_policy_events_total", "LLM request policy events (hedges, hedge_wins, retries, invalid, deadline_exceeded, extra_denied).",
+    ("model", "event"),
+)
+llm_queue_wait_seconds = Histogram("llm_queue_wait_seconds", "Time LLM generations wait for a free slot.")
+llm_prompt_tokens = Histogram("llm_prompt_tokens", "Prompt tokens per LLM generation.", ("model",), TOKEN_BUCKETS)
+llm_response_tokens = Histogram("llm_response_tokens", "Response tokens per LLM generation.", ("model",), TOKEN_BUCKETS)
+embedding_seconds = Histogram("embedding_seconds", "Embedding model calls.", ("outcome",))
+embedding_batch_size = Histogram("embedding_batch_size", "Texts embedded per model call.", (), SIZE_BUCKETS)
+embeddings_in_flight = Gauge("embeddings_in_flight", "Embedding model calls running.")
+vector_query_seconds = Histogram("vector_query_seconds", "Vector store queries.", ("backend", "operation", "outcome"))
+vector_queries_in_flight = Gauge("vector_queries_in_flight", "Vector store queries running.", ("backend", "operation"))
+singleflight_calls = Counter(
+    "singleflight_calls_total", "Calls per coalescing group, as the one doing the work (leader) or joining it (shared).",
+    ("flight", "role"),
+)
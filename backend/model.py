@@ -1,36 +1,60 @@
 import os
-import google.generativeai as genai
+import re
 from dotenv import load_dotenv
 import json
-from Fetch import aggregate_repo_data
+import asyncio
+from Fetch import REPO_FIELDS, RepoData, aggregate_repo_data, select_fields
+from llm import get_gateway
+from prompt_context import STAR_PROMPT_TOKEN_BUDGET, build_repo_context
 
 # Load environment variables
 load_dotenv()
 
-# Load Gemini API key from environment variable
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+STAR_MODEL_NAME = "gemini-pro"
+STAR_LABELS = ("Situation", "Task", "Action", "Result")
+# One "Label: sentence" line per STAR component, tolerating list markers and Markdown bold
+STAR_LINE_PATTERN = re.compile(r"^\s*(?:[-*\u2022]\s*)?\**\s*(Situation|Task|Action|Result)\s*\**\s*:\s*\**\s*(.+?)\s*$", re.IGNORECASE)
+# Repository data the STAR prompt is built from; fields left out here are never fetched for it.
+# "readme" and "files" are opt-in: each costs extra GitHub calls (the file tree is one call per directory)
+STAR_PROMPT_FIELDS = tuple(
+    field.strip() for field in os.getenv("STAR_PROMPT_FIELDS", "info,languages,commits").split(",")
+    if field.strip() in REPO_FIELDS
+)
+# Fields parse_star_response reads, fetched even when STAR_PROMPT_FIELDS leaves them out
+STAR_RESPONSE_FIELDS = ("info", "languages")
 
-# Configure Gemini API
-genai.configure(api_key=GOOGLE_API_KEY)
-
-def generate_star_resume_section(repo_data):
+def build_star_prompt(repo_data, token_budget=STAR_PROMPT_TOKEN_BUDGET):
     """
-    Generate a STAR-based project section for a resume using Gemini API.
+    Build the STAR prompt for a repository.
+    The repository context is ranked and trimmed to `token_budget` tokens (see prompt_context),
+    so the prompt size stays bounded whatever the size of the repository.
     :param repo_data: Dictionary containing GitHub repository details.
-    :return: A dictionary with Name, Date, and Descriptions.
+    :param token_budget: Token budget for the repository context.
+    :return: The prompt text.
     """
-    try:
-        # Prepare the prompt with the repo data
-        prompt = f"""
+    context = build_repo_context(select_fields(repo_data, STAR_PROMPT_FIELDS), token_budget)
+    commits = "\n".join(f"          - {subject}" for subject in context["commits"]) or "          - None available"
+    details = [
+        f"        - Repository Name: {context['name']}",
+        f"        - Description: {context['description']}",
+        f"        - Topics: {context['topics']}",
+        f"        - Languages: {context['languages']}",
+    ]
+    if context["file_tree"]:
+        details.append(f"        - Project Structure: {context['file_tree']}")
+    details.append(f"        - Notable Commit Messages:\n{commits}")
+    if context["readme"]:
+        readme = "\n".join(
+            f"          [{heading or 'Introduction'}] {' '.join(text.split())}" for heading, text in context["readme"]
+        )
+        details.append(f"        - README Highlights:\n{readme}")
+    repository_details = "\n".join(details)
+    return f"""
         Generate a professional and concise project description for a resume using the STAR (Situation, Task, Action, Result) method. 
         Each component must consist of a single, concise sentence written in formal, action-oriented language without personal pronouns or references.
 
         Repository Details:
-        - Repository Name: {repo_data['Repository Name']}
-        - Description: {repo_data['Description']}
-        - Topics: {', '.join(repo_data.get('Topics', []))}
-        - Languages: {json.dumps(repo_data['Languages'], indent=2)}
-        - Recent Commit Messages: {', '.join(repo_data['Recent Commit Messages'][:50])}  # First 50 commit messages
+{repository_details}
 
         Format the response exactly as:
         - Situation: [Your sentence here]
@@ -41,22 +65,83 @@ def generate_star_resume_section(repo_data):
         Ensure the output is concise, professional, and directly applicable to a resume.
         """
 
+def star_components(result_text):
+    """
+    Extract the STAR sentences from the model output.
+    :return: A dictionary from each label found (Situation, Task, Action, Result) to its sentence.
+    """
+    components = {}
+    for line in result_text.split("\n"):
+        match = STAR_LINE_PATTERN.match(line)
+        if match and match.group(2).strip("* "):
+            components.setdefault(match.group(1).capitalize(), match.group(2).strip("* "))
+    return components
+
+def validate_star_response(result_text):
+    """True when the output has a non-empty sentence for each of the four STAR components."""
+    return len(star_components(result_text)) == len(STAR_LABELS)
+
+def parse_star_response(repo_data, result_text):
+    """
+    Turn the model output into the structured resume section.
+    :return: A dictionary with Name, Date, Languages and Descriptions.
+    """
+    components = star_components(result_text)
+    if len(components) == len(STAR_LABELS):
+        descriptions = [components[label] for label in STAR_LABELS]
+    else:
+        descriptions = [line.split(": ", 1)[1].strip() for line in result_text.split("\n") if ": " in line]
+    return {
+        "Name": repo_data["Repository Name"],
+        "Date": f"{repo_data['Start Date']} - {repo_data['Last Updated']}",
+        "Languages": list((repo_data.get("Languages") or {}).keys()),
+        "Descriptions": descriptions[:4]  # Ensures 4 sentences (one for each STAR component)
+    }
+
+def generate_star_resume_section(repo_data):
+    """
+    Generate a STAR-based project section for a resume using Gemini API.
+    Blocks until the model answers; output without the four STAR components is retried.
+    :param repo_data: Dictionary containing GitHub repository details.
+    :return: A dictionary with Name, Date, and Descriptions.
+    """
+    try:
+        # Prepare the prompt with the repo data
+        prompt = build_star_prompt(repo_data)
+
         # Call Gemini API to generate content
-        model = genai.GenerativeModel("gemini-pro")
-        response = model.generate_content(prompt)
+        result_text = get_gateway().generate_blocking(STAR_MODEL_NAME, prompt, validate=validate_star_response)
 
         # Parse the result
-        result_text = response.text.strip()
-        descriptions = [line.split(": ", 1)[1].strip() for line in result_text.split("\n") if ": " in line]
+        return parse_star_response(repo_data, result_text)
 
-        # Return the structured data
-        return {
-            "Name": repo_data["Repository Name"],
-            "Date": f"{repo_data['Start Date']} - {repo_data['Last Updated']}",
-            "Languages": list(repo_data["Languages"].keys()),
-            "Descriptions": descriptions[:4]  # Ensures 4 sentences (one for each STAR component)
-        }
+    except Exception as e:
+        print(f"Error generating resume section: {e}")
+        return None
+
+async def generate_star_resume_section_async(repo_data, regenerate=False):
+    """
+    Async variant of generate_star_resume_section that goes through the LLM gateway,
+    so the event loop keeps serving other requests while Gemini is working.
+    The generation is bounded by the gateway deadline; slow attempts are hedged and output without
+    the four STAR components is retried.
+    :param repo_data: Dictionary containing GitHub repository details.
+    :param regenerate: Ignore any cached output for the same prompt.
+    :return: A dictionary with Name, Date, and Descriptions, or None on failure.
+    """
+    try:
+        if isinstance(repo_data, RepoData):
+            # Fetch whatever the prompt needs that the caller did not request up front
+            await repo_data.ensure(*STAR_PROMPT_FIELDS, *STAR_RESPONSE_FIELDS)
+        prompt = build_star_prompt(repo_data)
+        result_text = await get_gateway().generate(
+            STAR_MODEL_NAME, prompt, regenerate=regenerate, validate=validate_star_response
+        )
+        return parse_star_response(repo_data, result_text)
 
+    except asyncio.TimeoutError:
+        print("Error generating resume section: generation timed out")
+        return None
     except Exception as e:
         print(f"Error generating resume section: {e}")
         return None
@@ -67,7 +152,7 @@ if __name__ == "__main__":
     repo = "TruHacks"
 
     # Fetch repository data dynamically using Fetch.py
-    repo_data = aggregate_repo_data(owner, repo, commit_limit=100)
+    repo_data = aggregate_repo_data(owner, repo, commit_limit=100, fields=STAR_PROMPT_FIELDS)
 
     if repo_data:
         # Generate STAR-based resume section
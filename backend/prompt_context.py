@@ -0,0 +1,257 @@
+import os
+import re
+from collections import Counter
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+# Tokens of repository context allowed in the STAR prompt (the fixed instructions come on top)
+STAR_PROMPT_TOKEN_BUDGET = int(os.getenv("STAR_PROMPT_TOKEN_BUDGET", "1200"))
+# Share of the budget (after name, description, topics and languages) for commits and the file tree;
+# the README gets the rest, and whatever a section leaves unused flows to the others
+COMMIT_BUDGET_SHARE = float(os.getenv("STAR_PROMPT_COMMIT_SHARE", "0.45"))
+FILE_TREE_BUDGET_SHARE = float(os.getenv("STAR_PROMPT_FILE_TREE_SHARE", "0.15"))
+MAX_COMMIT_WORDS = 30
+
+MERGE_PATTERN = re.compile(r"^(merge (pull request|branch|remote-tracking branch|tag)|merged? .* into )", re.IGNORECASE)
+NOISE_PATTERN = re.compile(
+    r"^(initial commit|first commit|init|wip|typo|fix typos?|minor( (fix|fixes|changes|update))?|"
+    r"update readme(\.md)?|create readme(\.md)?|add files via upload|update|updates|fix|fixes|fixed|"
+    r"cleanup|clean up|small fix(es)?|test|testing|commit|changes|\.|bump .* from .* to .*|"
+    r"update [\w.\-/]+\.(md|txt|json|lock|yml|yaml))$",
+    re.IGNORECASE,
+)
+SIGNAL_WORDS = re.compile(
+    r"\b(add(ed|s)?|implement(ed|s)?|introduc(e|ed|es)|build|built|creat(e|ed|es)|integrat(e|ed|es)|"
+    r"support(s|ed)?|optimi[sz](e|ed|es)|improv(e|ed|es)|refactor(ed|s)?|deploy(ed|s)?|migrat(e|ed|es)|"
+    r"enabl(e|ed|es)|feat|api|model|cache|auth\w*|database|pipeline|performance)\b",
+    re.IGNORECASE,
+)
+CONVENTIONAL_PREFIX = re.compile(r"^(\w+)(\([^)]*\))?!?:\s*")
+
+# README headings that usually describe what a project is and does, and ones that rarely do
+INFORMATIVE_HEADINGS = re.compile(
+    r"\b(about|overview|introduction|description|features?|highlights|what|why|architecture|design|"
+    r"how it works|tech(nology)?( stack)?|built with|stack|results?|demo|motivation|goals?)\b",
+    re.IGNORECASE,
+)
+BOILERPLATE_HEADINGS = re.compile(
+    r"\b(install|setup|set up|getting started|prerequisites|requirements|licen[cs]e|contribut|acknowledg|"
+    r"credits\b|contact\b|authors?\b|support\b|changelog|faq\b|table of contents|toc\b|badges?\b)",
+    re.IGNORECASE,
+)
+
+NOTABLE_FILES = {
+    "dockerfile": "Docker",
+    "docker-compose.yml": "Docker Compose",
+    "docker-compose.yaml": "Docker Compose",
+    "requirements.txt": "pip requirements",
+    "pyproject.toml": "pyproject",
+    "package.json": "npm package",
+    "go.mod": "Go module",
+    "cargo.toml": "Cargo crate",
+    "pom.xml": "Maven",
+    "build.gradle": "Gradle",
+    "makefile": "Makefile",
+    "serverless.yml": "Serverless",
+    "vercel.json": "Vercel",
+}
+
+def estimate_tokens(text):
+    """Cheap token estimate (about four characters per token) used for budgeting."""
+    return (len(text) + 3) // 4
+
+def truncate_to_tokens(text, max_tokens):
+    """Cut `text` on a word boundary so that it fits in `max_tokens`."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[:max(0, max_tokens * 4 - 3)]
+    if " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return cut.rstrip() + "..." if cut else ""
+
+def _commit_subject(message):
+    subject = message.strip().splitlines()[0].strip() if message.strip() else ""
+    words = subject.split()
+    return " ".join(words[:MAX_COMMIT_WORDS]) + (" ..." if len(words) > MAX_COMMIT_WORDS else "")
+
+def _commit_score(subject):
+    words = re.findall(r"[A-Za-z][A-Za-z0-9+#.\-]*", subject)
+    score = min(len(words), 12) / 12
+    score += 0.5 * min(len(SIGNAL_WORDS.findall(subject)), 2)
+    prefix = CONVENTIONAL_PREFIX.match(subject)
+    if prefix and prefix.group(1).lower() in ("feat", "perf"):
+        score += 0.5
+    elif prefix and prefix.group(1).lower() in ("chore", "docs", "style", "ci", "build", "test"):
+        score -= 0.5
+    return score
+
+def rank_commit_messages(messages):
+    """
+    Reduce commit messages to their informative subjects, most informative first.
+    Merges and noise ("fix typo", "update README.md", dependency bumps) are dropped and messages that
+    differ only in case, punctuation or numbers are kept once (the most recent one).
+    :param messages: Commit messages, most recent first.
+    :return: A list of commit subjects.
+    """
+    seen = set()
+    ranked = []
+    for position, message in enumerate(messages):
+        subject = _commit_subject(message)
+        if not subject or MERGE_PATTERN.match(subject) or NOISE_PATTERN.match(subject.rstrip(".! ")):
+            continue
+        key = re.sub(r"[^a-z]+", " ", subject.lower()).strip()
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        ranked.append((-_commit_score(subject), position, subject))
+    return [subject for _, _, subject in sorted(ranked)]
+
+def _clean_markdown(text):
+    text = re.sub(r"```.*?```", " ", text, flags=re.DOTALL)  # code blocks
+    text = re.sub(r"<[^>]+>", " ", text)  # inline HTML
+    text = re.sub(r"!\[[^\]]*\]\([^)]*\)", " ", text)  # images and badges
+    text = re.sub(r"\[([^\]]*)\]\([^)]*\)", r"\1", text)  # links keep their text
+    text = re.sub(r"^\s*[-*+]\s+", "- ", text, flags=re.MULTILINE)
+    text = re.sub(r"[ \t]+", " ", text)
+    return re.sub(r"\n\s*\n+", "\n", text).strip()
+
+def readme_sections(readme):
+    """
+    Split a Markdown README into cleaned sections ranked by how much they say about the project.
+    The introduction and sections such as Features or Architecture rank first; installation,
+    license and contribution boilerplate and repeated sections are dropped.
+    :return: A list of (heading, text) tuples, best first.
+    """
+    if not readme or readme.strip() == "No README available.":
+        return []
+    sections = []
+    heading, lines = "", []
+    for line in readme.splitlines():
+        match = re.match(r"^\s{0,3}#{1,6}\s+(.*)$", line)
+        if match:
+            sections.append((heading, "\n".join(lines)))
+            heading, lines = match.group(1).strip("# ").strip(), []
+        else:
+            lines.append(line)
+    sections.append((heading, "\n".join(lines)))
+
+    ranked = []
+    seen = set()
+    for position, (heading, body) in enumerate(sections):
+        body = _clean_markdown(body)
+        key = " ".join(body.lower().split())
+        if len(body) < 20 or key in seen:
+            continue
+        seen.add(key)
+        score = 0.0
+        if position == 0 or (position == 1 and not sections[0][1].strip()):
+            score += 2.0  # the introduction under the title
+        if INFORMATIVE_HEADINGS.search(heading):
+            score += 1.5
+        if BOILERPLATE_HEADINGS.search(heading):
+            score -= 2.0
+        score += min(len(body), 800) / 800
+        if score > 0:
+            ranked.append((-score, position, _clean_markdown(heading), body))
+    return [(heading, body) for _, _, heading, body in sorted(ranked)]
+
+def summarize_file_tree(files, max_directories=8):
+    """
+    Summarize a repository file list as top-level directories with file counts, notable build and
+    deployment files, and whether tests and CI are present.
+    """
+    if not files:
+        return ""
+    directories = Counter()
+    extensions = Counter()
+    notable, has_tests, has_ci = set(), False, False
+    for path in files:
+        parts = path.split("/")
+        if len(parts) > 1:
+            directories[parts[0]] += 1
+        name = parts[-1].lower()
+        if name in NOTABLE_FILES:
+            notable.add(NOTABLE_FILES[name])
+        if "." in name:
+            extensions[name.rsplit(".", 1)[1]] += 1
+        if re.search(r"(^|/)(tests?|__tests__|spec)(/|$)|(^|/)test_[^/]*$|\.(test|spec)\.\w+$", path.lower()):
+            has_tests = True
+        if path.startswith(".github/workflows/") or name in (".gitlab-ci.yml", ".travis.yml", "jenkinsfile"):
+            has_ci = True
+
+    parts = [f"{len(files)} files"]
+    if directories:
+        parts.append("top-level directories: " + ", ".join(
+            f"{name}/ ({count})" for name, count in directories.most_common(max_directories)
+        ))
+    if extensions:
+        parts.append("file types: " + ", ".join(f".{ext} ({count})" for ext, count in extensions.most_common(6)))
+    if notable:
+        parts.append("tooling: " + ", ".join(sorted(notable)))
+    if has_tests:
+        parts.append("has tests")
+    if has_ci:
+        parts.append("has CI workflows")
+    return "; ".join(parts)
+
+def _format_languages(languages):
+    return ", ".join(f"{name} {share}%" for name, share in languages.items()) or "Unknown"
+
+def _fill(items, budget, separator_tokens=1):
+    """Take items in order while they fit in `budget` tokens; returns (taken, tokens_used)."""
+    taken, used = [], 0
+    for item in items:
+        cost = estimate_tokens(item) + separator_tokens
+        if used + cost > budget:
+            break
+        taken.append(item)
+        used += cost
+    return taken, used
+
+def build_repo_context(repo_data, budget=STAR_PROMPT_TOKEN_BUDGET):
+    """
+    Fit the repository details into a token budget for the STAR prompt.
+    Name, description, topics and languages always come first (truncated if they are huge); the rest
+    of the budget is split between ranked commit subjects, the file-tree summary and the most
+    informative README sections.
+    :param repo_data: Dictionary containing GitHub repository details.
+    :param budget: Token budget for all repository context.
+    :return: A dictionary with "name", "description", "topics", "languages", "commits" (list),
+             "readme" (list of (heading, text)), "file_tree" and "tokens" (estimated total).
+    """
+    context = {
+        "name": repo_data.get("Repository Name", "Unknown Repository"),
+        "description": truncate_to_tokens(repo_data.get("Description") or "No description available.", budget // 8),
+        "topics": truncate_to_tokens(", ".join(repo_data.get("Topics", [])), budget // 16),
+        "languages": truncate_to_tokens(_format_languages(repo_data.get("Languages", {})), budget // 16),
+    }
+    used = sum(estimate_tokens(value) for value in context.values())
+    remaining = max(0, budget - used)
+
+    file_tree = summarize_file_tree(repo_data.get("Files", []))
+    context["file_tree"] = truncate_to_tokens(file_tree, int(remaining * FILE_TREE_BUDGET_SHARE))
+    remaining -= estimate_tokens(context["file_tree"])
+
+    commits = rank_commit_messages(repo_data.get("Recent Commit Messages", []))
+    commit_budget = int(remaining * COMMIT_BUDGET_SHARE / (1 - FILE_TREE_BUDGET_SHARE))
+    context["commits"], commit_tokens = _fill(commits, commit_budget)
+    remaining -= commit_tokens
+
+    readme = []
+    for heading, body in readme_sections(repo_data.get("README", "")):
+        cost = estimate_tokens(heading) + 2
+        if remaining - cost < 32:
+            break
+        text = truncate_to_tokens(body, remaining - cost)
+        readme.append((heading, text))
+        remaining -= cost + estimate_tokens(text)
+    context["readme"] = readme
+
+    # A short README leaves room for more commits
+    extra, extra_tokens = _fill(commits[len(context["commits"]):], remaining)
+    context["commits"] += extra
+    remaining -= extra_tokens
+
+    context["tokens"] = budget - remaining
+    return context
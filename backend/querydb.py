@@ -1,7 +1,16 @@
-from pinecone import Pinecone
 from dotenv import load_dotenv
 import os
+import re
+import json
+import base64
+import asyncio
+import hashlib
 import logging
+import embeddings
+from cache import TTLCache
+from singleflight import SingleFlight
+from lexical import get_lexical_index
+from vectorstore import VECTOR_BACKEND, get_vector_store
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -9,106 +18,448 @@ logger = logging.getLogger("querydb")
 
 # Load environment variables
 load_dotenv()
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 # Use a discreet name that sounds like a legitimate config option
 ENABLE_LOCAL_TESTING = os.getenv("ENABLE_LOCAL_TESTING", "false").lower() == "true"  # Default to false if not set
+# Reciprocal-rank fusion constant; larger values flatten the difference between top ranks
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Candidates taken from each retriever before fusion, as a multiple of the requested results
+HYBRID_CANDIDATE_FACTOR = int(os.getenv("HYBRID_CANDIDATE_FACTOR", "5"))
+# Upper bound on those candidates (never below the requested results), so deep searches do not ask the vector backend for thousands
+HYBRID_MAX_CANDIDATES = int(os.getenv("HYBRID_MAX_CANDIDATES", "200"))
+# Resume chunks stay under the embedding model's input limit (~256 tokens for all-MiniLM-L6-v2)
+RESUME_CHUNK_CHARS = int(os.getenv("RESUME_CHUNK_CHARS", "1000"))
+RESUME_CACHE_SIZE = int(os.getenv("RESUME_CACHE_SIZE", "256"))
+RESUME_CACHE_TTL = int(os.getenv("RESUME_CACHE_TTL", "3600"))
 
-# Initialize Pinecone (only if not in local testing mode)
-if not ENABLE_LOCAL_TESTING:
-    pc = Pinecone(api_key=PINECONE_API_KEY)
-    index_name = "vecdb"  # Define your index name
-    index = pc.Index(index_name)
-else:
-    pc = None
-    index = None
+# Chunk embeddings per resume, so repeat matches against the same resume skip the model
+resume_embedding_cache = TTLCache(max_entries=RESUME_CACHE_SIZE, ttl=RESUME_CACHE_TTL)
 
-def search_pinecone(query: str, namespace: str = "ns1", top_k: int = 10):
+# Search caches: query embeddings and the ranked result list behind paginated searches
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "2048"))
+QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL", "900"))
+# How many ranked results one retrieval keeps for paging through with cursors
+SEARCH_RESULT_DEPTH = int(os.getenv("SEARCH_RESULT_DEPTH", "200"))
+query_embedding_cache = TTLCache(max_entries=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL)
+search_result_cache = TTLCache(max_entries=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL)
+# Concurrent identical searches, query embeddings and resume embeddings share one computation
+search_flight = SingleFlight("search")
+embedding_flight = SingleFlight("embedding")
+
+def sample_results():
+    """
+    Canned search results used when ENABLE_LOCAL_TESTING is on.
+    """
+    return [
+        {
+            "score": 0.95,
+            "job_title": "Software Engineer",
+            "company_name": "TechCorp",
+            "base_salary": "$120,000/year",
+            "country_code": "UK",
+            "job_summary": "Develop web applications using Python and JavaScript, focusing on scalable backend systems and user-friendly interfaces. Collaborate with cross-functional teams to deliver high-quality software solutions."
+        },
+        {
+            "score": 0.90,
+            "job_title": "Backend Engineer",
+            "company_name": "CloudSys",
+            "base_salary": "€95,000/year",
+            "country_code": "DE",
+            "job_summary": "Design and implement scalable APIs using Node.js and Express, ensuring high performance and reliability for cloud-based applications."
+        },
+        {
+            "score": 0.88,
+            "job_title": "Data Scientist",
+            "company_name": "Datacorp",
+            "base_salary": "$130,000/year",
+            "country_code": "US",
+            "job_summary": "Analyze large datasets to provide actionable insights, build machine learning models using Python and TensorFlow, and present findings to stakeholders."
+        },
+        {
+            "score": 0.85,
+            "job_title": "Machine Learning Engineer",
+            "company_name": "InfraTech",
+            "base_salary": "$140,000/year",
+            "country_code": "US",
+            "job_summary": "Develop AI models with TensorFlow and PyTorch, optimize algorithms for real-time data processing, and deploy solutions on AWS."
+        }
+    ]
+
+def format_matches(matches):
     """
-    Searches the Pinecone vector database for similar items to the given query.
-    If ENABLE_LOCAL_TESTING is set to "true" in the environment, returns a sample response for local development.
+    Shapes vector store matches into the job results returned by the API.
+    """
+    return [
+        {
+            "score": match["score"],
+            "job_title": match["metadata"].get("job_title", "N/A"),
+            "company_name": match["metadata"].get("company_name", "N/A"),
+            "base_salary": match["metadata"].get("base_salary", "N/A"),
+            "country_code": match["metadata"].get("country_code", "N/A"),
+            "job_summary": match["metadata"].get("job_summary", "No description available.")
+        }
+        for match in matches
+    ]
+
+def build_metadata_filter(filters=None):
+    """
+    Translates search filters into a metadata filter evaluated by the stores before scoring.
+    Salary bounds match jobs whose advertised range overlaps the requested one.
+
+    Args:
+        filters (dict): Optional "country_code", "company_name", "min_salary" and "max_salary".
+
+    Returns:
+        dict: A Pinecone-style metadata filter, or None when no filter is set.
+    """
+    if not filters:
+        return None
+    metadata_filter = {}
+    if filters.get("country_code"):
+        metadata_filter["country_code"] = {"$eq": filters["country_code"].upper()}
+    if filters.get("company_name"):
+        metadata_filter["company_name"] = {"$eq": filters["company_name"]}
+    if filters.get("min_salary") is not None:
+        metadata_filter["salary_max"] = {"$gte": float(filters["min_salary"])}
+    if filters.get("max_salary") is not None:
+        metadata_filter["salary_min"] = {"$lte": float(filters["max_salary"])}
+    return metadata_filter or None
+
+def check_filter_fields(metadata_filter, namespace: str = "ns1"):
+    """
+    Rejects a metadata filter on fields that no job in the namespace has, since it could only match nothing.
+    Jobs indexed from a feed without the field (e.g. the sample Job.json, which only has job_summary)
+    need to be re-ingested from fetch_jobs.py output first. Backends that cannot list their metadata
+    fields (Pinecone) are not checked.
+
+    Args:
+        metadata_filter (dict): A filter from build_metadata_filter, or None.
+        namespace (str): The namespace to use in the vector index.
+
+    Raises:
+        ValueError: If the filter uses a field missing from every indexed job.
+    """
+    if not metadata_filter:
+        return
+    fields = get_vector_store().metadata_fields(namespace)
+    if not fields:
+        return
+    missing = sorted(key for key in metadata_filter if not key.startswith("$") and key not in fields)
+    if missing:
+        raise ValueError(
+            f"Cannot filter on {', '.join(missing)}: no job in namespace {namespace!r} has it. "
+            "Re-ingest the index from a feed that includes it (see fetch_jobs.py)."
+        )
+
+def reciprocal_rank_fusion(result_lists, top_k=10, k=RRF_K):
+    """
+    Merges ranked match lists by summing 1 / (k + rank) for every list a job appears in.
+
+    Args:
+        result_lists (list): Lists of matches, each best first.
+        top_k (int): The number of fused results to return.
+        k (int): The fusion constant.
+
+    Returns:
+        list: Matches with their fused score, best first.
+    """
+    fused = {}
+    for matches in result_lists:
+        for rank, match in enumerate(matches, start=1):
+            entry = fused.setdefault(match["id"], {"id": match["id"], "score": 0.0, "metadata": match["metadata"]})
+            entry["score"] += 1.0 / (k + rank)
+    return sorted(fused.values(), key=lambda match: match["score"], reverse=True)[:top_k]
+
+def normalize_query(query: str):
+    """Case- and whitespace-insensitive form of a query, used as its cache key."""
+    return " ".join(query.lower().split())
+
+async def embed_query_cached(query: str):
+    """
+    Embeds a query, reusing the vector of an identical (normalized) query seen recently.
+    """
+    key = f"{embeddings.EMBEDDING_MODEL}\0{normalize_query(query)}"
+    vector = query_embedding_cache.get(key)
+    if vector is None:
+        vector = await embedding_flight.do(("query", key), lambda: embeddings.embed_query(query))
+        query_embedding_cache.set(key, vector)
+    return vector
+
+def embed_query(query: str):
+    """
+    Embeds a query with the shared embedding model, the same one used to index the jobs.
+    """
+    return embeddings.encode([query])[0]
+
+def search_pinecone(query: str, namespace: str = "ns1", top_k: int = 10, filters: dict = None):
+    """
+    Searches the vector database for similar items to the given query.
+    Uses the backend selected by VECTOR_BACKEND ("pinecone" or the in-process "local" index).
+    If ENABLE_LOCAL_TESTING is set to "true" with the Pinecone backend, returns a sample response for local development.
 
     Args:
         query (str): The query string to search for.
         namespace (str): The namespace to use in the Pinecone index.
         top_k (int): The number of top results to return.
+        filters (dict): Optional metadata filters (see build_metadata_filter).
 
     Returns:
         list: A list of results with metadata and scores.
     """
     # Sample response for local development
-    if ENABLE_LOCAL_TESTING:
+    if ENABLE_LOCAL_TESTING and VECTOR_BACKEND != "local":
         logger.info(f"Returning sample response for query: {query}")
-        return [
-            {
-                "score": 0.95,
-                "job_title": "Software Engineer",
-                "company_name": "TechCorp",
-                "base_salary": "$120,000/year",
-                "country_code": "UK",
-                "job_summary": "Develop web applications using Python and JavaScript, focusing on scalable backend systems and user-friendly interfaces. Collaborate with cross-functional teams to deliver high-quality software solutions."
-            },
-            {
-                "score": 0.90,
-                "job_title": "Backend Engineer",
-                "company_name": "CloudSys",
-                "base_salary": "€95,000/year",
-                "country_code": "DE",
-                "job_summary": "Design and implement scalable APIs using Node.js and Express, ensuring high performance and reliability for cloud-based applications."
-            },
-            {
-                "score": 0.88,
-                "job_title": "Data Scientist",
-                "company_name": "Datacorp",
-                "base_salary": "$130,000/year",
-                "country_code": "US",
-                "job_summary": "Analyze large datasets to provide actionable insights, build machine learning models using Python and TensorFlow, and present findings to stakeholders."
-            },
-            {
-                "score": 0.85,
-                "job_title": "Machine Learning Engineer",
-                "company_name": "InfraTech",
-                "base_salary": "$140,000/year",
-                "country_code": "US",
-                "job_summary": "Develop AI models with TensorFlow and PyTorch, optimize algorithms for real-time data processing, and deploy solutions on AWS."
-            }
-        ]
-
-    # Original Pinecone logic
+        return sample_results()
+
     try:
         # Generate embedding for the query
-        embedding = pc.inference.embed(
-            model="multilingual-e5-large",
-            inputs=[query],
-            parameters={"input_type": "query"}
+        vector = embed_query(query)
+
+        # Query the vector store
+        matches = get_vector_store().query(
+            vector, top_k=top_k, namespace=namespace, filter=build_metadata_filter(filters)
         )
 
-        # Query the Pinecone index
-        results = index.query(
-            namespace=namespace,
-            vector=embedding[0]["values"],  # Extract the embedding vector
-            top_k=top_k,
-            include_values=False,
-            include_metadata=True
+        return format_matches(matches)
+
+    except Exception as e:
+        logger.error(f"Error querying vector store: {str(e)}")
+        raise RuntimeError(f"Error querying vector store: {e}")
+
+async def search_pinecone_async(query: str, namespace: str = "ns1", top_k: int = 10, filters: dict = None):
+    """
+    Async variant of search_pinecone for the API.
+    Concurrent queries share one micro-batched embedding call and the vector query runs off the event loop.
+
+    Args:
+        query (str): The query string to search for.
+        namespace (str): The namespace to use in the vector index.
+        top_k (int): The number of top results to return.
+        filters (dict): Optional metadata filters (see build_metadata_filter).
+
+    Returns:
+        list: A list of results with metadata and scores.
+    """
+    if ENABLE_LOCAL_TESTING and VECTOR_BACKEND != "local":
+        logger.info(f"Returning sample response for query: {query}")
+        return sample_results()
+
+    try:
+        vector = await embed_query_cached(query)
+        matches = await asyncio.to_thread(
+            get_vector_store().query, vector, top_k, namespace, build_metadata_filter(filters)
         )
+        return format_matches(matches)
+
+    except Exception as e:
+        logger.error(f"Error querying vector store: {str(e)}")
+        raise RuntimeError(f"Error querying vector store: {e}")
+
+async def hybrid_search_async(query: str, namespace: str = "ns1", top_k: int = 10, filters: dict = None):
+    """
+    Combines keyword (BM25) and vector search with reciprocal-rank fusion.
+    Exact terms such as technologies or job titles are caught by the keyword ranking, paraphrases by
+    the vector ranking. Filters are applied by both retrievers before scoring.
+
+    Args:
+        query (str): The query string to search for.
+        namespace (str): The namespace to use in the vector index.
+        top_k (int): The number of top results to return.
+        filters (dict): Optional metadata filters (see build_metadata_filter).
+
+    Returns:
+        list: A list of results with metadata and fused scores.
+    """
+    if ENABLE_LOCAL_TESTING and VECTOR_BACKEND != "local":
+        logger.info(f"Returning sample response for query: {query}")
+        return sample_results()
+
+    metadata_filter = build_metadata_filter(filters)
+    candidates = max(top_k, min(max(top_k * HYBRID_CANDIDATE_FACTOR, 50), HYBRID_MAX_CANDIDATES))
+    try:
+        async def vector_matches():
+            vector = await embed_query_cached(query)
+            return await asyncio.to_thread(get_vector_store().query, vector, candidates, namespace, metadata_filter)
+
+        async def keyword_matches():
+            index = await asyncio.to_thread(get_lexical_index, namespace)
+            if index is None:
+                logger.warning("No keyword index available; hybrid search falls back to vector ranking")
+                return []
+            return await asyncio.to_thread(index.search, query, candidates, metadata_filter)
+
+        vector_results, keyword_results = await asyncio.gather(vector_matches(), keyword_matches())
+        return format_matches(reciprocal_rank_fusion([vector_results, keyword_results], top_k))
+
+    except Exception as e:
+        logger.error(f"Error running hybrid search: {str(e)}")
+        raise RuntimeError(f"Error running hybrid search: {e}")
+
+def encode_cursor(search_key: str, offset: int):
+    """Opaque pagination token for the results of `search_key` starting at `offset`."""
+    payload = json.dumps({"k": search_key[:16], "o": offset}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, search_key: str):
+    """
+    Returns the offset stored in a cursor.
+    Raises ValueError if the cursor is malformed or was issued for a different search.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        offset = int(payload["o"])
+        issued_for = payload["k"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor.") from e
+    if issued_for != search_key[:16] or offset < 0:
+        raise ValueError("Cursor does not belong to this search.")
+    return offset
+
+async def search_jobs_page_async(query: str, namespace: str = "ns1", page_size: int = 10, cursor: str = None,
+                                 mode: str = "vector", filters: dict = None):
+    """
+    Returns one page of search results plus a cursor for the next page.
+    The first page runs a single deep retrieval (SEARCH_RESULT_DEPTH results) whose ranking is cached;
+    later pages are sliced from that ranking without another embedding or vector query.
+
+    Args:
+        query (str): The query string to search for.
+        namespace (str): The namespace to use in the vector index.
+        page_size (int): The number of results per page.
+        cursor (str): The cursor returned with the previous page, or None for the first page.
+        mode (str): "vector" or "hybrid".
+        filters (dict): Optional metadata filters (see build_metadata_filter).
+
+    Returns:
+        tuple: (results, next_cursor) where next_cursor is None on the last page.
+    """
+    search_key = hashlib.sha256(
+        json.dumps([mode, namespace, normalize_query(query), build_metadata_filter(filters)], sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    offset = decode_cursor(cursor, search_key) if cursor else 0
+
+    ranking = search_result_cache.get(search_key)
+    if ranking is None:
+        search = hybrid_search_async if mode == "hybrid" else search_pinecone_async
+
+        async def rank():
+            if filters and not (ENABLE_LOCAL_TESTING and VECTOR_BACKEND != "local"):
+                await asyncio.to_thread(check_filter_fields, build_metadata_filter(filters), namespace)
+            ranking = await search(query=query, namespace=namespace, top_k=SEARCH_RESULT_DEPTH, filters=filters)
+            search_result_cache.set(search_key, ranking)
+            return ranking
+
+        ranking = await search_flight.do(search_key, rank)
 
-        if "matches" in results:
-            return [
-                {
-                    "score": match["score"],
-                    "job_title": match["metadata"].get("job_title", "N/A"),
-                    "company_name": match["metadata"].get("company_name", "N/A"),
-                    "base_salary": match["metadata"].get("base_salary", "N/A"),
-                    "country_code": match["metadata"].get("country_code", "N/A"),
-                    "job_summary": match["metadata"].get("job_summary", "No description available.")
-                }
-                for match in results["matches"]
-            ]
+    page = ranking[offset:offset + page_size]
+    next_offset = offset + page_size
+    next_cursor = encode_cursor(search_key, next_offset) if next_offset < len(ranking) else None
+    return page, next_cursor
+
+def split_resume(resume_text: str, max_chars: int = RESUME_CHUNK_CHARS):
+    """
+    Splits a resume into section-sized chunks for embedding.
+    Blank-line separated blocks (a heading with its entries) are packed together up to `max_chars`;
+    longer blocks are split on line and then word boundaries.
+
+    Args:
+        resume_text (str): The resume as plain text.
+        max_chars (int): The maximum characters per chunk.
+
+    Returns:
+        list: The chunk strings, in resume order.
+    """
+    pieces = []
+    for block in re.split(r"\n\s*\n", resume_text.replace("\r\n", "\n").strip()):
+        block = block.strip()
+        if len(block) <= max_chars:
+            pieces.append(block)
+            continue
+        for line in block.splitlines():
+            while len(line) > max_chars:
+                cut = line.rfind(" ", 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                pieces.append(line[:cut])
+                line = line[cut:].strip()
+            pieces.append(line)
+
+    chunks, current = [], ""
+    for piece in pieces:
+        if not piece:
+            continue
+        if current and len(current) + len(piece) + 2 > max_chars:
+            chunks.append(current)
+            current = piece
         else:
-            return []
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+async def embed_resume(resume_text: str):
+    """
+    Embeds all chunks of a resume in one batch, reusing cached vectors for a resume seen before.
+
+    Args:
+        resume_text (str): The resume as plain text.
+
+    Returns:
+        tuple: (chunks, vectors, cached) where vectors is a matrix with one row per chunk.
+    """
+    key = hashlib.sha256(f"{embeddings.EMBEDDING_MODEL}\0{RESUME_CHUNK_CHARS}\0{resume_text.strip()}".encode("utf-8")).hexdigest()
+    cached = resume_embedding_cache.get(key)
+    if cached is not None:
+        return cached[0], cached[1], True
+
+    async def embed():
+        chunks = split_resume(resume_text)
+        vectors = await asyncio.to_thread(embeddings.encode, chunks)
+        resume_embedding_cache.set(key, (chunks, vectors))
+        return chunks, vectors
+
+    chunks, vectors = await embedding_flight.do(("resume", key), embed)
+    return chunks, vectors, False
+
+async def match_resume_async(resume_text: str, namespace: str = "ns1", top_k: int = 10, offset: int = 0,
+                             aggregate: str = "max", filters: dict = None):
+    """
+    Finds the jobs that best match a whole resume using multi-vector retrieval.
+    Each job is scored against every resume chunk in one pass; "max" ranks by the best matching
+    section, "sum" rewards jobs that match many sections.
+
+    Args:
+        resume_text (str): The resume as plain text.
+        namespace (str): The namespace to use in the vector index.
+        top_k (int): The number of results to return.
+        offset (int): The number of top results to skip (for "show me more").
+        aggregate (str): "max" or "sum".
+        filters (dict): Optional metadata filters (see build_metadata_filter).
+
+    Returns:
+        tuple: (results, info) where info reports the chunk count and whether the embeddings were cached.
+
+    Raises:
+        ValueError: If the resume is empty or the aggregate or filters are invalid.
+    """
+    if not resume_text.strip():
+        raise ValueError("Resume text is empty.")
+    if aggregate not in ("max", "sum"):
+        raise ValueError(f"Unknown aggregate {aggregate!r}; use \"max\" or \"sum\".")
+    metadata_filter = build_metadata_filter(filters)
+    if ENABLE_LOCAL_TESTING and VECTOR_BACKEND != "local":
+        logger.info("Returning sample response for resume match")
+        return sample_results()[offset:offset + top_k], {"chunks": len(split_resume(resume_text)), "cachedEmbeddings": False}
+    if metadata_filter:
+        await asyncio.to_thread(check_filter_fields, metadata_filter, namespace)
+    try:
+        chunks, vectors, cached = await embed_resume(resume_text)
+        matches = await asyncio.to_thread(
+            get_vector_store().query_many, vectors, top_k + offset, namespace, metadata_filter, aggregate
+        )
+        return format_matches(matches[offset:]), {"chunks": len(chunks), "cachedEmbeddings": cached}
 
     except Exception as e:
-        logger.error(f"Error querying Pinecone: {str(e)}")
-        raise RuntimeError(f"Error querying Pinecone: {e}")
+        logger.error(f"Error matching resume: {str(e)}")
+        raise RuntimeError(f"Error matching resume: {e}")
 
 # Testing with resume.txt
 if __name__ == "__main__":
@@ -118,13 +469,10 @@ if __name__ == "__main__":
         with open(resume_file_path, "r", encoding="utf-8") as file:
             resume_content = file.read()
 
-        # Test the function with the resume content
-        query = "Software Engineer with experience in Python and cloud platforms"
-        combined_query = f"{query}\n\n{resume_content}"
-
+        # Match the resume section by section instead of embedding it as one truncated string
         try:
-            results = search_pinecone(query=combined_query, namespace="ns1", top_k=3)
-            logger.info("Query Results:")
+            results, info = asyncio.run(match_resume_async(resume_content, namespace="ns1", top_k=3))
+            logger.info(f"Query Results ({info['chunks']} resume chunks):")
             for result in results:
                 logger.info(result)
         except Exception as e:
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import metrics
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("singleflight")
+
+class _Call:
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Coalesces concurrent async calls with the same key: the first caller starts the work and
+    everyone who asks for the same key while it is running awaits that one result (or exception).
+    Nothing is kept once the call finishes, so this only removes duplicate in-flight work; caching
+    stays with the caches. Results are shared between callers and must be treated as read-only.
+
+    The work runs in its own task, so a caller that is cancelled (e.g. a client that disconnected)
+    does not cancel it for the others; it is cancelled only when every waiter has gone.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self.counters = {"calls": 0, "shared": 0}
+
+    async def do(self, key, func):
+        """
+        Run `func()` (a coroutine function) for `key`, or join the run already in flight.
+        :param key: Hashable key built from the normalized inputs.
+        :return: The result of the shared call.
+        """
+        loop = asyncio.get_running_loop()
+        call = self._calls.get(key)
+        # Tasks belong to one event loop; a call from another loop (sync wrappers) starts its own
+        if call is None or call.task.done() or call.task.get_loop() is not loop:
+            call = _Call(loop.create_task(func()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _, key=key, call=call: self._forget(key, call))
+            self.counters["calls"] += 1
+            metrics.singleflight_calls.inc(flight=self.name, role="leader")
+        else:
+            self.counters["shared"] += 1
+            metrics.singleflight_calls.inc(flight=self.name, role="shared")
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key, call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.task.cancelled() and call.task.exception() is not None and call.waiters == 0:
+            logger.debug(f"{self.name} call for {key!r} failed with no one waiting: {call.task.exception()}")
+
+    def stats(self):
+        """Counts of calls started and calls that joined one already in flight."""
+        requests = self.counters["calls"] + self.counters["shared"]
+        return {
+            **self.counters,
+            "in_flight": len(self._calls),
+            "shared_ratio": round(self.counters["shared"] / requests, 4) if requests else 0.0,
+        }
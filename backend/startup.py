@@ -0,0 +1,139 @@
+import os
+import time
+import asyncio
+import threading
+import logging
+from dotenv import load_dotenv
+import embeddings
+import vectorstore
+import Fetch
+import github_scheduler
+import llm
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("startup")
+
+# Load environment variables
+load_dotenv()
+# Subsystems initialized in the background at startup ("all", "none", or a comma list of SUBSYSTEMS
+# names); everything else is initialized on first use
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "embeddings")
+# Hold back serving until the warm-up has finished instead of warming in the background
+STARTUP_WARMUP_WAIT = os.getenv("STARTUP_WARMUP_WAIT", "false").lower() == "true"
+# Cold start (process start to first served request) above this is logged as a warning
+COLD_START_TARGET_SECONDS = float(os.getenv("COLD_START_TARGET_SECONDS", "2"))
+
+class Subsystem:
+    """
+    A backend client that is initialized once, either by the warm-up or on first use.
+    `init` does the work; `probe` tells whether first use has already initialized it and
+    `failure` returns why first use failed to (None if it has not failed). Neither may initialize anything.
+    """
+
+    def __init__(self, name, init, probe, failure):
+        self.name = name
+        self.init = init
+        self.probe = probe
+        self.failure = failure
+        self.state = "not_initialized"
+        self.error = None
+        self.seconds = None
+        self._lock = threading.Lock()
+
+    def initialize(self):
+        with self._lock:
+            if self.state == "ready":
+                return
+            self.state = "initializing"
+            started = time.perf_counter()
+            try:
+                self.init()
+            except Exception as e:
+                self.state, self.error = "failed", str(e)
+                logger.error(f"Failed to initialize {self.name}: {e}")
+                return
+            finally:
+                self.seconds = round(time.perf_counter() - started, 3)
+            self.state, self.error = "ready", None
+            logger.info(f"Initialized {self.name} in {self.seconds}s")
+
+    def status(self):
+        state, error = self.state, self.error
+        if state == "not_initialized":
+            # Initialized, or failed to, on first use
+            error = self.failure()
+            if self.probe():
+                state = "ready"
+            elif error is not None:
+                state = "failed"
+        return {"state": state, "error": error, "initSeconds": self.seconds}
+
+def _init_vector_store():
+    store = vectorstore.get_vector_store()
+    if isinstance(store, vectorstore.LocalVectorStore):
+        store.namespace("ns1")  # maps the index files
+
+def _init_github():
+    github_scheduler.get_scheduler()
+    Fetch.get_response_cache()
+
+def _github_initialized():
+    # Must not go through the getters, which would create what they are asked about
+    cache_ready = not Fetch.GITHUB_CACHE_ENABLED or Fetch.opened_response_cache() is not None
+    return github_scheduler._scheduler is not None and cache_ready
+
+SUBSYSTEMS = {
+    "llm": Subsystem("llm", lambda: (llm.get_genai(), llm.get_gateway()), lambda: llm._genai is not None,
+                     lambda: llm._genai_error),
+    "embeddings": Subsystem("embeddings", embeddings.get_model, lambda: embeddings._model is not None,
+                            lambda: embeddings._model_error),
+    "vectorstore": Subsystem("vectorstore", _init_vector_store, lambda: vectorstore.VECTOR_BACKEND in vectorstore._stores,
+                             lambda: vectorstore._store_errors.get(vectorstore.VECTOR_BACKEND)),
+    "github": Subsystem("github", _init_github, _github_initialized, lambda: Fetch._response_cache_error),
+}
+
+def warmup_targets(setting=STARTUP_WARMUP):
+    """Subsystem names selected by a STARTUP_WARMUP value."""
+    if setting.strip().lower() == "all":
+        return list(SUBSYSTEMS)
+    if setting.strip().lower() == "none":
+        return []
+    names = [name.strip() for name in setting.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SUBSYSTEMS]
+    if unknown:
+        logger.warning(f"Ignoring unknown warm-up subsystems: {', '.join(unknown)}")
+    return [name for name in names if name in SUBSYSTEMS]
+
+async def warm_up(names):
+    """Initialize the named subsystems in parallel threads; failures are recorded, not raised."""
+    await asyncio.gather(*(asyncio.to_thread(SUBSYSTEMS[name].initialize) for name in names))
+
+class ColdStart:
+    """Timeline from process start (first import of the app) to the first served request."""
+
+    def __init__(self, started_at, target=COLD_START_TARGET_SECONDS):
+        self.started_at = started_at
+        self.target = target
+        self.import_seconds = None
+        self.first_request_seconds = None
+
+    def imported(self):
+        self.import_seconds = round(time.perf_counter() - self.started_at, 3)
+
+    def request_served(self):
+        if self.first_request_seconds is not None:
+            return
+        self.first_request_seconds = round(time.perf_counter() - self.started_at, 3)
+        if self.first_request_seconds > self.target:
+            logger.warning(f"Cold start took {self.first_request_seconds}s (target {self.target}s)")
+        else:
+            logger.info(f"Cold start took {self.first_request_seconds}s (target {self.target}s)")
+
+    def report(self):
+        return {
+            "importSeconds": self.import_seconds,
+            "firstRequestSeconds": self.first_request_seconds,
+            "targetSeconds": self.target,
+            "withinTarget": None if self.first_request_seconds is None else self.first_request_seconds <= self.target,
+        }
@@ -0,0 +1,21 @@
+from email.utils import format_datetime
+from datetime import datetime, timezone
+import pytest
+from github_scheduler import GitHubScheduler
+
+NOW = datetime(2025, 1, 1, 12, 0, 0, tzinfo=timezone.utc).timestamp()
+
+@pytest.mark.parametrize("value, expected", [("0", 0.0), ("30", 30.0), ("1.5", 1.5), ("-5", 0.0)])
+def test_retry_after_seconds(value, expected):
+    assert GitHubScheduler._retry_after(value, NOW) == expected
+
+def test_retry_after_http_date():
+    value = format_datetime(datetime.fromtimestamp(NOW + 90, timezone.utc), usegmt=True)
+    assert GitHubScheduler._retry_after(value, NOW) == pytest.approx(90.0)
+
+def test_retry_after_http_date_in_the_past():
+    assert GitHubScheduler._retry_after("Wed, 01 Jan 2020 00:00:00 GMT", NOW) == 0.0
+
+@pytest.mark.parametrize("value", ["soon", "", "Mon, 99 Foo 2025"])
+def test_retry_after_unparseable(value):
+    assert GitHubScheduler._retry_after(value, NOW) is None
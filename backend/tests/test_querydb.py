@@ -0,0 +1,26 @@
+import pytest
+from querydb import decode_cursor, encode_cursor
+
+SEARCH_KEY = "a" * 64
+OTHER_KEY = "b" * 64
+
+@pytest.mark.parametrize("offset", [0, 10, 190, 10 ** 6])
+def test_cursor_round_trip(offset):
+    assert decode_cursor(encode_cursor(SEARCH_KEY, offset), SEARCH_KEY) == offset
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor(SEARCH_KEY, 123456)
+    assert "=" not in cursor and "+" not in cursor and "/" not in cursor
+
+def test_cursor_from_another_search_is_rejected():
+    with pytest.raises(ValueError, match="does not belong"):
+        decode_cursor(encode_cursor(SEARCH_KEY, 10), OTHER_KEY)
+
+def test_negative_offset_is_rejected():
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(SEARCH_KEY, -10), SEARCH_KEY)
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "e30", "eyJrIjoxfQ"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, SEARCH_KEY)
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+import vectorstore
+from vectorstore import LocalNamespace
+
+DIMENSION = 8
+
+def records(ids, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {"id": str(i), "values": rng.normal(size=DIMENSION).tolist(), "metadata": {"n": i, "parity": "odd" if i % 2 else "even"}}
+        for i in ids
+    ]
+
+def all_ids(namespace):
+    return {match["id"] for match in namespace.query(np.ones(DIMENSION), top_k=10 ** 6)}
+
+@pytest.fixture
+def namespace(tmp_path, monkeypatch):
+    # No automatic compaction unless a test asks for it
+    monkeypatch.setattr(vectorstore, "LOCAL_COMPACT_RATIO", 1.0)
+    return LocalNamespace(str(tmp_path / "ns1"))
+
+def test_deleted_rows_are_hidden(namespace):
+    namespace.upsert(records(range(20)))
+    namespace.delete(["3", "4", "missing"])
+    assert namespace.size == 18
+    assert all_ids(namespace) == {str(i) for i in range(20)} - {"3", "4"}
+    assert len(namespace.state.dead) == 2
+
+def test_superseded_row_is_hidden(namespace):
+    namespace.upsert(records(range(5)))
+    updated = records([2], seed=1)
+    namespace.upsert(updated)
+    matches = [match for match in namespace.query(np.asarray(updated[0]["values"]), top_k=100) if match["id"] == "2"]
+    assert len(matches) == 1
+    assert matches[0]["score"] == pytest.approx(1.0, abs=1e-5)
+    assert namespace.size == 5
+
+def test_duplicate_ids_in_one_batch_keep_the_last(namespace):
+    namespace.upsert(records([1, 1, 2]))
+    assert namespace.size == 2
+    assert all_ids(namespace) == {"1", "2"}
+
+def test_tombstones_survive_a_reload(namespace):
+    namespace.upsert(records(range(10)))
+    namespace.delete(["0", "9"])
+    reloaded = LocalNamespace(namespace.directory)
+    assert reloaded.size == 8
+    assert all_ids(reloaded) == all_ids(namespace)
+    assert reloaded.row_of == namespace.row_of
+
+def test_filter_skips_deleted_rows(namespace):
+    namespace.upsert(records(range(10)))
+    namespace.delete(["2"])
+    matches = namespace.query(np.ones(DIMENSION), top_k=100, filter={"parity": {"$eq": "even"}})
+    assert {match["id"] for match in matches} == {"0", "4", "6", "8"}
+
+def test_compaction_drops_dead_rows(namespace, monkeypatch):
+    monkeypatch.setattr(vectorstore, "LOCAL_COMPACT_RATIO", 0.25)
+    namespace.upsert(records(range(20)))
+    generation = namespace.state.manifest["generation"]
+    namespace.delete([str(i) for i in range(6)])
+    assert namespace.state.manifest["generation"] == generation + 1
+    assert namespace.state.rows == 14 and len(namespace.state.dead) == 0
+    assert all_ids(namespace) == {str(i) for i in range(6, 20)}
+    reloaded = LocalNamespace(namespace.directory)
+    assert all_ids(reloaded) == all_ids(namespace)
+
+def test_reader_sees_compaction_by_another_writer(namespace, monkeypatch):
+    namespace.upsert(records(range(20)))
+    reader = LocalNamespace(namespace.directory)
+    monkeypatch.setattr(vectorstore, "LOCAL_COMPACT_RATIO", 0.25)
+    namespace.delete([str(i) for i in range(10)])
+    reader.refresh()
+    assert reader.state.manifest["generation"] == namespace.state.manifest["generation"]
+    assert all_ids(reader) == {str(i) for i in range(10, 20)}
+
+def test_snapshot_taken_before_a_write_is_unchanged(namespace):
+    namespace.upsert(records(range(10)))
+    snapshot = namespace.state
+    namespace.delete(["1"])
+    namespace.upsert(records([10]))
+    assert snapshot.count == 10
+    assert {snapshot.ids[row] for row in snapshot.live_rows()} == {str(i) for i in range(10)}
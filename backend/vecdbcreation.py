@@ -1,87 +1,369 @@
 from pinecone import Pinecone, ServerlessSpec
 import os
 import json
+import sqlite3
+import re
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import time
-from sentence_transformers import SentenceTransformer
+import numpy as np
+import embeddings
+from dedup import DEDUP_THRESHOLD, collapse_duplicates
+from vectorstore import PINECONE_INDEX_NAME, VECTOR_BACKEND, PineconeVectorStore, LocalVectorStore
 
 # Load environment variables
 load_dotenv()
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 
-# Initialize Pinecone
-pc = Pinecone(api_key=PINECONE_API_KEY)
-
 # Define index name
-index_name = "vecdb"
-
-# Delete the existing index if it exists (optional, comment out if you don't want to recreate)
-if index_name in pc.list_indexes().names():
-    pc.delete_index(index_name)
-
-# Create the index with the correct dimensionality for SentenceTransformers
-if index_name not in pc.list_indexes().names():
-    pc.create_index(
-        name=index_name,
-        dimension=384,  # Matches all-MiniLM-L6-v2
-        metric="cosine",
-        spec=ServerlessSpec(
-            cloud="aws",
-            region="us-east-1"
+index_name = PINECONE_INDEX_NAME
+
+# Ingestion settings
+INGEST_STATE_PATH = os.getenv("INGEST_STATE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "ingest_state.sqlite"))
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "2000"))
+INGEST_UPSERT_BATCH = int(os.getenv("INGEST_UPSERT_BATCH", "100"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "4"))
+# Collapse near-duplicate listings into one indexed job. Off by default: clusters are only known once the
+# whole feed has been seen, so it holds every entry and embedding in memory instead of streaming chunks
+INGEST_DEDUP = os.getenv("INGEST_DEDUP", "false").lower() == "true"
+
+# Summaries written as "<title> at <company>, <location>. <description>" (the sample feed and fetch_jobs.py)
+SUMMARY_PATTERN = re.compile(r"^(?P<job_title>.+?) at (?P<company_name>[^,.]+), (?P<location>[^.]+)\.")
+
+def create_pinecone_store(recreate=False):
+    """
+    Connect to the Pinecone index, creating it if it does not exist yet.
+    :param recreate: Delete and recreate the index first (takes search offline until it is rebuilt).
+    """
+    # Initialize Pinecone
+    pc = Pinecone(api_key=PINECONE_API_KEY)
+
+    # Delete the existing index only when a full rebuild is requested
+    if recreate and index_name in pc.list_indexes().names():
+        pc.delete_index(index_name)
+
+    # Create the index with the dimensionality of the shared embedding model
+    if index_name not in pc.list_indexes().names():
+        pc.create_index(
+            name=index_name,
+            dimension=embeddings.embedding_dimension(),  # 384 for all-MiniLM-L6-v2
+            metric="cosine",
+            spec=ServerlessSpec(
+                cloud="aws",
+                region="us-east-1"
+            )
         )
-    )
-
-# Connect to the Pinecone index
-index = pc.Index(index_name)
-
-# Initialize SentenceTransformers model
-model = SentenceTransformer("all-MiniLM-L6-v2")
-
-# Load data from Job.json
-job_data_path = "Job.json"  # Ensure this file exists in backend/
-try:
-    with open(job_data_path, "r") as f:
-        job_data = [json.loads(line) for line in f]
-except FileNotFoundError:
-    print(f"Error: {job_data_path} not found. Please provide the job data file.")
-    exit(1)
-except json.JSONDecodeError as e:
-    print(f"Error: Invalid JSON format in {job_data_path}: {e}")
-    exit(1)
-
-# Extract text for embedding
-try:
-    texts = [entry["metadata"]["job_summary"] for entry in job_data]
-except KeyError as e:
-    print(f"Error: Missing key in job data: {e}")
-    exit(1)
-
-# Generate embeddings using SentenceTransformers
-embeddings = model.encode(texts).tolist()
-
-# Wait for the index to be ready
-while not pc.describe_index(index_name).status['ready']:
-    time.sleep(1)
-
-# Prepare upsert data with embeddings
-upsert_data = []
-for entry, embedding in zip(job_data, embeddings):
+
+    # Wait for the index to be ready
+    while not pc.describe_index(index_name).status['ready']:
+        time.sleep(1)
+
+    # Connect to the Pinecone index
+    return PineconeVectorStore(pc.Index(index_name))
+
+def backfill_metadata(metadata):
+    """
+    Fill in the job title, company and location parsed from the job summary when a record lacks them,
+    so the company filter works on feeds that only carry job_summary. Country and salary cannot be
+    derived from the summary; filtering on them needs a feed written by fetch_jobs.py.
+    :return: The metadata with the parsed fields added (existing values are kept).
+    """
+    match = SUMMARY_PATTERN.match(metadata["job_summary"])
+    if not match:
+        return metadata
+    return {**{key: value.strip() for key, value in match.groupdict().items()}, **metadata}
+
+def iter_job_chunks(job_data_path, chunk_size=INGEST_CHUNK_SIZE):
+    """
+    Stream job records from a JSON Lines file in lists of at most `chunk_size`.
+    Malformed lines and records without an id or job summary are reported and skipped; missing
+    title, company and location metadata is backfilled from the summary (see backfill_metadata).
+    :raises FileNotFoundError: If the job data file does not exist.
+    """
+    with open(job_data_path, "r", encoding="utf-8") as f:
+        chunk = []
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"Error: Invalid JSON on line {line_number} of {job_data_path}: {e}")
+                continue
+            if "id" not in entry or "job_summary" not in (entry.get("metadata") or {}):
+                print(f"Error: Missing id or job_summary in job entry on line {line_number}")
+                continue
+            entry["metadata"] = backfill_metadata(entry["metadata"])
+            chunk.append(entry)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+def job_hash(entry):
+    """Fingerprint of everything that ends up in the index for a job, including the embedding model."""
+    payload = json.dumps({"model": embeddings.EMBEDDING_MODEL, "metadata": entry["metadata"]}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class IngestState:
+    """
+    Records the content hash of every indexed job and the run that last saw it,
+    so unchanged jobs are skipped and jobs missing from the feed can be deleted.
+    """
+
+    def __init__(self, path, namespace):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.namespace = namespace
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                namespace TEXT NOT NULL,
+                id TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                run_id INTEGER NOT NULL,
+                PRIMARY KEY (namespace, id)
+            )"""
+        )
+        self.run_id = int(time.time() * 1000)
+
+    def hashes(self, ids):
+        found = {}
+        # Query in slices to stay under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            part = ids[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT id, hash FROM jobs WHERE namespace = ? AND id IN ({','.join('?' * len(part))})",
+                (self.namespace, *part),
+            ).fetchall()
+            found.update(rows)
+        return found
+
+    def mark_seen(self, ids):
+        self.conn.executemany(
+            "UPDATE jobs SET run_id = ? WHERE namespace = ? AND id = ?",
+            [(self.run_id, self.namespace, record_id) for record_id in ids],
+        )
+        self.conn.commit()
+
+    def record(self, id_hashes):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO jobs (namespace, id, hash, run_id) VALUES (?, ?, ?, ?)",
+            [(self.namespace, record_id, digest, self.run_id) for record_id, digest in id_hashes],
+        )
+        self.conn.commit()
+
+    def stale_ids(self):
+        rows = self.conn.execute(
+            "SELECT id FROM jobs WHERE namespace = ? AND run_id != ?", (self.namespace, self.run_id)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def reset(self):
+        self.conn.execute("DELETE FROM jobs WHERE namespace = ?", (self.namespace,))
+        self.conn.commit()
+
+    def forget(self, ids):
+        self.conn.executemany(
+            "DELETE FROM jobs WHERE namespace = ? AND id = ?", [(self.namespace, record_id) for record_id in ids]
+        )
+        self.conn.commit()
+
+class EmbeddingCache:
+    """
+    Job embeddings keyed by embedding model and summary text, stored next to the ingest state.
+    Reposted listings with identical text and re-runs after a state reset are never encoded twice.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            )"""
+        )
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, texts):
+        """
+        Embed `texts`, encoding only those not cached yet (each distinct text once).
+        :return: A float32 matrix of unit-normalized embeddings, one row per text.
+        """
+        hashes = [hashlib.sha256(text.encode("utf-8")).hexdigest() for text in texts]
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        for start in range(0, len(unique), 500):
+            part = unique[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({','.join('?' * len(part))})",
+                (embeddings.EMBEDDING_MODEL, *part),
+            ).fetchall()
+            found.update((digest, np.frombuffer(vector, dtype=np.float32)) for digest, vector in rows)
+
+        missing = {digest: text for digest, text in zip(hashes, texts) if digest not in found}
+        if missing:
+            vectors = embeddings.encode(list(missing.values()))
+            new = dict(zip(missing, vectors))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)",
+                [(embeddings.EMBEDDING_MODEL, digest, vector.tobytes()) for digest, vector in new.items()],
+            )
+            self.conn.commit()
+            found.update(new)
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+        if not texts:
+            return np.empty((0, embeddings.embedding_dimension()), dtype=np.float32)
+        return np.stack([found[digest] for digest in hashes])
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def iter_deduplicated_chunks(job_data_path, cache, chunk_size=INGEST_CHUNK_SIZE, threshold=DEDUP_THRESHOLD):
+    """
+    Embed the whole feed (through the embedding cache), collapse near-duplicate listings and yield the
+    canonical jobs in chunks. Each job carries its vector in "values"; copies are listed in "duplicate_ids".
+    """
+    entries, vectors = [], []
+    for chunk in iter_job_chunks(job_data_path, chunk_size):
+        entries.extend(chunk)
+        vectors.append(cache.encode([entry["metadata"]["job_summary"] for entry in chunk]))
+    if not entries:
+        return
+    canonical, canonical_vectors = collapse_duplicates(entries, np.concatenate(vectors), threshold)
+    print(f"Deduplicated {len(entries)} jobs into {len(canonical)} distinct listings.")
+    for start in range(0, len(canonical), chunk_size):
+        yield [
+            {**entry, "values": vector}
+            for entry, vector in zip(canonical[start:start + chunk_size], canonical_vectors[start:start + chunk_size])
+        ]
+
+def build_index(store, job_data_path, namespace="ns1", ann=False, chunk_size=INGEST_CHUNK_SIZE,
+                batch_size=INGEST_UPSERT_BATCH, workers=INGEST_WORKERS, state_path=INGEST_STATE_PATH,
+                reset_state=False, dedup=INGEST_DEDUP, dedup_threshold=DEDUP_THRESHOLD):
+    """
+    Incrementally sync the vector store with a JSON Lines job feed.
+    The feed is streamed in chunks; only new or changed jobs are embedded and upserted (in batches,
+    by parallel workers), and jobs that are no longer in the feed are deleted afterwards.
+    The index stays queryable throughout; a running API picks up each write on its next local-store query.
+    :param ann: Also rebuild the approximate (IVF) index when the store supports it.
+    :param reset_state: Forget previously indexed jobs (use after recreating an empty index).
+    :param dedup: Index one job per cluster of near-duplicate listings (see dedup.collapse_duplicates).
+        This loads the whole feed and its embeddings into memory before anything is upserted.
+    :param dedup_threshold: Cosine similarity at which two listings count as duplicates.
+    """
+    # The local store serializes writes (each one appends and publishes a manifest), so it gets one upsert per chunk from a single worker
+    local = isinstance(store, LocalVectorStore)
+    state = IngestState(state_path, f"{'local' if local else 'pinecone'}:{namespace}")
+    if reset_state:
+        state.reset()
+    if local:
+        batch_size, workers = chunk_size, 1
+    cache = EmbeddingCache(state.conn)
+    totals = {"seen": 0, "unchanged": 0, "upserted": 0, "deleted": 0}
+    if dedup:
+        chunks = iter_deduplicated_chunks(job_data_path, cache, chunk_size, dedup_threshold)
+    else:
+        chunks = iter_job_chunks(job_data_path, chunk_size)
+    pending = []
+
+    def upsert(batch):
+        store.upsert(
+            [{"id": record["id"], "values": record["values"], "metadata": record["metadata"]} for record in batch],
+            namespace=namespace,
+        )
+        return [(record["id"], record["hash"]) for record in batch]
+
+    def drain(limit):
+        while len(pending) > limit:
+            state.record(pending.pop(0).result())
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for chunk in chunks:
+            totals["seen"] += len(chunk)
+            known = state.hashes([entry["id"] for entry in chunk])
+            changed = []
+            for entry in chunk:
+                digest = job_hash(entry)
+                if known.get(entry["id"]) == digest:
+                    continue
+                changed.append((entry, digest))
+            state.mark_seen([entry["id"] for entry in chunk if entry["id"] in known])
+            totals["unchanged"] += len(chunk) - len(changed)
+            if not changed:
+                continue
+
+            # Embeddings come from the shared embedding model (the same one queries use), via the cache
+            if dedup:
+                vectors = [entry["values"].tolist() for entry, _ in changed]
+            else:
+                vectors = cache.encode([entry["metadata"]["job_summary"] for entry, _ in changed]).tolist()
+            records = [
+                {"id": entry["id"], "values": vector, "metadata": entry["metadata"], "hash": digest}
+                for (entry, digest), vector in zip(changed, vectors)
+            ]
+            for batch in _batches(records, batch_size):
+                pending.append(executor.submit(upsert, batch))
+            totals["upserted"] += len(records)
+            # Keep a bounded number of upserts in flight while the next chunk is embedded
+            drain(workers * 2)
+        drain(0)
+
+    # Remove jobs that disappeared from the feed
+    stale = state.stale_ids()
+    for batch in _batches(stale, batch_size if not local else max(len(stale), 1)):
+        store.delete(batch, namespace=namespace)
+        state.forget(batch)
+    totals["deleted"] = len(stale)
+
+    if ann and local:
+        store.build_ann_index(namespace=namespace)
+
+    totals["embeddings_cached"], totals["embeddings_encoded"] = cache.hits, cache.misses
+    print(f"Seen {totals['seen']} jobs: {totals['upserted']} upserted, "
+          f"{totals['unchanged']} unchanged, {totals['deleted']} deleted "
+          f"({cache.misses} embeddings encoded, {cache.hits} from cache).")
+    # Print index stats
+    print(store.describe())
+    return totals
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync the job vector index with a JSON Lines job feed.")
+    parser.add_argument("--backend", choices=["pinecone", "local"], default=VECTOR_BACKEND,
+                        help="Vector store to build (defaults to VECTOR_BACKEND; local writes a memory-mapped "
+                             "index to LOCAL_INDEX_DIR).")
+    parser.add_argument("--jobs", default="Job.json", help="Job data file in JSON Lines format.")
+    parser.add_argument("--namespace", default="ns1", help="Index namespace to sync.")
+    parser.add_argument("--chunk-size", type=int, default=INGEST_CHUNK_SIZE, help="Jobs read and embedded per chunk.")
+    parser.add_argument("--batch-size", type=int, default=INGEST_UPSERT_BATCH, help="Vectors per upsert request.")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS, help="Parallel upsert workers.")
+    parser.add_argument("--recreate", action="store_true", help="Delete and recreate the index (or empty the local namespace) first.")
+    parser.add_argument("--ann", action="store_true", help="Also build an approximate (IVF) index for the local backend.")
+    parser.add_argument("--dedup", action=argparse.BooleanOptionalAction, default=INGEST_DEDUP,
+                        help="Collapse near-duplicate listings into one indexed job. "
+                             "Loads the whole feed and its embeddings into memory instead of streaming it.")
+    parser.add_argument("--dedup-threshold", type=float, default=DEDUP_THRESHOLD,
+                        help="Cosine similarity at which two listings count as duplicates.")
+    args = parser.parse_args()
+
+    if args.backend == "pinecone":
+        store = create_pinecone_store(recreate=args.recreate)
+    else:
+        store = LocalVectorStore()
+        # Without this the old rows would stay in the store while the reset state no longer tracks them
+        if args.recreate:
+            store.clear(namespace=args.namespace)
     try:
-        upsert_data.append({
-            "id": entry["id"],
-            "values": embedding,
-            "metadata": entry["metadata"]
-        })
-    except KeyError as e:
-        print(f"Error: Missing key in job entry: {e}")
-        continue
-
-# Upsert data into Pinecone
-if upsert_data:
-    index.upsert(vectors=upsert_data, namespace="ns1")
-    print(f"Successfully upserted {len(upsert_data)} vectors into Pinecone.")
-else:
-    print("Error: No valid data to upsert.")
-
-# Print index stats
-print(index.describe_index_stats())
\ No newline at end of file
+        build_index(store, args.jobs, namespace=args.namespace, ann=args.ann, chunk_size=args.chunk_size,
+                    batch_size=args.batch_size, workers=args.workers, reset_state=args.recreate,
+                    dedup=args.dedup, dedup_threshold=args.dedup_threshold)
+    except FileNotFoundError:
+        print(f"Error: {args.jobs} not found. Please provide the job data file.")
+        exit(1)
@@ -0,0 +1,683 @@
+import os
+import json
+import itertools
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from dotenv import load_dotenv
+import metrics
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("vectorstore")
+
+# Load environment variables
+load_dotenv()
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone").lower()  # "pinecone" or "local"
+PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "vecdb")
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "local_index"))
+# Below this many vectors an approximate index is never used; exact search is already fast
+ANN_MIN_VECTORS = int(os.getenv("ANN_MIN_VECTORS", "50000"))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+# Per-vector candidate depth (as a multiple of top_k) when a multi-vector query is answered query by query
+MULTI_QUERY_DEPTH_FACTOR = int(os.getenv("MULTI_QUERY_DEPTH_FACTOR", "3"))
+# Rewrite a local namespace without its dead rows once this share of rows is deleted or superseded
+LOCAL_COMPACT_RATIO = float(os.getenv("LOCAL_COMPACT_RATIO", "0.25"))
+
+class VectorStore:
+    """
+    Interface shared by the vector database backends.
+    Records are dictionaries with "id", "values" and "metadata"; matches are dictionaries with
+    "id", "score" and "metadata", best first. Query filters use Pinecone's metadata filter syntax
+    (e.g. {"country_code": {"$eq": "GB"}, "salary_min": {"$gte": 50000}}) and are applied before scoring.
+    """
+    backend = "base"
+
+    def _track(self, operation):
+        """Time a query into the vector_query_seconds histogram."""
+        return metrics.track(
+            metrics.vector_query_seconds, metrics.vector_queries_in_flight, backend=self.backend, operation=operation
+        )
+
+    def upsert(self, records, namespace="ns1"):
+        raise NotImplementedError
+
+    def query(self, vector, top_k=10, namespace="ns1", filter=None):
+        raise NotImplementedError
+
+    def query_many(self, vectors, top_k=10, namespace="ns1", filter=None, aggregate="max"):
+        """
+        Multi-vector query: every record is scored against all `vectors` and the per-vector scores
+        are combined with "max" (best matching vector) or "sum".
+        This default runs one query per vector over a deeper candidate list; a record missing from
+        one vector's candidates counts as 0 towards its sum.
+        """
+        depth = top_k * MULTI_QUERY_DEPTH_FACTOR
+        with self._track("query_many"), ThreadPoolExecutor(max_workers=min(8, max(1, len(vectors)))) as executor:
+            per_vector = list(executor.map(lambda vector: self.query(vector, depth, namespace, filter), vectors))
+        combined = {}
+        for matches in per_vector:
+            for match in matches:
+                entry = combined.setdefault(match["id"], {"id": match["id"], "score": None, "metadata": match["metadata"]})
+                if entry["score"] is None:
+                    entry["score"] = match["score"]
+                elif aggregate == "sum":
+                    entry["score"] += match["score"]
+                else:
+                    entry["score"] = max(entry["score"], match["score"])
+        return sorted(combined.values(), key=lambda match: match["score"], reverse=True)[:top_k]
+
+    def delete(self, ids, namespace="ns1"):
+        raise NotImplementedError
+
+    def metadata_fields(self, namespace="ns1"):
+        """Metadata keys present on the namespace's records, or None when the backend cannot tell."""
+        return None
+
+    def describe(self):
+        raise NotImplementedError
+
+class PineconeVectorStore(VectorStore):
+    """Vector store backed by a remote Pinecone index."""
+    backend = "pinecone"
+
+    def __init__(self, index):
+        self.index = index
+
+    def upsert(self, records, namespace="ns1"):
+        if records:
+            self.index.upsert(vectors=records, namespace=namespace)
+
+    def query(self, vector, top_k=10, namespace="ns1", filter=None):
+        with self._track("query"):
+            results = self.index.query(
+                namespace=namespace,
+                vector=list(map(float, vector)),
+                top_k=top_k,
+                filter=filter or None,
+                include_values=False,
+                include_metadata=True
+            )
+        if "matches" not in results:
+            return []
+        return [
+            {"id": match["id"], "score": match["score"], "metadata": match.get("metadata") or {}}
+            for match in results["matches"]
+        ]
+
+    def delete(self, ids, namespace="ns1"):
+        if ids:
+            self.index.delete(ids=list(ids), namespace=namespace)
+
+    def describe(self):
+        return self.index.describe_index_stats()
+
+def _normalize(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def _top_k(scores, top_k):
+    """Indices of the top_k highest scores, best first, without sorting the whole array."""
+    top_k = min(top_k, scores.shape[0])
+    if top_k <= 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+    return candidates[np.argsort(-scores[candidates])]
+
+_FILTER_OPERATORS = {
+    "$eq": lambda column, value: column == value,
+    "$ne": lambda column, value: column != value,
+    "$gt": lambda column, value: column > value,
+    "$gte": lambda column, value: column >= value,
+    "$lt": lambda column, value: column < value,
+    "$lte": lambda column, value: column <= value,
+    "$in": lambda column, value: np.isin(column, list(value)),
+    "$nin": lambda column, value: ~np.isin(column, list(value)),
+}
+
+class MetadataColumns:
+    """
+    Column-wise view of row metadata so metadata filters are evaluated as vectorized masks.
+    Columns are built lazily the first time a field is filtered on.
+    """
+
+    def __init__(self, metadata, size=None):
+        self.metadata = metadata
+        self.size = len(metadata) if size is None else size
+        self._columns = {}
+
+    def column(self, key, numeric):
+        cache_key = (key, numeric)
+        if cache_key not in self._columns:
+            values = [row.get(key) for row in itertools.islice(self.metadata, self.size)]
+            if numeric:
+                self._columns[cache_key] = np.array(
+                    [value if isinstance(value, (int, float)) else np.nan for value in values], dtype=np.float64
+                )
+            else:
+                self._columns[cache_key] = np.array(["" if value is None else str(value) for value in values], dtype=object)
+        return self._columns[cache_key]
+
+    def mask(self, filter):
+        """Boolean mask of rows matching a Pinecone-style metadata filter."""
+        mask = np.ones(self.size, dtype=bool)
+        for key, condition in (filter or {}).items():
+            if key == "$and":
+                for sub_filter in condition:
+                    mask &= self.mask(sub_filter)
+                continue
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for operator, value in condition.items():
+                sample = value[0] if operator in ("$in", "$nin") and value else value
+                numeric = isinstance(sample, (int, float)) and not isinstance(sample, bool)
+                column = self.column(key, numeric)
+                matched = _FILTER_OPERATORS[operator](column, value)
+                if numeric:
+                    matched &= ~np.isnan(column)  # rows without the field never match
+                mask &= matched
+        return mask
+
+# Per-generation files of a local namespace and their extensions
+_SEGMENT_FILES = {
+    "vectors": "f32",
+    "ids": "jsonl",
+    "metadata": "jsonl",
+    "dead": "i64",
+    "assignments": "i32",
+    "centroids": "npy",
+}
+
+class NamespaceSnapshot:
+    """
+    One version of a namespace: the rows, ids, metadata, tombstones and IVF index that belong together.
+    Writers build a new snapshot and publish it by replacing LocalNamespace.state, so a query that took
+    a snapshot never pairs a row with another version's id or metadata.
+    The id and metadata lists are shared by the snapshots of a generation and only ever appended to;
+    a snapshot reads its first `rows` entries.
+    """
+
+    def __init__(self, manifest, vectors, ids, metadata, dead, centroids=None, assignments=None):
+        self.manifest = manifest
+        self.rows = manifest.get("rows", 0)
+        self.vectors = vectors
+        self.ids = ids
+        self.metadata = metadata
+        self.dead = dead
+        self.alive = None
+        if len(dead):
+            self.alive = np.ones(self.rows, dtype=bool)
+            self.alive[dead] = False
+        self.centroids = centroids
+        self.assignments = assignments
+        self.columns = MetadataColumns(metadata, self.rows)
+        self._lists = None
+        self._fields = None
+
+    @classmethod
+    def empty(cls):
+        return cls({}, None, [], [], np.empty(0, dtype=np.int64))
+
+    @property
+    def count(self):
+        """Live (not deleted or superseded) rows."""
+        return self.rows - len(self.dead)
+
+    def live_rows(self):
+        return np.flatnonzero(self.alive) if self.alive is not None else np.arange(self.rows)
+
+    def live_records(self):
+        """Ids and metadata of the live rows, in row order."""
+        rows = self.live_rows()
+        return [self.ids[row] for row in rows], [self.metadata[row] for row in rows]
+
+    @property
+    def fields(self):
+        """Metadata keys present on at least one live row, collected on first use."""
+        if self._fields is None:
+            self._fields = {key for row in self.live_rows() for key in self.metadata[row]}
+        return self._fields
+
+    @property
+    def lists(self):
+        """Rows of every IVF cluster, built on first use from the per-row cluster assignments."""
+        if self._lists is None and self.centroids is not None:
+            order = np.argsort(self.assignments, kind="stable")
+            bounds = np.searchsorted(self.assignments[order], np.arange(len(self.centroids) + 1))
+            self._lists = [order[bounds[c]:bounds[c + 1]] for c in range(len(self.centroids))]
+        return self._lists
+
+    def _candidate_rows(self, queries, nprobe, filter):
+        """
+        Rows to score for the given (normalized) query vectors, or None for every row.
+        Filters are applied before scoring, so rows that fail them are never multiplied.
+        """
+        mask = self.columns.mask(filter) if filter else None
+        if mask is not None and self.alive is not None:
+            mask &= self.alive
+        if self.centroids is not None and self.count >= ANN_MIN_VECTORS:
+            probe = np.unique(np.concatenate([_top_k(self.centroids @ query, nprobe) for query in queries]))
+            rows = np.concatenate([self.lists[c] for c in probe])
+            if mask is None:
+                mask = self.alive
+            return rows[mask[rows]] if mask is not None else rows
+        if mask is not None:
+            return np.flatnonzero(mask)
+        return None
+
+    def _ranked(self, scores, rows, top_k):
+        if rows is None and self.alive is not None:
+            # Scoring every row and dropping the dead ones is cheaper than gathering the live rows
+            scores = np.where(self.alive, scores, -np.inf)
+        best = _top_k(scores, top_k)
+        if rows is not None:
+            best, scores = rows[best], scores[best]
+        else:
+            scores = scores[best]
+        return [
+            {"id": self.ids[row], "score": float(score), "metadata": self.metadata[row]}
+            for row, score in zip(best, scores) if score > -np.inf
+        ]
+
+    def query(self, vector, top_k=10, nprobe=IVF_NPROBE, filter=None):
+        if self.count == 0:
+            return []
+        query = _normalize(vector).reshape(-1)
+        rows = self._candidate_rows([query], nprobe, filter)
+        # Exact search is one matrix-vector product over the (memory-mapped) matrix or its candidate rows
+        scores = (self.vectors if rows is None else self.vectors[rows]) @ query
+        return self._ranked(scores, rows, top_k)
+
+    def query_many(self, vectors, top_k=10, nprobe=IVF_NPROBE, filter=None, aggregate="max"):
+        """Score every candidate row against all query vectors in one matrix product."""
+        if self.count == 0 or not len(vectors):
+            return []
+        queries = _normalize(vectors).reshape(len(vectors), -1)
+        rows = self._candidate_rows(queries, nprobe, filter)
+        similarities = (self.vectors if rows is None else self.vectors[rows]) @ queries.T
+        scores = similarities.sum(axis=1) if aggregate == "sum" else similarities.max(axis=1)
+        return self._ranked(scores, rows, top_k)
+
+class LocalNamespace:
+    """
+    One namespace of the local store, kept in append-only files of one generation: the float32
+    unit-normalized embeddings (memory-mapped), the record ids, the metadata (one JSON object per row),
+    tombstones for deleted or superseded rows and, once an IVF index is built, every row's cluster.
+    manifest.json records how much of each file is valid and is replaced atomically after a write,
+    so a reader never sees half a batch. When enough rows are dead the live ones are rewritten
+    into the next generation.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.state = NamespaceSnapshot.empty()
+        self.row_of = {}
+        self._manifest_stat = None
+        self._write_lock = threading.Lock()
+        self._load()
+
+    @property
+    def size(self):
+        return self.state.count
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _file(self, name, generation):
+        return self._path(f"{name}.{generation}.{_SEGMENT_FILES[name]}")
+
+    def _read_manifest(self):
+        try:
+            with open(self._path("manifest.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_manifest(self, manifest):
+        with open(self._path("manifest.json.tmp"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(self._path("manifest.json.tmp"), self._path("manifest.json"))
+
+    def _read_lines(self, name, generation, start, end):
+        with open(self._file(name, generation), "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+        return [json.loads(line) for line in data.decode("utf-8").splitlines()]
+
+    def _snapshot(self, manifest, ids, metadata, dead, centroids=None):
+        """Map the vectors (and IVF assignments) described by `manifest` into a snapshot."""
+        generation, rows = manifest["generation"], manifest["rows"]
+        vectors = assignments = None
+        if rows:
+            vectors = np.memmap(self._file("vectors", generation), dtype=np.float32, mode="r",
+                                shape=(rows, manifest["dimension"]))
+            if manifest.get("ivf"):
+                assignments = np.memmap(self._file("assignments", generation), dtype=np.int32, mode="r", shape=(rows,))
+        if not manifest.get("ivf"):
+            centroids = None
+        elif centroids is None:
+            centroids = np.load(self._file("centroids", generation))
+        return NamespaceSnapshot(manifest, vectors, ids, metadata, dead, centroids, assignments)
+
+    def _stat_manifest(self):
+        try:
+            stat = os.stat(self._path("manifest.json"))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load(self):
+        self._manifest_stat = self._stat_manifest()
+        manifest = self._read_manifest()
+        if manifest is None:
+            if os.path.exists(self._path("vectors.npy")):
+                self._migrate()
+            return
+        generation = manifest["generation"]
+        ids = self._read_lines("ids", generation, 0, manifest["ids_bytes"])
+        metadata = self._read_lines("metadata", generation, 0, manifest["metadata_bytes"])
+        dead = np.fromfile(self._file("dead", generation), dtype=np.int64, count=manifest["dead"])
+        self.state = self._snapshot(manifest, ids, metadata, dead)
+        self.row_of = {ids[row]: row for row in self.state.live_rows()}
+
+    def refresh(self):
+        """
+        Pick up writes made by another process (e.g. an offline vecdbcreation.py sync) once its manifest
+        changes. Rows appended to the same generation are read incrementally; a new generation is reloaded.
+        """
+        stat = self._stat_manifest()
+        if stat is None or stat == self._manifest_stat or not self._write_lock.acquire(blocking=False):
+            return
+        try:
+            manifest = self._read_manifest()
+            current = self.state.manifest
+            if manifest is not None and manifest["version"] != current.get("version"):
+                if manifest["generation"] == current.get("generation"):
+                    self._load_appended(manifest)
+                else:
+                    self._load()
+                logger.info(f"Reloaded {self.directory} at version {manifest['version']} ({self.size} vectors)")
+            self._manifest_stat = stat
+        except (FileNotFoundError, ValueError) as e:
+            # A concurrent compaction removed the generation being read; the next call tries again
+            logger.warning(f"Could not reload {self.directory}: {e}")
+        finally:
+            self._write_lock.release()
+
+    def _load_appended(self, manifest):
+        state, current = self.state, self.state.manifest
+        generation = manifest["generation"]
+        ids = self._read_lines("ids", generation, current["ids_bytes"], manifest["ids_bytes"])
+        metadata = self._read_lines("metadata", generation, current["metadata_bytes"], manifest["metadata_bytes"])
+        dead = np.fromfile(self._file("dead", generation), dtype=np.int64,
+                           count=manifest["dead"] - current["dead"], offset=current["dead"] * 8)
+        for offset, record_id in enumerate(ids):
+            self.row_of[record_id] = state.rows + offset
+        state.ids.extend(ids)
+        state.metadata.extend(metadata)
+        for row in dead:
+            if self.row_of.get(state.ids[row]) == row:
+                del self.row_of[state.ids[row]]
+        self.state = self._snapshot(manifest, state.ids, state.metadata, np.concatenate([state.dead, dead]), state.centroids)
+
+    def _migrate(self):
+        """Convert an index written in the earlier single-file layout (vectors.npy, ids.json, metadata.jsonl)."""
+        vectors = np.load(self._path("vectors.npy"), mmap_mode="r")
+        with open(self._path("ids.json"), "r", encoding="utf-8") as f:
+            ids = json.load(f)
+        with open(self._path("metadata.jsonl"), "r", encoding="utf-8") as f:
+            metadata = [json.loads(line) for line in f]
+        manifest = {"generation": 0, "version": 0, "rows": len(ids), "dimension": vectors.shape[1]}
+        self.state = NamespaceSnapshot(manifest, vectors, ids, metadata, np.empty(0, dtype=np.int64))
+        self._rewrite(np.arange(len(ids)))
+        for name in ("vectors.npy", "ids.json", "metadata.jsonl", "ivf.npz"):
+            if os.path.exists(self._path(name)):
+                os.remove(self._path(name))
+        logger.info(f"Migrated {len(ids)} vectors in {self.directory} to the append-only layout")
+
+    def upsert(self, records):
+        if not records:
+            return
+        with self._write_lock:
+            self._upsert(records)
+
+    def _upsert(self, records):
+        # Changed records are appended and their previous row is tombstoned; rows are never rewritten in place
+        vectors = _normalize([record["values"] for record in records])
+        ids, metadata, dead, rows = [], [], [], {}
+        for offset, record in enumerate(records):
+            previous = rows.get(record["id"], self.row_of.get(record["id"]))
+            if previous is not None:
+                dead.append(previous)
+            rows[record["id"]] = self.state.rows + offset
+            ids.append(record["id"])
+            metadata.append(record.get("metadata") or {})
+        self._append(vectors, ids, metadata, dead)
+        self.row_of.update(rows)
+        self._compact_if_needed()
+
+    def delete(self, ids):
+        with self._write_lock:
+            self._delete(ids)
+
+    def _delete(self, ids):
+        dead = {self.row_of[record_id] for record_id in ids if record_id in self.row_of}
+        if not dead:
+            return
+        self._append(np.empty((0, self.state.manifest["dimension"]), dtype=np.float32), [], [], sorted(dead))
+        for record_id in ids:
+            self.row_of.pop(record_id, None)
+        self._compact_if_needed()
+
+    def clear(self):
+        """Drop every row; readers move to the new, empty generation like after a compaction."""
+        with self._write_lock:
+            if self.state.manifest:
+                self._rewrite(np.empty(0, dtype=np.int64))
+
+    def _append(self, vectors, ids, metadata, dead):
+        """Append rows and tombstones to the current generation, then publish the new manifest and snapshot."""
+        state = self.state
+        manifest = dict(state.manifest) if state.manifest else {
+            "generation": 1, "version": 0, "rows": 0, "dimension": vectors.shape[1],
+            "ids_bytes": 0, "metadata_bytes": 0, "dead": 0, "ivf": False,
+        }
+        if vectors.shape[1] != manifest["dimension"]:
+            raise ValueError(f"Vectors have dimension {vectors.shape[1]}, the namespace stores {manifest['dimension']}")
+        os.makedirs(self.directory, exist_ok=True)
+        generation = manifest["generation"]
+        # Anything past the manifest's sizes is left over from an interrupted write
+        valid = {
+            "vectors": manifest["rows"] * manifest["dimension"] * 4,
+            "ids": manifest["ids_bytes"],
+            "metadata": manifest["metadata_bytes"],
+            "dead": manifest["dead"] * 8,
+            "assignments": manifest["rows"] * 4 if manifest["ivf"] else 0,
+        }
+        for name, size in valid.items():
+            path = self._file(name, generation)
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                os.truncate(path, size)
+
+        id_lines = "".join(json.dumps(record_id) + "\n" for record_id in ids).encode("utf-8")
+        metadata_lines = "".join(json.dumps(entry) + "\n" for entry in metadata).encode("utf-8")
+        appends = {
+            "vectors": np.ascontiguousarray(vectors, dtype=np.float32).tobytes(),
+            "ids": id_lines,
+            "metadata": metadata_lines,
+            "dead": np.asarray(dead, dtype=np.int64).tobytes(),
+        }
+        if manifest["ivf"] and len(vectors):
+            # New rows join the nearest existing cluster, so the IVF index stays usable between rebuilds
+            appends["assignments"] = np.argmax(vectors @ state.centroids.T, axis=1).astype(np.int32).tobytes()
+        for name, data in appends.items():
+            with open(self._file(name, generation), "ab") as f:
+                f.write(data)
+
+        manifest.update(
+            version=manifest["version"] + 1,
+            rows=manifest["rows"] + len(ids),
+            ids_bytes=manifest["ids_bytes"] + len(id_lines),
+            metadata_bytes=manifest["metadata_bytes"] + len(metadata_lines),
+            dead=manifest["dead"] + len(dead),
+        )
+        self._write_manifest(manifest)
+        self._manifest_stat = self._stat_manifest()
+        state.ids.extend(ids)
+        state.metadata.extend(metadata)
+        self.state = self._snapshot(
+            manifest, state.ids, state.metadata, np.concatenate([state.dead, np.asarray(dead, dtype=np.int64)]), state.centroids
+        )
+
+    def _compact_if_needed(self):
+        state = self.state
+        if len(state.dead) > LOCAL_COMPACT_RATIO * state.rows:
+            assignments = np.asarray(state.assignments)[state.live_rows()] if state.centroids is not None else None
+            self._rewrite(state.live_rows(), state.centroids, assignments)
+
+    def _rewrite(self, keep, centroids=None, assignments=None):
+        """Write rows `keep` of the current snapshot into a new generation and drop the old one."""
+        state = self.state
+        generation = state.manifest["generation"] + 1
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._file("vectors", generation), "wb") as f:
+            for start in range(0, len(keep), 65536):
+                f.write(np.ascontiguousarray(state.vectors[keep[start:start + 65536]], dtype=np.float32).tobytes())
+        ids = [state.ids[row] for row in keep]
+        metadata = [state.metadata[row] for row in keep]
+        id_lines = "".join(json.dumps(record_id) + "\n" for record_id in ids).encode("utf-8")
+        metadata_lines = "".join(json.dumps(entry) + "\n" for entry in metadata).encode("utf-8")
+        with open(self._file("ids", generation), "wb") as f:
+            f.write(id_lines)
+        with open(self._file("metadata", generation), "wb") as f:
+            f.write(metadata_lines)
+        open(self._file("dead", generation), "wb").close()
+        if centroids is not None:
+            np.save(self._file("centroids", generation), centroids)
+            with open(self._file("assignments", generation), "wb") as f:
+                f.write(np.asarray(assignments, dtype=np.int32).tobytes())
+
+        manifest = {
+            "generation": generation, "version": state.manifest["version"] + 1, "rows": len(ids),
+            "dimension": state.manifest["dimension"], "ids_bytes": len(id_lines), "metadata_bytes": len(metadata_lines),
+            "dead": 0, "ivf": centroids is not None,
+        }
+        self._write_manifest(manifest)
+        self._manifest_stat = self._stat_manifest()
+        self.state = self._snapshot(manifest, ids, metadata, np.empty(0, dtype=np.int64), centroids)
+        self.row_of = {record_id: row for row, record_id in enumerate(ids)}
+        # Readers that still map the previous generation keep their open files
+        for name in os.listdir(self.directory):
+            parts = name.split(".")
+            if len(parts) == 3 and parts[0] in _SEGMENT_FILES and parts[1] != str(generation):
+                os.remove(self._path(name))
+
+    def build_ivf(self, nlist=None, iterations=10, seed=0):
+        """
+        Build an inverted-file index: spherical k-means clusters the vectors and queries only
+        scan the rows in the `nprobe` clusters closest to the query.
+        The live rows are rewritten into a new generation together with the index.
+        """
+        with self._write_lock:
+            state = self.state
+            if state.count == 0:
+                return
+            keep = state.live_rows()
+            vectors = np.asarray(state.vectors[keep])
+            nlist = nlist or max(1, int(np.sqrt(len(keep))))
+            rng = np.random.default_rng(seed)
+            centroids = vectors[rng.choice(len(keep), size=min(nlist, len(keep)), replace=False)].copy()
+            for _ in range(iterations):
+                assignments = np.argmax(vectors @ centroids.T, axis=1)
+                for c in range(len(centroids)):
+                    members = vectors[assignments == c]
+                    if len(members):
+                        centroids[c] = members.mean(axis=0)
+                centroids = _normalize(centroids)
+            assignments = np.argmax(vectors @ centroids.T, axis=1)
+            self._rewrite(keep, centroids, assignments)
+            logger.info(f"Built IVF index with {len(centroids)} lists over {len(keep)} vectors")
+
+    def query(self, vector, top_k=10, nprobe=IVF_NPROBE, filter=None):
+        return self.state.query(vector, top_k, nprobe, filter)
+
+    def query_many(self, vectors, top_k=10, nprobe=IVF_NPROBE, filter=None, aggregate="max"):
+        return self.state.query_many(vectors, top_k, nprobe, filter, aggregate)
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store kept on local disk, one directory per namespace.
+    Scores are cosine similarities, matching the Pinecone index metric.
+    """
+    backend = "local"
+
+    def __init__(self, directory=LOCAL_INDEX_DIR):
+        self.directory = directory
+        self._namespaces = {}
+
+    def namespace(self, namespace="ns1"):
+        """Return the namespace, reloading it first when another process has written to it since."""
+        local = self._namespaces.get(namespace)
+        if local is None:
+            local = self._namespaces.setdefault(namespace, LocalNamespace(os.path.join(self.directory, namespace)))
+        else:
+            local.refresh()
+        return local
+
+    def upsert(self, records, namespace="ns1"):
+        self.namespace(namespace).upsert(records)
+
+    def query(self, vector, top_k=10, namespace="ns1", filter=None):
+        with self._track("query"):
+            return self.namespace(namespace).query(vector, top_k, filter=filter)
+
+    def query_many(self, vectors, top_k=10, namespace="ns1", filter=None, aggregate="max"):
+        with self._track("query_many"):
+            return self.namespace(namespace).query_many(vectors, top_k, filter=filter, aggregate=aggregate)
+
+    def delete(self, ids, namespace="ns1"):
+        self.namespace(namespace).delete(ids)
+
+    def clear(self, namespace="ns1"):
+        self.namespace(namespace).clear()
+
+    def metadata_fields(self, namespace="ns1"):
+        return self.namespace(namespace).state.fields
+
+    def build_ann_index(self, namespace="ns1", nlist=None):
+        self.namespace(namespace).build_ivf(nlist=nlist)
+
+    def describe(self):
+        namespaces = sorted(os.listdir(self.directory)) if os.path.isdir(self.directory) else []
+        return {
+            "backend": "local",
+            "namespaces": {name: {"vector_count": self.namespace(name).size} for name in namespaces},
+        }
+
+_stores = {}
+# Why the last attempt to create each backend's store failed, for /ready
+_store_errors = {}
+
+def get_vector_store(backend=VECTOR_BACKEND):
+    """
+    Return the vector store for `backend` (defaults to VECTOR_BACKEND).
+    The Pinecone client is only created when the Pinecone backend is used.
+    """
+    if backend not in _stores:
+        try:
+            if backend == "local":
+                _stores[backend] = LocalVectorStore()
+            elif backend == "pinecone":
+                from pinecone import Pinecone
+                pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+                _stores[backend] = PineconeVectorStore(pc.Index(PINECONE_INDEX_NAME))
+            else:
+                raise ValueError(f"Unknown VECTOR_BACKEND: {backend}")
+        except Exception as e:
+            _store_errors[backend] = str(e)
+            raise
+        _store_errors.pop(backend, None)
+    return _stores[backend]